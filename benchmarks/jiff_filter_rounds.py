@@ -0,0 +1,118 @@
+import argparse
+import os
+import subprocess
+import tempfile
+import pystache
+
+
+"""
+Counts the communication rounds needed by the JIFF filterRel method, before
+(one open per row) and after (batched open_array) revealing keepRows in chunks.
+Runs methods.js under node against a mock jiff instance, where a round is any
+group of open / open_array calls issued while no other opening is in flight.
+
+    python benchmarks/jiff_filter_rounds.py --rows 10000 --open-batch-sizes 0 100 1000
+"""
+
+
+templates_dir = \
+    f"{os.path.dirname(os.path.realpath(__file__))}/../congregation/codegen/jiff/templates"
+
+
+DRIVER = """
+let methods = require('./methods');
+
+let rounds = 0;
+let inFlight = 0;
+function reveal(v) {
+  if (inFlight === 0) {
+    rounds++;
+  }
+  inFlight++;
+  return new Promise(function (resolve) {
+    setImmediate(function () {
+      inFlight--;
+      resolve(v);
+    });
+  });
+}
+
+let jiffInstance = {
+  open: function (share) {
+    return reveal(share);
+  },
+  open_array: function (shares) {
+    return reveal(shares.slice());
+  }
+};
+
+async function previousFilterRel(inRel, keepRows) {
+  let newRel = [];
+  let newKeepRows = [];
+  for (let i = 0; i < inRel.length; i++) {
+    let keepRowVal = await methods.openValue(keepRows[i], jiffInstance);
+    if (keepRowVal > 0) {
+      newRel.push(inRel[i]);
+      newKeepRows.push(keepRows[i]);
+    }
+  }
+  return [newRel, newKeepRows];
+}
+
+async function measure(fn, inRel, keepRows) {
+  rounds = 0;
+  let start = Date.now();
+  let ret = await fn(inRel, keepRows, jiffInstance);
+  return [rounds, Date.now() - start, ret[0].length];
+}
+
+(async function () {
+  let numRows = Number(process.argv[2]);
+  let inRel = [];
+  let keepRows = [];
+  for (let i = 0; i < numRows; i++) {
+    inRel.push([i]);
+    keepRows.push(i % 2);
+  }
+
+  let before = await measure(previousFilterRel, inRel, keepRows);
+  let after = await measure(methods.filterRel, inRel, keepRows);
+  console.log([before.join(","), after.join(",")].join(","));
+})();
+"""
+
+
+def _run(num_rows: int, open_batch_size: int):
+
+    template = open(f"{templates_dir}/modules/methods.tmpl").read()
+    data = {"OPEN_BATCH_SIZE": open_batch_size, "SCAN_AGGREGATION": "false", "SORTING_NETWORK": "odd_even"}
+    with tempfile.TemporaryDirectory() as d:
+        with open(f"{d}/methods.js", "w") as f:
+            f.write(pystache.render(template, data))
+        with open(f"{d}/helpers.js", "w") as f:
+            f.write(open(f"{templates_dir}/modules/helpers.tmpl").read())
+        with open(f"{d}/driver.js", "w") as f:
+            f.write(DRIVER)
+        out = subprocess.check_output(["node", f"{d}/driver.js", str(num_rows)], cwd=d)
+
+    return [int(v) for v in out.decode().strip().split(",")]
+
+
+def run(num_rows: int, open_batch_sizes: list):
+
+    print(f"{'open batch size':<18}{'rounds before':>15}{'rounds after':>14}{'ms before':>11}{'ms after':>10}")
+    for b in open_batch_sizes:
+        before_rounds, before_ms, before_rows, after_rounds, after_ms, after_rows = _run(num_rows, b)
+        if before_rows != after_rows:
+            raise Exception(f"filterRel kept {after_rows} rows, expected {before_rows}.")
+        print(f"{b:<18}{before_rounds:>15}{after_rounds:>14}{before_ms:>11}{after_ms:>10}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--open-batch-sizes", type=int, nargs="+", default=[0, 100, 1000])
+    args = parser.parse_args()
+
+    run(args.rows, args.open_batch_sizes)
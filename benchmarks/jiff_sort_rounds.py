@@ -0,0 +1,228 @@
+import argparse
+import os
+import subprocess
+import tempfile
+import pystache
+
+
+"""
+Counts the communication rounds and messages needed by the JIFF oblivious sort, before
+(recursive odd-even mergesort awaiting each half in turn) and after (precomputed comparator
+layers, one barrier per layer) scheduling the network by layers, for both networks, and
+for a two party shuffle followed by the quicksort that reveals comparison outcomes.
+Runs methods.js under node against a mock jiff instance that keeps a logical clock: an
+interactive operation (comparison, multiplication, sharing or opening) is ready one round
+after its inputs, and end_barrier waits until everything issued since start_barrier is
+ready. Each interactive operation is counted as one message between every pair of parties.
+
+    python benchmarks/jiff_sort_rounds.py --rows 16 100 1000
+"""
+
+
+templates_dir = \
+    f"{os.path.dirname(os.path.realpath(__file__))}/../congregation/codegen/jiff/templates"
+
+
+DRIVER = """
+let methods = require('./methods');
+let helpers = require('./helpers');
+
+let now = 0;
+let messages = 0;
+let created = [];
+let barriers = [];
+
+class Share {
+  constructor(value, ready) {
+    this.value = value;
+    this.ready = ready;
+    created.push(this);
+  }
+  static _ready(others) {
+    return others.reduce((ready, o) => o instanceof Share ? Math.max(ready, o.ready) : ready, now);
+  }
+  static _value(o) {
+    return o instanceof Share ? o.value : o;
+  }
+  _interactive(value, others) {
+    messages++;
+    return new Share(value, Share._ready([this].concat(others)) + 1);
+  }
+  lt(o) {
+    return this._interactive(this.value < Share._value(o) ? 1 : 0, [o]);
+  }
+  eq(o) {
+    return this._interactive(this.value === Share._value(o) ? 1 : 0, [o]);
+  }
+  smult(o) {
+    return this._interactive(this.value * Share._value(o), [o]);
+  }
+  ssub(o) {
+    return new Share(this.value - Share._value(o), Share._ready([this, o]));
+  }
+  if_else(a, b) {
+    return this._interactive(this.value ? Share._value(a) : Share._value(b), [a, b]);
+  }
+  sadd(o) {
+    return new Share(this.value + Share._value(o), Share._ready([this, o]));
+  }
+  cadd(o) {
+    return new Share(this.value + o, Share._ready([this]));
+  }
+  cmult(o) {
+    return new Share(this.value * o, Share._ready([this]));
+  }
+  not() {
+    return new Share(1 - this.value, Share._ready([this]));
+  }
+}
+
+let jiffInstance = {
+  id: 1,
+  share_array: function (values, lengths, threshold, receivers, senders) {
+    let bits = values || methods._benesRoute(methods._randomPermutation(helpers.nextPowerOfTwo(numRows)));
+    messages += bits.length;
+    let ready = now + 1;
+    return Promise.resolve({[senders[0]]: bits.map(b => new Share(b, ready))});
+  },
+  open_array: function (shares) {
+    messages += shares.length;
+    now = Share._ready(shares) + 1;
+    return Promise.resolve(shares.map(s => s.value));
+  },
+  start_barrier: function () {
+    barriers.push(created.length);
+    return barriers.length - 1;
+  },
+  end_barrier: function () {
+    let start = barriers.pop();
+    now = Share._ready(created.slice(start));
+    return Promise.resolve();
+  }
+};
+
+async function previousOddEvenMerge(inRel, keepRows, keyCols, numCols, lo, n, r) {
+
+  let m = r * 2;
+  if (m < n) {
+    await previousOddEvenMerge(inRel, keepRows, keyCols, numCols, lo, n, m);
+    await previousOddEvenMerge(inRel, keepRows, keyCols, numCols, lo + r, n, m);
+
+    let start = lo + r;
+    let end = lo + n - r;
+    let steps = Math.floor((end - start) / m);
+    let chunks = Math.floor(steps / 20);
+    let bounds = [];
+    for (let i = 0; i < chunks; i++) {
+      bounds.push([start + (i * 20) * m, start + (i * 20) * m + 20 * m]);
+    }
+    bounds.push(chunks > 0 ? [start + chunks * 20 * m, end] : [start, end]);
+    for (let b = 0; b < bounds.length; b++) {
+      let loop = jiffInstance.start_barrier();
+      for (let i = bounds[b][0]; i < bounds[b][1]; i += m) {
+        methods.compareExchange(inRel, keepRows, keyCols, numCols, i, i + r);
+      }
+      await jiffInstance.end_barrier(loop);
+    }
+  } else {
+    methods.compareExchange(inRel, keepRows, keyCols, numCols, lo, lo + r);
+  }
+}
+
+async function previousOddEvenSort(inRel, keepRows, keyCols, numCols, lo, n) {
+
+  if (n > 1) {
+    let m = Math.floor(n / 2);
+    await previousOddEvenSort(inRel, keepRows, keyCols, numCols, lo, m);
+    await previousOddEvenSort(inRel, keepRows, keyCols, numCols, lo + m, m);
+    await previousOddEvenMerge(inRel, keepRows, keyCols, numCols, lo, n, 1);
+  }
+}
+
+async function measure(sort) {
+
+  now = 0;
+  messages = 0;
+  created = [];
+  let inRel = [];
+  let keepRows = [];
+  for (let i = 0; i < numRows; i++) {
+    inRel.push([new Share((i * 7919) % numRows, 0), new Share(i, 0)]);
+    keepRows.push(new Share(1, 0));
+  }
+  let sorted = await sort(inRel, keepRows);
+  if (sorted) {
+    inRel = sorted[0].filter((row, i) => sorted[1][i].value);
+    keepRows = sorted[1];
+  }
+
+  let rounds = Share._ready(inRel.map(row => row[0]).concat(keepRows));
+  for (let i = 1; i < inRel.length; i++) {
+    if (inRel[i - 1][0].value > inRel[i][0].value) {
+      throw new Error('relation is not sorted');
+    }
+  }
+  return [rounds, messages];
+}
+
+let numRows = Number(process.argv[2]);
+
+(async function () {
+  let previous = await measure(function (inRel, keepRows) {
+    return previousOddEvenSort(inRel, keepRows, [0], 2, 0, helpers.nextPowerOfTwo(numRows));
+  });
+  let oddEven = await measure(function (inRel, keepRows) {
+    return methods.networkSort(inRel, keepRows, 0, jiffInstance, 'odd_even');
+  });
+  let bitonic = await measure(function (inRel, keepRows) {
+    return methods.networkSort(inRel, keepRows, 0, jiffInstance, 'bitonic');
+  });
+  let shuffled = await measure(async function (inRel, keepRows) {
+    let shuffledRel = await methods.shuffle(inRel, keepRows, [1, 2], jiffInstance);
+    return methods.sort(shuffledRel[0], shuffledRel[1], 0, jiffInstance, 'shuffle');
+  });
+  console.log(previous.concat(oddEven, bitonic, shuffled).join(","));
+})();
+"""
+
+
+def _run(num_rows: int):
+
+    template = open(f"{templates_dir}/modules/methods.tmpl").read()
+    data = {"OPEN_BATCH_SIZE": 0, "SCAN_AGGREGATION": "false", "SORTING_NETWORK": "odd_even"}
+    with tempfile.TemporaryDirectory() as d:
+        with open(f"{d}/methods.js", "w") as f:
+            f.write(pystache.render(template, data))
+        with open(f"{d}/helpers.js", "w") as f:
+            f.write(open(f"{templates_dir}/modules/helpers.tmpl").read())
+        with open(f"{d}/driver.js", "w") as f:
+            f.write(DRIVER)
+        out = subprocess.check_output(["node", f"{d}/driver.js", str(num_rows)], cwd=d)
+
+    return [int(v) for v in out.decode().strip().split(",")]
+
+
+def run(rows: list):
+
+    print(
+        f"{'rows':<8}{'rounds before':>15}{'messages before':>17}"
+        f"{'odd-even rounds':>17}{'odd-even messages':>19}{'bitonic rounds':>16}{'bitonic messages':>18}"
+        f"{'shuffle rounds':>16}{'shuffle messages':>18}"
+    )
+    for n in rows:
+        before_rounds, before_messages, oe_rounds, oe_messages, bi_rounds, bi_messages, sh_rounds, sh_messages = \
+            _run(n)
+        print(
+            f"{n:<8}{before_rounds:>15}{before_messages:>17}"
+            f"{oe_rounds:>17}{oe_messages:>19}{bi_rounds:>16}{bi_messages:>18}"
+            f"{sh_rounds:>16}{sh_messages:>18}"
+        )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[16, 100, 1000])
+    args = parser.parse_args()
+
+    run(args.rows)
@@ -0,0 +1,72 @@
+from congregation.net.messages import *
+import argparse
+import pickle
+import time
+
+
+"""
+Compares the encode and decode throughput of the registered message codecs
+against pickle, for each message type and for a ConfigMsg with a large config.
+
+    python benchmarks/net_codecs.py --iterations 20000 --config-entries 10000
+"""
+
+
+def _msgs(config_entries: int):
+
+    config = {
+        "server_ip": "0.0.0.0",
+        "server_pid": 1,
+        "all_pids": [1, 2, 3],
+        "zp": 16777729,
+        "extensions": {"fixed_point": {"use": False}, "negative_number": {"use": False}, "big_number": {"use": False}}
+    }
+    large_config = dict(config, values={f"key_{i}": [i, str(i)] for i in range(config_entries)})
+
+    return [
+        ("IAMMsg", IAMMsg(1)),
+        ("ReadyMsg", ReadyMsg(1, "JIFF")),
+        ("ConfigMsg", ConfigMsg(1, config, "JIFF")),
+        ("ConfigMsg (large)", ConfigMsg(1, large_config, "JIFF")),
+        ("AckMsg", AckMsg(1, "CONFIG", "JIFF")),
+        ("RequestMsg", RequestMsg(1, "CONFIG", "JIFF"))
+    ]
+
+
+def _measure(fn, iterations: int):
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def run(iterations: int, config_entries: int):
+
+    codecs = [("pickle", pickle.dumps, lambda t, d: pickle.loads(d))]
+    for name in ["struct", "msgpack"]:
+        try:
+            c = get_codec(name)
+        except Exception:
+            print(f"codec {name} not available, skipping")
+            continue
+        codecs.append((name, c.encode, c.decode))
+
+    print(f"{'message':<20}{'codec':<10}{'bytes':>10}{'encode (msg/s)':>18}{'decode (msg/s)':>18}")
+    for msg_name, m in _msgs(config_entries):
+        n = iterations if "large" not in msg_name else max(1, iterations // 1000)
+        for codec_name, encode, decode in codecs:
+            data = encode(m)
+            enc = _measure(lambda: encode(m), n)
+            dec = _measure(lambda: decode(m.msg_type, data), n)
+            print(f"{msg_name:<20}{codec_name:<10}{len(data):>10}{enc:>18.0f}{dec:>18.0f}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--config-entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    run(args.iterations, args.config_entries)
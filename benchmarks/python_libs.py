@@ -0,0 +1,87 @@
+from congregation.codegen.python.libs import *
+import argparse
+import copy
+import random
+import time
+import tracemalloc
+
+
+"""
+Compares python backend operators against their previous (deepcopy or
+string keyed) versions, reporting wall time and peak allocated memory for each.
+
+    python benchmarks/python_libs.py --rows 1000000
+"""
+
+
+def _deepcopy_sort_by(rel: list, sort_by_col: int, increasing: bool = True):
+
+    ret = copy.deepcopy(rel)
+    ret.sort(key=lambda r: r[sort_by_col], reverse=not increasing)
+    return ret
+
+
+def _deepcopy_shuffle(rel: list):
+
+    ret = copy.deepcopy(rel)
+    random.shuffle(ret)
+    return ret
+
+
+def _deepcopy_variance_local_diff(rel: list):
+    return aggregate_variance_local_diff(copy.deepcopy(rel))
+
+
+def _string_key_distinct(rel: list, selected_cols: list):
+
+    d = set()
+    ret = []
+    for row in rel:
+        dist_keys = ",".join([str(row[i]) for i in selected_cols])
+        if dist_keys not in d:
+            d.add(dist_keys)
+            ret.append([row[i] for i in selected_cols])
+    return ret
+
+
+def _measure(fn, *args):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(num_rows: int, seed: int):
+
+    rng = random.Random(seed)
+    rel = [[rng.randint(0, 1000), rng.randint(0, 1000), rng.randint(0, 1000)] for _ in range(num_rows)]
+
+    cases = [
+        ("sort_by", _deepcopy_sort_by, sort_by, (2, True)),
+        ("shuffle", _deepcopy_shuffle, shuffle, ()),
+        ("aggregate_variance_local_diff", _deepcopy_variance_local_diff, aggregate_variance_local_diff, ()),
+        ("distinct", _string_key_distinct, distinct, ([0, 1],))
+    ]
+
+    print(f"{'operator':<32}{'previous (s)':>14}{'current (s)':>14}{'previous (MB)':>16}{'current (MB)':>16}")
+    for name, old_fn, new_fn, args in cases:
+        old_time, old_peak = _measure(old_fn, rel, *args)
+        new_time, new_peak = _measure(new_fn, rel, *args)
+        print(
+            f"{name:<32}{old_time:>14.3f}{new_time:>14.3f}"
+            f"{old_peak / 2 ** 20:>16.1f}{new_peak / 2 ** 20:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.rows, args.seed)
@@ -4,8 +4,10 @@ from congregation.codegen import JiffCodeGen, PythonCodeGen
 from congregation.comp import compile_dag, compile_dag_without_optimizations
 from congregation.config import Config, JiffConfig, CodeGenConfig, NetworkConfig
 from congregation.dag import Dag
+from congregation.dag.nodes.internal import Send
 from congregation.dispatch import JiffDispatcher, PythonDispatcher
-from congregation.net import Peer
+from congregation.codegen.python.libs.cache import enable_rel_cache, disable_rel_cache
+from congregation.net import Peer, get_peer
 from congregation.part import HeuristicPart
 
 
@@ -18,7 +20,14 @@ class Assemble:
         if cfg is not None:
             net_cfg = NetworkConfig(
                 cfg["general"]["pid"],
-                cfg["network"]["parties"]
+                cfg["network"]["parties"],
+                cfg["network"]["codec"] if "codec" in cfg["network"] else None,
+                cfg["network"]["transfer_compression"] if "transfer_compression" in cfg["network"] else None,
+                cfg["network"]["transfer_chunk_size"] if "transfer_chunk_size" in cfg["network"] else None,
+                cfg["network"]["retry_initial"] if "retry_initial" in cfg["network"] else None,
+                cfg["network"]["retry_max"] if "retry_max" in cfg["network"] else None,
+                cfg["network"]["connect_deadline"] if "connect_deadline" in cfg["network"] else None,
+                cfg["network"]["happy_eyeballs_delay"] if "happy_eyeballs_delay" in cfg["network"] else None
             )
         else:
             net_cfg = NetworkConfig.from_env()
@@ -37,7 +46,12 @@ class Assemble:
                 cfg["general"]["data_path"],
                 cfg["general"]["data_path"],
                 cfg["general"]["delimiter"] if "delimiter" in cfg["general"] else ",",
-                cfg["general"]["use_floats"] if "use_floats" in cfg["general"] else False
+                cfg["general"]["use_floats"] if "use_floats" in cfg["general"] else False,
+                cfg["general"]["engine"] if "engine" in cfg["general"] else None,
+                cfg["general"]["quantile_error"] if "quantile_error" in cfg["general"] else None,
+                cfg["general"]["batch_size"] if "batch_size" in cfg["general"] else None,
+                cfg["general"]["intermediate_format"] if "intermediate_format" in cfg["general"] else None,
+                cfg["general"]["in_process"] if "in_process" in cfg["general"] else None
             )
         else:
             cg_cfg = CodeGenConfig.from_env()
@@ -58,7 +72,11 @@ class Assemble:
                     "server_port": cfg["jiff"]["server_port"],
                     "server_pid": cfg["jiff"]["server_pid"],
                     "zp": cfg["jiff"]["zp"] if "zp" in cfg["jiff"] else None,
-                    "extensions": cfg["jiff"]["extensions"] if "extensions" in cfg["jiff"] else None
+                    "extensions": cfg["jiff"]["extensions"] if "extensions" in cfg["jiff"] else None,
+                    "open_batch_size": cfg["jiff"]["open_batch_size"] if "open_batch_size" in cfg["jiff"] else None,
+                    "scan_aggregation": cfg["jiff"]["scan_aggregation"] if "scan_aggregation" in cfg["jiff"] else None,
+                    "sorting_network": cfg["jiff"]["sorting_network"] if "sorting_network" in cfg["jiff"] else None,
+                    "preprocessing": cfg["jiff"]["preprocessing"] if "preprocessing" in cfg["jiff"] else None
                 }
             )
         else:
@@ -103,12 +121,18 @@ class Assemble:
 
     def _involves_this_party(self, d: Dag):
         """
-        Look at input DAG and see if it involves data that we're holding
+        Look at input DAG and see if it involves data that we're holding,
+        or that is sent to us
         """
         for r in d.roots:
             for ps in r.out_rel.stored_with:
                 if self.config.system_configs['CODEGEN'].pid in ps:
                     return True
+        for n in d.top_sort():
+            if isinstance(n, Send):
+                for ps in n.out_rel.stored_with:
+                    if self.config.system_configs['CODEGEN'].pid in ps:
+                        return True
         return False
 
     def generate_code(self, parts: list):
@@ -183,26 +207,37 @@ class Assemble:
         return job_queue
 
     def setup_peer(self):
+        """
+        the peer (and its connections to other parties) is reused by later
+        workflows run with the same network config in this process
+        """
 
         loop = asyncio.get_event_loop()
-        peer = Peer(loop, self.config)
-        peer.connect_to_others()
-
-        return peer
+        return get_peer(loop, self.config)
 
     def dispatch_jobs(self, job_queue: list, networked_peer: Peer):
+        """
+        python jobs run in process share relations through the relation cache for the
+        duration of this call only, so that a long-lived process doesn't keep the
+        intermediate relations of every workflow it has run
+        """
 
         dispatchers = {
             "JIFF": JiffDispatcher,
             "PYTHON": PythonDispatcher
         }
 
-        for j in job_queue:
-            try:
-                dispatcher = dispatchers[j.job_type](networked_peer, self.config)
-                dispatcher.dispatch(j)
-            except KeyError:
-                print(f"No dispatcher found for job type {j.job_type}")
+        if self.config.system_configs["CODEGEN"].in_process:
+            enable_rel_cache()
+        try:
+            for j in job_queue:
+                try:
+                    dispatcher = dispatchers[j.job_type](networked_peer, self.config)
+                    dispatcher.dispatch(j)
+                except KeyError:
+                    print(f"No dispatcher found for job type {j.job_type}")
+        finally:
+            disable_rel_cache()
 
     def generate_and_dispatch(
             self,
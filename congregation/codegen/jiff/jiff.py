@@ -24,7 +24,7 @@ class JiffCodeGen(CodeGen):
 
         ret = dict()
         ret["helpers.js"] = open(f"{self.templates_dir}/modules/helpers.tmpl").read()
-        ret["methods.js"] = open(f"{self.templates_dir}/modules/methods.tmpl").read()
+        ret["methods.js"] = self._generate_methods()
         ret["mpc.js"] = self._generate_mpc()
         ret["party.js"] = self._generate_party()
         ret["server.js"] = self._generate_server()
@@ -33,6 +33,16 @@ class JiffCodeGen(CodeGen):
 
         return ret
 
+    def _generate_methods(self):
+
+        template = open(f"{self.templates_dir}/modules/methods.tmpl").read()
+        data = {
+            "OPEN_BATCH_SIZE": self.codegen_config.open_batch_size,
+            "SCAN_AGGREGATION": str(self.codegen_config.scan_aggregation).lower(),
+            "SORTING_NETWORK": self.codegen_config.sorting_network
+        }
+        return pystache.render(template, data)
+
     def _generate_mpc(self):
 
         template = open(f"{self.templates_dir}/mpc/mpc.tmpl").read()
@@ -52,6 +62,8 @@ class JiffCodeGen(CodeGen):
                 else "",
             "SHARE_STR": self._generate_share(),
             "INPUTS_STR": self._generate_inputs(),
+            "COST_CODE": self._generate_costs(),
+            "PREPROCESSING_STR": self._generate_preprocessing(),
             "OP_CODE": super()._generate_code()
         }
 
@@ -73,6 +85,8 @@ class JiffCodeGen(CodeGen):
                 if self.codegen_config.extensions["fixed_point"]["use"]
                 else "",
             "WRITE": 1,
+            "OUTPUT_FORMAT": self.codegen_config.intermediate_format,
+            "USE_FLOATS": int(self.codegen_config.use_floats),
             "OUTPUT_PATH": self._get_output_path(),
             "HEADERS": self._get_output_header(),
             "SERVER_IP_PORT": f"http://{self.codegen_config.server_ip}:{self.codegen_config.server_port}",
@@ -126,7 +140,16 @@ class JiffCodeGen(CodeGen):
         if not isinstance(ordered[-1], Open):
             raise Exception(f"Terminal node of MPC job not Open(). Is type {type(ordered[-1])}")
 
-        return f"{self.codegen_config.output_path}/{ordered[-1].out_rel.name}.csv"
+        return self._intermediate_path(self.codegen_config.output_path, ordered[-1].out_rel.name)
+
+    def _intermediate_path(self, dir_path: str, rel_name: str):
+        """
+        csv intermediates are single files, npy intermediates are directories with one file per column
+        """
+
+        if self.codegen_config.intermediate_format == "csv":
+            return f"{dir_path}/{rel_name}.csv"
+        return f"{dir_path}/{rel_name}_{self.codegen_config.intermediate_format}"
 
     def _get_output_header(self):
 
@@ -195,7 +218,7 @@ class JiffCodeGen(CodeGen):
         # generate a share string with the file path set to null
         if close_node.holding_party == self.codegen_config.pid:
             template = open(f"{self.templates_dir}/mpc/share/share_plaintext.tmpl").read()
-            data["FILE_PATH"] = f"{self.codegen_config.input_path}/{close_node.out_rel.name}.csv"
+            data["FILE_PATH"] = self._intermediate_path(self.codegen_config.input_path, close_node.out_rel.name)
         else:
             template = open(f"{self.templates_dir}/mpc/share/share_plaintext_null.tmpl").read()
 
@@ -255,6 +278,94 @@ class JiffCodeGen(CodeGen):
 
         return ret
 
+    def _generate_preprocessing(self):
+
+        if not self.codegen_config.preprocessing:
+            return ""
+
+        template = open(f"{self.templates_dir}/mpc/preprocessing.tmpl").read()
+        data = {
+            "ROWS": ", ".join(f'"{r.out_rel.name}": {r.out_rel.name}.length' for r in self.sorted_roots)
+        }
+
+        return pystache.render(template, data)
+
+    def _generate_costs(self):
+        """
+        the number of rows of each relation is only known once the inputs are shared, so
+        this generates a call to the methods.costs function of each node, which counts the
+        operations it will run given the number of rows in its inputs
+        """
+
+        ret = ""
+        for node in self.dag.top_sort():
+            if node in self.dag.roots:
+                continue
+            ret += f'    rows["{node.out_rel.name}"] = {self._cost(node)};\n'
+
+        return ret
+
+    def _cost(self, node: OpNode):
+
+        if isinstance(node, Concat):
+            return " + ".join(f'rows["{r.name}"]' for r in node.get_in_rels())
+        if isinstance(node, Join):
+            left_rows = f'rows["{node.get_left_in_rel().name}"]'
+            right_rows = f'rows["{node.get_right_in_rel().name}"]'
+            num_key_cols = len(node.left_join_cols)
+            if node.unique_keys is None:
+                return f"methods.costs.join(counts, {left_rows}, {right_rows}, {num_key_cols})"
+            unique_rel = node.get_left_in_rel() if node.unique_keys == "left" else node.get_right_in_rel()
+            return \
+                f"methods.costs.sortMergeJoin(counts, {left_rows}, {right_rows}, {num_key_cols}, " \
+                f"{len(node.out_rel.columns)}, {len(unique_rel.columns) - num_key_cols})"
+
+        in_rows = f'rows["{node.get_in_rel().name}"]'
+        num_cols = len(node.get_in_rel().columns)
+        if isinstance(node, AggregateCount):
+            return f"methods.costs.aggregateCount(counts, {in_rows}, {len(node.group_cols)})"
+        if isinstance(node, AggregateSum):
+            return f"methods.costs.aggregateSum(counts, {in_rows}, {len(node.group_cols)})"
+        if isinstance(node, ColSum):
+            return f"methods.costs.aggregateSum(counts, {in_rows}, 0)"
+        if isinstance(node, AggregateMean):
+            return f"methods.costs.aggregateMean(counts, {in_rows}, {len(node.group_cols)})"
+        if isinstance(node, (AggregateStdDev, AggregateVariance)):
+            return \
+                f"methods.costs.aggregateStdDev(counts, {in_rows}, {len(node.group_cols)}, " \
+                f"{str(not node.push_down_optimized).lower()}, {str(not node.push_up_optimized).lower()})"
+        if isinstance(node, MinMaxMedian):
+            return f"methods.costs.minMaxMedian(counts, {in_rows}, {num_cols}, {self._sort_strategy(node)})"
+        if isinstance(node, Deciles):
+            return f"methods.costs.deciles(counts, {in_rows}, {num_cols}, {self._sort_strategy(node)})"
+        if isinstance(node, AllStats):
+            return \
+                f"methods.costs.allStats(counts, {in_rows}, {num_cols}, {len(node.group_cols)}, " \
+                f"{str(not node.push_up_optimized).lower()})"
+        if isinstance(node, Multiply):
+            data = self._generate_arithmetic_commutative(node)
+            return f"methods.costs.multiply(counts, {in_rows}, {len(data['COL_OPERANDS'])}, {data['NEW_COL']})"
+        if isinstance(node, Divide):
+            data = self._generate_arithmetic_non_commutative(node)
+            return f"methods.costs.divide(counts, {in_rows}, {data['OPERANDS']}, {data['NEW_COL']})"
+        if isinstance(node, Limit):
+            return f"Math.min({in_rows}, {node.num})"
+        if isinstance(node, Distinct):
+            return f"methods.costs.distinct(counts, {in_rows}, {len(node.selected_cols)})"
+        if isinstance(node, FilterAgainstCol):
+            return f"methods.costs.filter(counts, {in_rows}, '{node.operator}', true)"
+        if isinstance(node, FilterAgainstScalar):
+            return f"methods.costs.filter(counts, {in_rows}, '{node.operator}', false)"
+        if isinstance(node, SortBy):
+            return f"methods.costs.sort(counts, {in_rows}, {num_cols}, 1, {self._sort_strategy(node)})"
+        if isinstance(node, NumRows):
+            return "methods.costs.numRows(counts)"
+        if isinstance(node, Shuffle):
+            return f"methods.costs.shuffle(counts, {in_rows}, {num_cols}, {len(self.codegen_config.all_pids)})"
+
+        # project, add, subtract and open run no interactive operations
+        return in_rows
+
     def generate_job(self):
         return JiffJob(self.job_name, self.codegen_config.code_path)
 
@@ -267,30 +378,33 @@ class JiffCodeGen(CodeGen):
 
         return ""
 
-    def _generate_aggregate_count(self, node: AggregateCount):
+    @staticmethod
+    def _key_cols_arg(key_cols: list):
+        """
+        key columns are passed to the JIFF methods as an array of column indices,
+        which are compared lexicographically, or null if there are none
+        """
 
-        if len(node.group_cols) > 1:
-            raise Exception("Multiple key columns for aggregation in JIFF not yet implemented.")
+        return "null" if len(key_cols) == 0 else [c.idx for c in key_cols]
+
+    def _generate_aggregate_count(self, node: AggregateCount):
 
         template = open(f"{self.templates_dir}/mpc/methods/agg_count.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0]
+            "KEY_COL": self._key_cols_arg(node.group_cols)
         }
 
         return pystache.render(template, data)
 
     def _generate_aggregate_sum(self, node: AggregateSum):
 
-        if len(node.group_cols) > 1:
-            raise Exception("Multiple key columns for aggregation in JIFF not yet implemented.")
-
         template = open(f"{self.templates_dir}/mpc/methods/agg_sum.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0],
+            "KEY_COL": self._key_cols_arg(node.group_cols),
             "AGG_COL": node.agg_col.idx
         }
 
@@ -298,14 +412,11 @@ class JiffCodeGen(CodeGen):
 
     def _generate_aggregate_mean(self, node: AggregateMean):
 
-        if len(node.group_cols) > 1:
-            raise Exception("Multiple key columns for aggregation in JIFF not yet implemented.")
-
         template = open(f"{self.templates_dir}/mpc/methods/agg_mean.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0],
+            "KEY_COL": self._key_cols_arg(node.group_cols),
             "AGG_COL": node.agg_col.idx,
             "COUNT_COL": 1 if node.with_count_col else 0
         }
@@ -314,14 +425,11 @@ class JiffCodeGen(CodeGen):
 
     def _generate_aggregate_std_dev(self, node: AggregateStdDev):
 
-        if len(node.group_cols) > 1:
-            raise Exception("Multiple key columns for aggregation in JIFF not yet implemented.")
-
         template = open(f"{self.templates_dir}/mpc/methods/agg_std_dev.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0],
+            "KEY_COL": self._key_cols_arg(node.group_cols),
             "AGG_COL": node.agg_col.idx,
             "SQUARES_COL": "null" if not node.push_down_optimized else len(node.get_in_rel().columns) - 2,
             "COUNT_COL": "null" if not node.push_down_optimized else len(node.get_in_rel().columns) - 1,
@@ -332,14 +440,11 @@ class JiffCodeGen(CodeGen):
 
     def _generate_aggregate_variance(self, node: AggregateVariance):
 
-        if len(node.group_cols) > 1:
-            raise Exception("Multiple key columns for aggregation in JIFF not yet implemented.")
-
         template = open(f"{self.templates_dir}/mpc/methods/agg_variance.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0],
+            "KEY_COL": self._key_cols_arg(node.group_cols),
             "AGG_COL": node.agg_col.idx,
             "SQUARES_COL": "null" if not node.push_down_optimized else len(node.get_in_rel().columns) - 2,
             "COUNT_COL": "null" if not node.push_down_optimized else len(node.get_in_rel().columns) - 1,
@@ -357,8 +462,9 @@ class JiffCodeGen(CodeGen):
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols][0],
-            "AGG_COL": node.agg_col.idx
+            "KEY_COL": self._key_cols_arg(node.group_cols),
+            "AGG_COL": node.agg_col.idx,
+            "STRATEGY": self._sort_strategy(node)
         }
 
         return pystache.render(template, data)
@@ -372,22 +478,20 @@ class JiffCodeGen(CodeGen):
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols[0]],
-            "AGG_COL": node.agg_col.idx
+            "KEY_COL": self._key_cols_arg(node.group_cols),
+            "AGG_COL": node.agg_col.idx,
+            "STRATEGY": self._sort_strategy(node)
         }
 
         return pystache.render(template, data)
 
     def _generate_all_stats(self, node: AllStats):
 
-        if node.group_cols:
-            raise Exception("Group cols for all stats operation not yet implemented.")
-
         template = open(f"{self.templates_dir}/mpc/methods/all_stats.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": "null" if len(node.group_cols) == 0 else [n.idx for n in node.group_cols[0]],
+            "KEY_COL": self._key_cols_arg(node.group_cols),
             "AGG_COL": node.agg_col.idx,
             "DO_DIFF_FLAG": "true" if not node.push_up_optimized else "false"
         }
@@ -487,19 +591,12 @@ class JiffCodeGen(CodeGen):
         return pystache.render(template, data)
 
     def _generate_distinct(self, node: Distinct):
-        """
-        TODO: Need to extend this to support selected_col_names list of size > 1. Right now,
-         we require size == 1 because the oddEvenSort() method is limited to a single column.
-        """
-
-        if len(node.selected_cols) != 1:
-            raise Exception("Distinct operator does not yet support more than one selected column.")
 
         template = open(f"{self.templates_dir}/mpc/methods/distinct.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": node.selected_cols[0].idx
+            "KEY_COL": self._key_cols_arg(node.selected_cols)
         }
 
         return pystache.render(template, data)
@@ -532,15 +629,27 @@ class JiffCodeGen(CodeGen):
 
     def _generate_sort_by(self, node: SortBy):
 
-        template = open(f"{self.templates_dir}/mpc/methods/odd_even_sort.tmpl").read()
+        template = open(f"{self.templates_dir}/mpc/methods/sort.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "IN_REL": node.get_in_rel().name,
-            "KEY_COL": node.sort_by_col.idx
+            "KEY_COL": node.sort_by_col.idx,
+            "STRATEGY": self._sort_strategy(node),
+            "INCREASING": str(node.increasing is not False).lower()
         }
 
         return pystache.render(template, data)
 
+    def _sort_strategy(self, node: [SortBy, MinMaxMedian, Deciles]):
+        """
+        all sorts go through methods.sort. inputs that were obliviously shuffled by the
+        compiler are sorted by revealing comparisons, others use the configured sorting network
+        """
+
+        if isinstance(node.parent, Shuffle):
+            return "'shuffle'"
+        return f"'{self.codegen_config.sorting_network}'"
+
     def _generate_num_rows(self, node: NumRows):
 
         template = open(f"{self.templates_dir}/mpc/methods/num_rows.tmpl").read()
@@ -556,16 +665,19 @@ class JiffCodeGen(CodeGen):
 
     def _generate_join(self, node: Join):
 
-        if len(node.left_join_cols) > 1 or len(node.right_join_cols) > 1:
-            raise Exception("Join operator does not yet support more than one key column.")
-
-        template = open(f"{self.templates_dir}/mpc/methods/join.tmpl").read()
+        # the sort-merge join needs one input with unique keys, otherwise the
+        # output can be quadratic in size and we fall back to a cross product
+        if node.unique_keys is not None:
+            template = open(f"{self.templates_dir}/mpc/methods/sort_merge_join.tmpl").read()
+        else:
+            template = open(f"{self.templates_dir}/mpc/methods/join.tmpl").read()
         data = {
             "OUT_REL": node.out_rel.name,
             "LEFT_IN_REL": node.get_left_in_rel().name,
             "RIGHT_IN_REL": node.get_right_in_rel().name,
-            "LEFT_KEY": [n.idx for n in node.left_join_cols][0],
-            "RIGHT_KEY": [n.idx for n in node.right_join_cols][0]
+            "LEFT_KEY": self._key_cols_arg(node.left_join_cols),
+            "RIGHT_KEY": self._key_cols_arg(node.right_join_cols),
+            "UNIQUE_KEYS": node.unique_keys
         }
 
         return pystache.render(template, data)
@@ -597,7 +709,15 @@ class JiffCodeGen(CodeGen):
         raise Exception("Index node encountered during Jiff code generation.")
 
     def _generate_shuffle(self, node: Shuffle):
-        raise Exception("Shuffle node encountered during Jiff code generation.")
+
+        template = open(f"{self.templates_dir}/mpc/methods/shuffle.tmpl").read()
+        data = {
+            "OUT_REL": node.out_rel.name,
+            "IN_REL": node.get_in_rel().name,
+            "COMPUTE_PARTIES": self.codegen_config.all_pids
+        }
+
+        return pystache.render(template, data)
 
     def _generate_open(self, node: Open):
 
@@ -1,3 +1,4 @@
 from congregation.codegen.python.libs.external import *
 from congregation.codegen.python.libs.internal import *
 from congregation.codegen.python.libs.utils import *
+from congregation.codegen.python.libs.stream import *
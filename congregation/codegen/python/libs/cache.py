@@ -0,0 +1,71 @@
+import os
+
+
+"""
+In-process relation cache. When python jobs are executed in the same process
+(see PythonDispatcher), relations written to disk by one job are also kept here
+(while Assemble.dispatch_jobs runs, after which the cache is cleared),
+so that a later job reading the same file gets them back without re-parsing it.
+Files are still written, since MPC jobs and other parties read them from disk.
+Entries are keyed by real path and are only returned while the file on disk is
+unchanged, so outputs rewritten by other processes (e.g. JIFF jobs) are re-read.
+Cached relations are shared rather than copied when they're read with the type
+they were written with (see _cast_cached_rel in each engine), which relies on
+library functions never mutating their input relations. Otherwise their values
+are converted as a csv round trip would convert them.
+"""
+
+
+_rel_cache = {
+    "enabled": False,
+    "entries": {}
+}
+
+
+def enable_rel_cache():
+    _rel_cache["enabled"] = True
+
+
+def disable_rel_cache():
+
+    _rel_cache["enabled"] = False
+    _rel_cache["entries"] = {}
+
+
+def _file_version(path: str):
+
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def cache_put(path: str, rel, use_floats: [bool, None]):
+    """
+    record a relation that was just written to path, along
+    with the use_floats flag its values were written with
+    """
+
+    if _rel_cache["enabled"]:
+        _rel_cache["entries"][os.path.realpath(path)] = (_file_version(path), use_floats, rel)
+
+
+def cache_get(path: str):
+    """
+    return (use_floats, rel) for a relation previously written to path,
+    or None if there is no entry or the file has changed since
+    """
+
+    if not _rel_cache["enabled"]:
+        return None
+
+    key = os.path.realpath(path)
+    entry = _rel_cache["entries"].get(key)
+    if entry is None:
+        return None
+    try:
+        if _file_version(path) != entry[0]:
+            del _rel_cache["entries"][key]
+            return None
+    except OSError:
+        return None
+
+    return entry[1], entry[2]
@@ -0,0 +1,3 @@
+from congregation.codegen.python.libs.columnar.external import *
+from congregation.codegen.python.libs.columnar.internal import *
+from congregation.codegen.python.libs.columnar.utils import *
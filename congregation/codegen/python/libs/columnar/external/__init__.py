@@ -0,0 +1,3 @@
+from congregation.codegen.python.libs.columnar.external.unary import *
+from congregation.codegen.python.libs.columnar.external.binary import *
+from congregation.codegen.python.libs.columnar.external.nary import *
@@ -0,0 +1,50 @@
+import numpy as np
+from congregation.codegen.python.libs.columnar.utils import *
+
+
+def _key_ids(left_keys: list, right_keys: list):
+    """
+    map the (possibly multi-column) join keys of both relations onto
+    a shared set of integer ids, so rows can be matched on a single column
+    """
+
+    num_left = len(left_keys[0])
+    stacked = np.column_stack([np.concatenate([lk, rk]) for lk, rk in zip(left_keys, right_keys)])
+    _, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    return inverse[:num_left], inverse[num_left:]
+
+
+def join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+
+    left_non_key = [left_rel[i] for i in range(len(left_rel)) if i not in left_join_cols]
+    right_non_key = [right_rel[i] for i in range(len(right_rel)) if i not in right_join_cols]
+
+    if rel_len(left_rel) == 0 or rel_len(right_rel) == 0:
+        return \
+            [left_rel[i][:0] for i in left_join_cols] + \
+            [c[:0] for c in left_non_key] + \
+            [c[:0] for c in right_non_key]
+
+    left_ids, right_ids = _key_ids(
+        [left_rel[i] for i in left_join_cols],
+        [right_rel[i] for i in right_join_cols]
+    )
+
+    # group right rows by key id, keeping their original order within a key
+    right_order = np.argsort(right_ids, kind="stable")
+    num_ids = max(left_ids.max(), right_ids.max()) + 1
+    right_counts = np.bincount(right_ids, minlength=num_ids)
+    right_starts = np.cumsum(right_counts) - right_counts
+
+    # emit matches left row by left row, which is the order a nested loop join produces
+    counts = right_counts[left_ids]
+    left_idx = np.repeat(np.arange(len(left_ids)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    right_idx = right_order[np.repeat(right_starts[left_ids], counts) + offsets]
+
+    return \
+        [left_rel[i][left_idx] for i in left_join_cols] + \
+        [c[left_idx] for c in left_non_key] + \
+        [c[right_idx] for c in right_non_key]
@@ -0,0 +1,5 @@
+import numpy as np
+
+
+def concat(rels: list):
+    return [np.concatenate(cols) for cols in zip(*rels)]
@@ -0,0 +1,334 @@
+import numpy as np
+from typing import List
+from congregation.codegen.python.libs.columnar.utils import *
+
+
+def create(path_to_rel: str, use_floats: [bool, None] = False):
+    return read_rel(path_to_rel, use_floats=use_floats)
+
+
+def aggregate_count(rel: list, group_cols: list):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    counts = group_count(inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + [counts]
+
+
+def aggregate_sum(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    sums = group_sum(rel[agg_col], inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + [sums]
+
+
+def aggregate_mean(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    sums = group_sum(rel[agg_col], inverse, len(first_idx))
+    counts = group_count(inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + [sums / counts]
+
+
+def _exact_variance(vals: np.ndarray, inverse: np.ndarray, num_groups: int, counts: np.ndarray):
+    """
+    integer columns are summed exactly (in int64 when the sum of squares can't
+    overflow it, and as python ints otherwise), and each group's variance is
+    derived from those sums with a single rounding, as in the list engine (see
+    Accumulator.variance), so that both engines agree bit for bit
+    """
+
+    overflows = len(vals) > 0 and int(np.abs(vals).max()) ** 2 * len(vals) >= 2 ** 63
+    exact = vals.astype(object) if overflows else vals.astype(np.int64)
+    _n = counts.astype(object)
+    _sum = group_sum(exact, inverse, num_groups).astype(object)
+    _sum_squares = group_sum(exact * exact, inverse, num_groups).astype(object)
+
+    return ((_n * _sum_squares - _sum * _sum) / (_n * _n)).astype(np.float64)
+
+
+def _aggregate_variance(rel: list, inverse: np.ndarray, num_groups: int, agg_col: int):
+    """
+    float columns use a two pass variance: squared deviations are
+    taken from each group's mean rather than from zero
+    """
+
+    vals = rel[agg_col]
+    _count = group_count(inverse, num_groups)
+    if vals.dtype.kind in "iu":
+        return _exact_variance(vals, inverse, num_groups, _count)
+    _mean = group_sum(vals, inverse, num_groups) / _count
+    _dev = vals - _mean[inverse]
+
+    return group_sum(_dev * _dev, inverse, num_groups) / _count
+
+
+def aggregate_variance(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    variance = _aggregate_variance(rel, inverse, len(first_idx), agg_col)
+
+    return group_keys(rel, group_cols, first_idx) + [variance]
+
+
+def aggregate_std_dev(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    variance = _aggregate_variance(rel, inverse, len(first_idx), agg_col)
+
+    return group_keys(rel, group_cols, first_idx) + [np.sqrt(variance)]
+
+
+def _order_stats(vals: np.ndarray, inverse: np.ndarray, counts: np.ndarray, positions: list):
+    """
+    return, for each array of per-group positions, the values that sit at those
+    positions within each group once it is sorted. groups are selected from with
+    np.partition, unless there are so many small groups that a single lexsort
+    over the whole column is cheaper than a python loop over them
+    """
+
+    num_groups = len(counts)
+    starts = np.cumsum(counts) - counts
+
+    if num_groups * 64 > len(vals):
+        sorted_vals = vals[np.lexsort((vals, inverse))]
+        return [sorted_vals[starts + p] for p in positions]
+
+    grouped = vals[np.argsort(inverse, kind="stable")]
+    ret = [np.empty(num_groups, dtype=vals.dtype) for _ in positions]
+    for g in range(num_groups):
+        kth = [int(p[g]) for p in positions]
+        part = np.partition(grouped[starts[g]:starts[g] + counts[g]], kth)
+        for out, k in zip(ret, kth):
+            out[g] = part[k]
+
+    return ret
+
+
+def _median_positions(counts: np.ndarray):
+    return [counts // 2]
+
+
+def _decile_positions(counts: np.ndarray):
+
+    ds = [.1, .2, .3, .4, .5, .6, .7, .8, .9]
+    return [(counts * d).astype(np.int64) for d in ds]
+
+
+def _min_max(vals: np.ndarray, inverse: np.ndarray, num_groups: int):
+
+    mins = np.full(num_groups, vals.max() if len(vals) else 0, dtype=vals.dtype)
+    maxs = np.full(num_groups, vals.min() if len(vals) else 0, dtype=vals.dtype)
+    np.minimum.at(mins, inverse, vals)
+    np.maximum.at(maxs, inverse, vals)
+
+    return [mins, maxs]
+
+
+def min_max_median(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
+    """
+    quantile_error is accepted for parity with the list engine. results
+    here are always exact, which trivially satisfies any error bound
+    """
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    counts = group_count(inverse, len(first_idx))
+    vals = rel[agg_col]
+
+    return \
+        group_keys(rel, group_cols, first_idx) + \
+        _min_max(vals, inverse, len(first_idx)) + \
+        _order_stats(vals, inverse, counts, _median_positions(counts))
+
+
+def deciles(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    counts = group_count(inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + \
+        _order_stats(rel[agg_col], inverse, counts, _decile_positions(counts))
+
+
+def all_stats(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    num_groups = len(first_idx)
+    vals = rel[agg_col]
+
+    _sum = group_sum(vals, inverse, num_groups)
+    _count = group_count(inverse, num_groups)
+    _mean = _sum / _count
+    _variance = _aggregate_variance(rel, inverse, num_groups, agg_col)
+    _std_dev = np.sqrt(_variance)
+    _order = _order_stats(vals, inverse, _count, _median_positions(_count) + _decile_positions(_count))
+
+    return \
+        [_sum, _mean, _variance, _std_dev] + \
+        _min_max(vals, inverse, num_groups) + \
+        _order + \
+        [_count]
+
+
+def project(rel: list, selected_cols: list):
+    return [rel[idx] for idx in selected_cols]
+
+
+def _check_target_col(rel: list, target_col_idx: int):
+
+    if target_col_idx > len(rel):
+        raise Exception(
+            f"Input relation has only {len(rel)} columns. "
+            f"Can't add column with idx {target_col_idx}."
+        )
+
+
+def _with_target(rel: list, target_col_idx: int, col: np.ndarray):
+
+    if len(rel) == target_col_idx:
+        return rel + [col]
+    else:
+        return rel[:target_col_idx] + [col] + rel[target_col_idx + 1:]
+
+
+def add(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
+
+    _check_target_col(rel, target_col_idx)
+
+    col_sum = np.zeros(rel_len(rel), dtype=np.int64)
+    for i in col_operands:
+        col_sum = col_sum + rel[i]
+    res = col_sum + sum(scalar_operands)
+    if len(rel) != target_col_idx:
+        res = res + rel[target_col_idx]
+
+    return _with_target(rel, target_col_idx, res)
+
+
+def _operand_col(rel: list, o: dict):
+    return rel[o["v"]] if o["__TYPE__"] == "col" else np.full(rel_len(rel), o["v"])
+
+
+def _sub_cols(cols: list, n: int):
+
+    if len(cols) == 0:
+        return np.zeros(n, dtype=np.int64)
+
+    ret = cols[0]
+    for c in cols[1:]:
+        ret = ret - c
+    return ret
+
+
+def subtract(rel: list, operands: List[dict], target_col_idx: int):
+
+    _check_target_col(rel, target_col_idx)
+
+    vals = [_operand_col(rel, o) for o in operands]
+    if len(rel) != target_col_idx:
+        vals = [rel[target_col_idx]] + vals
+
+    return _with_target(rel, target_col_idx, _sub_cols(vals, rel_len(rel)))
+
+
+def multiply(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
+
+    _check_target_col(rel, target_col_idx)
+
+    col_product = np.ones(rel_len(rel), dtype=np.int64)
+    for i in col_operands:
+        col_product = col_product * rel[i]
+    scalar_product = 1
+    for s in scalar_operands:
+        scalar_product = scalar_product * s
+    res = col_product * scalar_product
+    if len(rel) != target_col_idx:
+        res = res * rel[target_col_idx]
+
+    return _with_target(rel, target_col_idx, res)
+
+
+def _divide_cols(cols: list, n: int):
+
+    if len(cols) == 0:
+        return np.zeros(n, dtype=np.int64)
+
+    ret = cols[0]
+    for c in cols[1:]:
+        ret = np.true_divide(ret, c)
+    return ret
+
+
+def divide(rel: list, operands: List[dict], target_col_idx: int):
+
+    _check_target_col(rel, target_col_idx)
+
+    vals = [_operand_col(rel, o) for o in operands]
+    if len(rel) != target_col_idx:
+        vals = [rel[target_col_idx]] + vals
+
+    return _with_target(rel, target_col_idx, _divide_cols(vals, rel_len(rel)))
+
+
+def limit(rel: list, n: int):
+    return [col[:n] for col in rel]
+
+
+def distinct(rel: list, selected_cols: list):
+
+    first_idx, _ = group_rows(rel, selected_cols)
+    return group_keys(rel, selected_cols, first_idx)
+
+
+def _compare(left: np.ndarray, right: [np.ndarray, int, float], operator: str):
+
+    if operator == "<":
+        return left < right
+    elif operator == ">":
+        return left > right
+    elif operator == "==":
+        return left == right
+    elif operator == "<=":
+        return left <= right
+    elif operator == ">=":
+        return left >= right
+    else:
+        raise Exception(f"Unknown operator: {operator}")
+
+
+def filter_against_col(rel: list, filter_col: int, against_col: int, operator: str):
+
+    mask = _compare(rel[filter_col], rel[against_col], operator)
+    return [col[mask] for col in rel]
+
+
+def filter_against_scalar(rel: list, filter_col: int, scalar: [int, float], operator: str):
+
+    if operator not in ["<", ">", "=="]:
+        raise Exception(f"Unknown operator: {operator}")
+
+    mask = _compare(rel[filter_col], scalar, operator)
+    return [col[mask] for col in rel]
+
+
+def sort_by(rel: list, sort_by_col: int, increasing: bool = True):
+
+    if increasing:
+        order = np.argsort(rel[sort_by_col], kind="stable")
+    else:
+        # stable descending sort that keeps equal keys in
+        # their original order, like list.sort(reverse=True)
+        rev = np.arange(rel_len(rel))[::-1]
+        order = rev[np.argsort(rel[sort_by_col][rev], kind="stable")][::-1]
+
+    return [col[order] for col in rel]
+
+
+def num_rows(rel: list):
+    return [np.array([rel_len(rel)], dtype=np.int64)]
+
+
+def collect(rel: list, header: list, output_path: str):
+    write_rel(output_path, rel, header)
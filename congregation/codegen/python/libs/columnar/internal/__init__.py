@@ -0,0 +1 @@
+from congregation.codegen.python.libs.columnar.internal.unary import *
@@ -0,0 +1,171 @@
+from congregation.codegen.python.libs.columnar.utils import *
+from congregation.net.transfer import run_transfer, send_columns, receive_columns, exchange_columns
+import numpy as np
+
+
+def store(rel: list, header: list, output_path: str):
+    write_rel(output_path, rel, header)
+
+
+def read(path_to_rel: str, use_floats: [bool, None] = False):
+    return read_rel(path_to_rel, use_floats=use_floats)
+
+
+def persist(rel: list, header: list, output_path: str):
+    write_rel(output_path, rel, header)
+
+
+def store_npy(rel: list, header: list, output_path: str):
+    write_rel_npy(output_path, rel, header)
+
+
+def read_npy(path_to_rel: str, use_floats: [bool, None] = False):
+    return read_rel_npy(path_to_rel, use_floats=use_floats)
+
+
+def persist_npy(rel: list, header: list, output_path: str):
+    write_rel_npy(output_path, rel, header)
+
+
+WIRE_DTYPES = {"q": "<i8", "d": "<f8"}
+
+
+def _send_cols(rel: list):
+    """
+    columns are sent as is (without copying them) when they're already little-endian
+    and contiguous, which is the case for the int64 / float64 columns of this engine
+    """
+
+    typs = ["d" if col.dtype.kind == "f" else "q" for col in rel]
+    return [(typ, np.ascontiguousarray(col, dtype=WIRE_DTYPES[typ])) for typ, col in zip(typs, rel)]
+
+
+def _received_rel(received: list):
+    """
+    columns are read in place from the buffers they were received into, and
+    the relations received from each party are concatenated in order of their pids
+    """
+
+    rels = [
+        [np.frombuffer(col, dtype=WIRE_DTYPES[typ]).astype(WIRE_DTYPES[typ][1:], copy=False)
+         for typ, col in zip(r.types, r.columns)]
+        for r in received
+    ]
+    return rels[0] if len(rels) == 1 else [np.concatenate(cols) for cols in zip(*rels)]
+
+
+def send(
+        rel: list,
+        header: list,
+        host: str,
+        port: int,
+        name: str,
+        pid: int,
+        compress_level: [int, None] = None,
+        chunk_size: [int, None] = None,
+        retry_initial: [float, None] = None,
+        retry_max: [float, None] = None,
+        connect_deadline: [float, None] = None
+):
+
+    run_transfer(send_columns(
+        host, port, name, pid, header, _send_cols(rel), rel_len(rel),
+        compress_level, chunk_size, retry_initial, retry_max, connect_deadline
+    ))
+
+
+def receive(pid: int, port: int, name: str, num_senders: int):
+    return _received_rel(run_transfer(receive_columns(pid, port, name, num_senders)))
+
+
+def send_receive(
+        rel: list,
+        header: list,
+        targets: list,
+        name: str,
+        pid: int,
+        port: int,
+        num_senders: int,
+        compress_level: [int, None] = None,
+        chunk_size: [int, None] = None,
+        retry_initial: [float, None] = None,
+        retry_max: [float, None] = None,
+        connect_deadline: [float, None] = None
+):
+    """
+    send rel to each (host, port) in targets while receiving from num_senders parties
+    """
+
+    cols = _send_cols(rel)
+    sending = [
+        send_columns(
+            host, target_port, name, pid, header, cols, rel_len(rel),
+            compress_level, chunk_size, retry_initial, retry_max, connect_deadline
+        )
+        for host, target_port in targets
+    ]
+    return _received_rel(run_transfer(exchange_columns(receive_columns(pid, port, name, num_senders), sending)))
+
+
+def index(rel: list):
+    return rel + [np.arange(rel_len(rel), dtype=np.int64)]
+
+
+def shuffle(rel: list):
+
+    perm = np.random.default_rng().permutation(rel_len(rel))
+    return [col[perm] for col in rel]
+
+
+def aggregate_sum_count_col(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    sums = group_sum(rel[agg_col], inverse, len(first_idx))
+    counts = group_count(inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + [sums, counts]
+
+
+def aggregate_sum_squares_and_count(rel: list, group_cols: list, agg_col: int):
+
+    first_idx, inverse = group_rows(rel, group_cols)
+    sums = group_sum(rel[agg_col], inverse, len(first_idx))
+    squares = group_sum(rel[agg_col].astype(np.float64) ** 2, inverse, len(first_idx))
+    counts = group_count(inverse, len(first_idx))
+
+    return group_keys(rel, group_cols, first_idx) + [sums, squares, counts]
+
+
+def _std_dev_local_sqrt(mean_col: np.ndarray, mean_squares_col: np.ndarray):
+    return np.sqrt(mean_squares_col - mean_col * mean_col)
+
+
+def aggregate_std_dev_local_sqrt(rel: list):
+    return rel[:-2] + [_std_dev_local_sqrt(rel[-2], rel[-1])]
+
+
+def _variance_local_diff(mean_col: np.ndarray, mean_squares_col: np.ndarray):
+    return mean_squares_col - mean_col * mean_col
+
+
+def aggregate_variance_local_diff(rel: list):
+    return rel[:-2] + [_variance_local_diff(rel[-2], rel[-1])]
+
+
+def all_stats_local_sqrt(rel: list):
+
+    var = _variance_local_diff(rel[-17], rel[-16])
+    sd = _std_dev_local_sqrt(rel[-15], rel[-14])
+
+    return rel[:-17] + [var, sd] + rel[-13:]
+
+
+def col_sum(rel: list):
+    """
+    the sums of an empty relation are an empty relation, since the
+    list engine can't tell how many columns an empty relation has
+    """
+
+    if rel_len(rel) == 0:
+        return [col[:0] for col in rel]
+    return [np.array([sequential_sum(col)]) for col in rel]
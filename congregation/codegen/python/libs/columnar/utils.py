@@ -0,0 +1,191 @@
+from congregation.codegen.python.libs.cache import *
+import numpy as np
+import os
+
+
+"""
+Relations in the columnar engine are lists of one-dimensional numpy arrays,
+one array per column. Columns keep their own dtype (int64 or float64), so
+integer columns stay integral even after a float column is appended to the
+same relation. Functions in this engine never mutate their input arrays,
+which lets operators like project() share columns instead of copying them.
+"""
+
+
+def from_rows(rows: list, num_cols: [int, None] = None):
+
+    if not rows:
+        return [np.array([], dtype=np.int64) for _ in range(num_cols if num_cols is not None else 0)]
+    return [np.array(col) for col in zip(*rows)]
+
+
+def to_rows(rel: list):
+    return [list(row) for row in zip(*[col.tolist() for col in rel])]
+
+
+def rel_len(rel: list):
+    return len(rel[0]) if rel else 0
+
+
+def _format_col(col: np.ndarray, use_floats: [bool, None] = False):
+
+    if not use_floats:
+        return [str(v) for v in col.astype(np.int64).tolist()]
+    else:
+        return [str(v) for v in col.astype(np.float64).tolist()]
+
+
+def write_rel(output_path: str, rel: list, header: list, use_floats: [bool, None] = False):
+
+    print(f"Writing python job output to {output_path}")
+    with open(output_path, "w") as f:
+
+        f.write(f"{','.join(header)}\n")
+        formatted_cols = [_format_col(col, use_floats) for col in rel]
+        f.write("\n".join(",".join(r) for r in zip(*formatted_cols)))
+
+    cache_put(output_path, rel, use_floats)
+
+
+def _parse_rows(lines: list, use_floats: [bool, None] = False):
+    """
+    slow path for inputs that np.loadtxt rejects, mirrors the row
+    by row parsing (and skipping of invalid rows) in the list engine
+    """
+
+    rows = []
+    for row in lines:
+        try:
+            if not use_floats:
+                rows.append([int(float(v)) for v in row.split(",")])
+            else:
+                rows.append([float(v) for v in row.split(",")])
+        except ValueError:
+            typ_str = "float" if use_floats else "int"
+            print(f"Encountered an invalid value for {typ_str} conversion in the following row: {row}")
+            pass
+    return rows
+
+
+def _cast_cached_rel(rel: list, written_floats: [bool, None], use_floats: [bool, None]):
+    """
+    convert columns the same way writing them to csv and reading them back would
+    """
+
+    write_dtype = np.float64 if written_floats else np.int64
+    read_dtype = np.float64 if use_floats else np.int64
+    return [col.astype(write_dtype, copy=False).astype(read_dtype, copy=False) for col in rel]
+
+
+def read_rel(input_path: str, use_floats: [bool, None] = False):
+
+    cached = cache_get(input_path)
+    if cached is not None:
+        print(f"Python reading input from {input_path} (cached)")
+        return _cast_cached_rel(cached[1], cached[0], use_floats)
+
+    print(f"Python reading input from {input_path}")
+    with open(input_path, "r") as f:
+        header = f.readline()
+        print(f"Skipping header: {header}")
+        lines = f.read().splitlines()
+
+    num_cols = len(header.split(","))
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return from_rows([], num_cols)
+    try:
+        data = np.loadtxt(lines, delimiter=",", dtype=np.float64, ndmin=2)
+    except ValueError:
+        return from_rows(_parse_rows(lines, use_floats), num_cols)
+
+    if not use_floats:
+        # truncate towards zero, same as int(float(v))
+        data = data.astype(np.int64)
+    return [np.ascontiguousarray(data[:, i]) for i in range(data.shape[1])]
+
+
+def write_rel_npy(output_path: str, rel: list, header: list, use_floats: [bool, None] = None):
+    """
+    same on-disk layout as the list engine: a directory holding one .npy
+    file per column, along with a header file. if use_floats is None,
+    each column keeps its dtype
+    """
+
+    print(f"Writing python job output to {output_path}")
+    os.makedirs(output_path, exist_ok=True)
+    with open(f"{output_path}/header", "w") as f:
+        f.write(",".join(header))
+
+    for i, col in enumerate(rel):
+        if use_floats is not None:
+            col = col.astype(np.float64 if use_floats else np.int64, copy=False)
+        np.save(f"{output_path}/{i}.npy", col)
+
+
+def read_rel_npy(input_path: str, use_floats: [bool, None] = False):
+    """
+    columns are memory-mapped rather than read, and since nothing in this
+    engine mutates its inputs they can be used without copying
+    """
+
+    print(f"Python reading input from {input_path}")
+    with open(f"{input_path}/header", "r") as f:
+        num_cols = len(f.read().split(","))
+
+    dtype = np.float64 if use_floats else np.int64
+    return [
+        np.load(f"{input_path}/{i}.npy", mmap_mode="r").astype(dtype, copy=False)
+        for i in range(num_cols)
+    ]
+
+
+def group_rows(rel: list, group_cols: list):
+    """
+    columnar counterpart to construct_acc_dict. returns the index of the first
+    row of each group and an array mapping each row to its group index. groups
+    are numbered in order of first appearance, which matches the insertion
+    order of the dictionary built by the list engine.
+    """
+
+    n = rel_len(rel)
+    if n == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    if not group_cols:
+        return np.array([0], dtype=np.int64), np.zeros(n, dtype=np.int64)
+
+    keys = np.column_stack([rel[i] for i in group_cols])
+    _, first_idx, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    order = np.argsort(first_idx, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return first_idx[order], rank[inverse]
+
+
+def group_keys(rel: list, group_cols: list, first_idx: np.ndarray):
+    return [rel[i][first_idx] for i in group_cols]
+
+
+def group_sum(vals: np.ndarray, inverse: np.ndarray, num_groups: int):
+    """
+    np.add.at accumulates unbuffered and in row order, so float sums
+    are rounded exactly like the sequential sums in the list engine
+    """
+
+    ret = np.zeros(num_groups, dtype=vals.dtype)
+    np.add.at(ret, inverse, vals)
+    return ret
+
+
+def group_count(inverse: np.ndarray, num_groups: int):
+    return np.bincount(inverse, minlength=num_groups).astype(np.int64)
+
+
+def sequential_sum(col: np.ndarray):
+
+    if len(col) == 0:
+        return col.dtype.type(0)
+    return np.cumsum(col)[-1]
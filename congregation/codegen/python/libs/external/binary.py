@@ -1,15 +1,122 @@
+def _non_key_cols(rel: list, join_cols: list):
 
+    if not rel:
+        return []
+    join_cols = set(join_cols)
+    return [i for i in range(len(rel[0])) if i not in join_cols]
+
+
+def _is_sorted_on(rel: list, join_cols: list):
+
+    prev = None
+    for row in rel:
+        k = tuple(row[i] for i in join_cols)
+        if prev is not None and k < prev:
+            return False
+        prev = k
+    return True
 
-def join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+
+def hash_join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+    """
+    build a hash table over the smaller input and probe it with the
+    larger one. rows are emitted left row by left row, and within each
+    left row in right relation order, i.e. in nested loop join order
+    """
+
+    left_non_key = _non_key_cols(left_rel, left_join_cols)
+    right_non_key = _non_key_cols(right_rel, right_join_cols)
 
     ret = []
-    for lrow in left_rel:
-        lvals = [lrow[i] for i in left_join_cols]
-        non_key_lvals = [lrow[i] for i in range(len(lrow)) if i not in left_join_cols]
+    if len(right_rel) <= len(left_rel):
+
+        table = {}
         for rrow in right_rel:
-            rvals = [rrow[i] for i in right_join_cols]
-            if lvals == rvals:
-                non_key_rvals = [rrow[i] for i in range(len(rrow)) if i not in right_join_cols]
-                new_row = lvals + non_key_lvals + non_key_rvals
-                ret.append(new_row)
+            k = tuple(rrow[i] for i in right_join_cols)
+            table.setdefault(k, []).append([rrow[i] for i in right_non_key])
+
+        for lrow in left_rel:
+            matches = table.get(tuple(lrow[i] for i in left_join_cols))
+            if matches is None:
+                continue
+            lvals = [lrow[i] for i in left_join_cols] + [lrow[i] for i in left_non_key]
+            for non_key_rvals in matches:
+                ret.append(lvals + non_key_rvals)
+
+    else:
+
+        table = {}
+        for idx, lrow in enumerate(left_rel):
+            k = tuple(lrow[i] for i in left_join_cols)
+            table.setdefault(k, []).append(idx)
+
+        matches = [[] for _ in range(len(left_rel))]
+        for rrow in right_rel:
+            left_idxs = table.get(tuple(rrow[i] for i in right_join_cols))
+            if left_idxs is None:
+                continue
+            non_key_rvals = [rrow[i] for i in right_non_key]
+            for idx in left_idxs:
+                matches[idx].append(non_key_rvals)
+
+        for lrow, lmatches in zip(left_rel, matches):
+            if not lmatches:
+                continue
+            lvals = [lrow[i] for i in left_join_cols] + [lrow[i] for i in left_non_key]
+            for non_key_rvals in lmatches:
+                ret.append(lvals + non_key_rvals)
+
     return ret
+
+
+def merge_join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+    """
+    join two relations that are both sorted in increasing order on
+    their join columns. output order matches nested loop join order
+    """
+
+    left_non_key = _non_key_cols(left_rel, left_join_cols)
+    right_non_key = _non_key_cols(right_rel, right_join_cols)
+
+    right_keys = [tuple(rrow[i] for i in right_join_cols) for rrow in right_rel]
+
+    ret = []
+    r = 0
+    num_right = len(right_rel)
+    group_key, group = None, []
+    for lrow in left_rel:
+
+        lk = tuple(lrow[i] for i in left_join_cols)
+        if lk != group_key:
+            # left keys only increase, so the current right group can be
+            # dropped once we've moved past it and never needs revisiting
+            group_key, group = lk, []
+            while r < num_right and right_keys[r] < lk:
+                r += 1
+            while r < num_right and right_keys[r] == lk:
+                group.append([right_rel[r][i] for i in right_non_key])
+                r += 1
+
+        if not group:
+            continue
+        lvals = list(lk) + [lrow[i] for i in left_non_key]
+        for non_key_rvals in group:
+            ret.append(lvals + non_key_rvals)
+
+    return ret
+
+
+def join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+    """
+    equi-join two relations. output rows consist of the left join columns,
+    followed by the non-key columns from the left relation and then the
+    non-key columns from the right relation. uses a merge join when both
+    inputs are already sorted on their join columns, and a hash join otherwise
+    """
+
+    if len(left_rel) == 0 or len(right_rel) == 0:
+        return []
+
+    if _is_sorted_on(left_rel, left_join_cols) and _is_sorted_on(right_rel, right_join_cols):
+        return merge_join(left_rel, right_rel, left_join_cols, right_join_cols)
+    return hash_join(left_rel, right_rel, left_join_cols, right_join_cols)
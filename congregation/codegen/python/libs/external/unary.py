@@ -1,6 +1,5 @@
 import math
 from typing import List
-from copy import deepcopy
 from congregation.codegen.python.libs.utils import *
 
 
@@ -8,8 +7,8 @@ def create(path_to_rel: str, use_floats: [bool, None] = False):
     return read_rel(path_to_rel, use_floats=use_floats)
 
 
-def _aggregate_count(entry: dict):
-    return entry["__COUNT__"]
+def _aggregate_count(entry: Accumulator):
+    return entry.count
 
 
 def aggregate_count(rel: list, group_cols: list):
@@ -17,8 +16,7 @@ def aggregate_count(rel: list, group_cols: list):
     acc = construct_acc_dict(
         rel,
         group_cols,
-        None,
-        include_count=True
+        None
     )
 
     ret = []
@@ -28,8 +26,8 @@ def aggregate_count(rel: list, group_cols: list):
     return ret
 
 
-def _aggregate_sum(entry: dict):
-    return entry["__SUM__"]
+def _aggregate_sum(entry: Accumulator):
+    return entry.sum
 
 
 def aggregate_sum(rel: list, group_cols: list, agg_col: int):
@@ -37,8 +35,7 @@ def aggregate_sum(rel: list, group_cols: list, agg_col: int):
     acc = construct_acc_dict(
         rel,
         group_cols,
-        agg_col,
-        include_sum=True
+        agg_col
     )
 
     ret = []
@@ -48,8 +45,8 @@ def aggregate_sum(rel: list, group_cols: list, agg_col: int):
     return ret
 
 
-def _aggregate_mean(entry: dict):
-    return entry["__SUM__"] / entry["__COUNT__"]
+def _aggregate_mean(entry: Accumulator):
+    return entry.sum / entry.count
 
 
 def aggregate_mean(rel: list, group_cols: list, agg_col: int):
@@ -57,9 +54,7 @@ def aggregate_mean(rel: list, group_cols: list, agg_col: int):
     acc = construct_acc_dict(
         rel,
         group_cols,
-        agg_col,
-        include_sum=True,
-        include_count=True
+        agg_col
     )
 
     ret = []
@@ -69,19 +64,8 @@ def aggregate_mean(rel: list, group_cols: list, agg_col: int):
     return ret
 
 
-def _aggregate_variance(entry: dict):
-
-    _count = entry["__COUNT__"]
-    _sum = entry["__SUM__"]
-    _values = entry["__VALUES__"]
-
-    _mean = _sum / _count
-    _mean_squared = math.pow(_mean, 2)
-    _sum_squares = sum([math.pow(v, 2) for v in _values])
-    _sum_squares_mean = _sum_squares / _count
-    _variance = _sum_squares_mean - _mean_squared
-
-    return _variance
+def _aggregate_variance(entry: Accumulator):
+    return entry.variance()
 
 
 def aggregate_variance(rel: list, group_cols: list, agg_col: int):
@@ -90,9 +74,7 @@ def aggregate_variance(rel: list, group_cols: list, agg_col: int):
         rel,
         group_cols,
         agg_col,
-        include_sum=True,
-        include_count=True,
-        include_values=True
+        include_moments=True
     )
 
     ret = []
@@ -102,7 +84,7 @@ def aggregate_variance(rel: list, group_cols: list, agg_col: int):
     return ret
 
 
-def _aggregate_std_dev(entry: dict):
+def _aggregate_std_dev(entry: Accumulator):
     return math.sqrt(_aggregate_variance(entry))
 
 
@@ -112,9 +94,7 @@ def aggregate_std_dev(rel: list, group_cols: list, agg_col: int):
         rel,
         group_cols,
         agg_col,
-        include_sum=True,
-        include_values=True,
-        include_count=True
+        include_moments=True
     )
 
     ret = []
@@ -124,22 +104,28 @@ def aggregate_std_dev(rel: list, group_cols: list, agg_col: int):
     return ret
 
 
-def _min_max_median(entry: dict):
+def _median_position(n: int):
+    return int(n / 2)
+
 
-    _values = entry["__VALUES__"]
-    _values.sort()
-    middle_idx = int(len(_values) / 2)
+def _decile_positions(n: int):
+
+    ds = [.1, .2, .3, .4, .5, .6, .7, .8, .9]
+    return [int(n * d) for d in ds]
 
-    return [_values[0], _values[-1], _values[middle_idx]]
 
+def _min_max_median(entry: Accumulator):
+    return entry.min_max() + entry.select_positions([_median_position(entry.count)])
 
-def min_max_median(rel: list, group_cols: list, agg_col: int):
+
+def min_max_median(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
 
     acc = construct_acc_dict(
         rel,
         group_cols,
         agg_col,
-        include_values=True
+        include_values=True,
+        quantile_error=quantile_error
     )
 
     ret = []
@@ -149,28 +135,18 @@ def min_max_median(rel: list, group_cols: list, agg_col: int):
     return ret
 
 
-def _deciles(entry: dict):
-
-    _values = entry["__VALUES__"]
-    _values.sort()
-
-    ret = []
-    ds = [.1, .2, .3, .4, .5, .6, .7, .8, .9]
+def _deciles(entry: Accumulator):
+    return entry.select_positions(_decile_positions(entry.count))
 
-    for d in ds:
-        d_idx = int(len(_values) * d)
-        ret.append(_values[d_idx])
-
-    return ret
 
-
-def deciles(rel: list, group_cols: list, agg_col: int):
+def deciles(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
 
     acc = construct_acc_dict(
         rel,
         group_cols,
         agg_col,
-        include_values=True
+        include_values=True,
+        quantile_error=quantile_error
     )
 
     ret = []
@@ -188,11 +164,14 @@ def _all_stats(acc: dict):
         _sum = _aggregate_sum(acc[k])
         _mean = _aggregate_mean(acc[k])
         _variance = _aggregate_variance(acc[k])
-        _std_dev = _aggregate_std_dev(acc[k])
-        _mmm = _min_max_median(acc[k])
-        _dcs = _deciles(acc[k])
+        _std_dev = math.sqrt(_variance)
         _count = _aggregate_count(acc[k])
 
+        # select the median and deciles together so the values are only partitioned once
+        _order_stats = acc[k].select_positions([_median_position(_count)] + _decile_positions(_count))
+        _mmm = acc[k].min_max() + _order_stats[:1]
+        _dcs = _order_stats[1:]
+
         ret.append(
             [_sum, _mean, _variance, _std_dev] +
             _mmm +
@@ -203,63 +182,61 @@ def _all_stats(acc: dict):
     return ret
 
 
-def all_stats(rel: list, group_cols: list, agg_col: int):
+def all_stats(rel: list, group_cols: list, agg_col: int, quantile_error: [float, None] = None):
 
     return _all_stats(
         construct_acc_dict(
             rel,
             group_cols,
             agg_col,
-            include_sum=True,
-            include_count=True,
-            include_values=True
+            include_moments=True,
+            include_values=True,
+            quantile_error=quantile_error
         )
     )
 
 
+def project_row(row: list, selected_cols: list):
+    return [row[idx] for idx in selected_cols]
+
+
 def project(rel: list, selected_cols: list):
-    return [[row[idx] for idx in selected_cols] for row in rel]
+    return [project_row(row, selected_cols) for row in rel]
 
 
-def _add_new_col(rel: list, col_operands: list, scalar_operands: list):
+def _check_target_width(num_cols: int, target_col_idx: int):
 
-    ret = []
-    for row in rel:
-        col_sum = sum([row[i] for i in col_operands])
-        scalar_sum = sum(scalar_operands)
-        ret.append(row + [col_sum + scalar_sum])
-    return ret
+    if target_col_idx > num_cols:
+        raise Exception(
+            f"Input relation has only {num_cols} columns. "
+            f"Can't add column with idx {target_col_idx}."
+        )
 
 
-def _add(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
+def _check_target_col(rel: list, target_col_idx: int):
+    _check_target_width(len(rel[0]), target_col_idx)
 
-    ret = []
-    for row in rel:
-        col_sum = sum([row[i] for i in col_operands])
-        scalar_sum = sum(scalar_operands)
-        ret.append(
-            [
-                row[i]
-                if i != target_col_idx
-                else sum([col_sum, scalar_sum, row[target_col_idx]])
-                for i in range(len(row))
-            ]
-        )
+
+def _replace_col(row: list, target_col_idx: int, v: [int, float]):
+
+    ret = list(row)
+    ret[target_col_idx] = v
     return ret
 
 
-def add(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
+def add_row(row: list, col_operands: list, scalar_operands: list, target_col_idx: int):
 
-    if target_col_idx > len(rel[0]):
-        raise Exception(
-            f"Input relation has only {len(rel[0])} columns. "
-            f"Can't add column with idx {target_col_idx}."
-        )
+    col_sum = sum([row[i] for i in col_operands])
+    scalar_sum = sum(scalar_operands)
+    if len(row) == target_col_idx:
+        return row + [col_sum + scalar_sum]
+    return _replace_col(row, target_col_idx, sum([col_sum, scalar_sum, row[target_col_idx]]))
+
+
+def add(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
 
-    if len(rel[0]) == target_col_idx:
-        return _add_new_col(rel, col_operands, scalar_operands)
-    else:
-        return _add(rel, col_operands, scalar_operands, target_col_idx)
+    _check_target_col(rel, target_col_idx)
+    return [add_row(row, col_operands, scalar_operands, target_col_idx) for row in rel]
 
 
 def _sub_list(li: list):
@@ -273,85 +250,37 @@ def _sub_list(li: list):
     return ret
 
 
-def _subtract_new_col(rel: list, operands: List[dict]):
-
-    ret = []
-    for row in rel:
-        vals = [row[o["v"]] if o["__TYPE__"] == "col" else o["v"] for o in operands]
-        sub_result = _sub_list(vals)
-        ret.append(row + [sub_result])
-    return ret
+def _operand_vals(row: list, operands: List[dict]):
+    return [row[o["v"]] if o["__TYPE__"] == "col" else o["v"] for o in operands]
 
 
-def _subtract(rel: list, operands: List[dict], target_col_idx: int):
+def subtract_row(row: list, operands: List[dict], target_col_idx: int):
 
-    ret = []
-    for row in rel:
-        vals = [row[o["v"]] if o["__TYPE__"] == "col" else o["v"] for o in operands]
-        ret.append(
-            [
-                row[i]
-                if i != target_col_idx
-                else _sub_list([row[target_col_idx]] + vals)
-                for i in range(len(row))
-            ]
-        )
-    return ret
+    vals = _operand_vals(row, operands)
+    if len(row) == target_col_idx:
+        return row + [_sub_list(vals)]
+    return _replace_col(row, target_col_idx, _sub_list([row[target_col_idx]] + vals))
 
 
 def subtract(rel: list, operands: List[dict], target_col_idx: int):
 
-    if target_col_idx > len(rel[0]):
-        raise Exception(
-            f"Input relation has only {len(rel[0])} columns. "
-            f"Can't add column with idx {target_col_idx}."
-        )
-
-    if len(rel[0]) == target_col_idx:
-        return _subtract_new_col(rel, operands)
-    else:
-        return _subtract(rel, operands, target_col_idx)
-
-
-def _multiply_new_col(rel: list, col_operands: list, scalar_operands: list):
-
-    ret = []
-    for row in rel:
-        col_product = math.prod([row[i] for i in col_operands])
-        scalar_product = math.prod(scalar_operands)
-        ret.append(row + [col_product * scalar_product])
-    return ret
+    _check_target_col(rel, target_col_idx)
+    return [subtract_row(row, operands, target_col_idx) for row in rel]
 
 
-def _multiply(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
+def multiply_row(row: list, col_operands: list, scalar_operands: list, target_col_idx: int):
 
-    ret = []
-    for row in rel:
-        col_product = math.prod([row[i] for i in col_operands])
-        scalar_product = math.prod(scalar_operands)
-        ret.append(
-            [
-                row[i]
-                if i != target_col_idx
-                else math.prod([col_product, scalar_product, row[target_col_idx]])
-                for i in range(len(row))
-            ]
-        )
-    return ret
+    col_product = math.prod([row[i] for i in col_operands])
+    scalar_product = math.prod(scalar_operands)
+    if len(row) == target_col_idx:
+        return row + [col_product * scalar_product]
+    return _replace_col(row, target_col_idx, math.prod([col_product, scalar_product, row[target_col_idx]]))
 
 
 def multiply(rel: list, col_operands: list, scalar_operands: list, target_col_idx: int):
 
-    if target_col_idx > len(rel[0]):
-        raise Exception(
-            f"Input relation has only {len(rel[0])} columns. "
-            f"Can't add column with idx {target_col_idx}."
-        )
-
-    if len(rel[0]) == target_col_idx:
-        return _multiply_new_col(rel, col_operands, scalar_operands)
-    else:
-        return _multiply(rel, col_operands, scalar_operands, target_col_idx)
+    _check_target_col(rel, target_col_idx)
+    return [multiply_row(row, col_operands, scalar_operands, target_col_idx) for row in rel]
 
 
 def _divide_list(li: list):
@@ -365,53 +294,18 @@ def _divide_list(li: list):
     return ret
 
 
-def _divide_new_col(rel: list, operands: List[dict]):
-
-    ret = []
-    for row in rel:
-        vals = [
-            row[o["v"]]
-            if o["__TYPE__"] == "col"
-            else o["v"] for o in operands
-        ]
-        div_result = _divide_list(vals)
-        ret.append(row + [div_result])
-    return ret
-
-
-def _divide(rel: list, operands: List[dict], target_col_idx: int):
+def divide_row(row: list, operands: List[dict], target_col_idx: int):
 
-    ret = []
-    for row in rel:
-        vals = [
-            row[o["v"]]
-            if o["__TYPE__"] == "col"
-            else o["v"]
-            for o in operands
-        ]
-        ret.append(
-            [
-                row[i]
-                if i != target_col_idx
-                else _divide_list([row[target_col_idx]] + vals)
-                for i in range(len(row))
-            ]
-        )
-    return ret
+    vals = _operand_vals(row, operands)
+    if len(row) == target_col_idx:
+        return row + [_divide_list(vals)]
+    return _replace_col(row, target_col_idx, _divide_list([row[target_col_idx]] + vals))
 
 
 def divide(rel: list, operands: List[dict], target_col_idx: int):
 
-    if target_col_idx > len(rel[0]):
-        raise Exception(
-            f"Input relation has only {len(rel[0])} columns. "
-            f"Can't add column with idx {target_col_idx}."
-        )
-
-    if len(rel[0]) == target_col_idx:
-        return _divide_new_col(rel, operands)
-    else:
-        return _divide(rel, operands, target_col_idx)
+    _check_target_col(rel, target_col_idx)
+    return [divide_row(row, operands, target_col_idx) for row in rel]
 
 
 def limit(rel: list, n: int):
@@ -419,126 +313,110 @@ def limit(rel: list, n: int):
 
 
 def distinct(rel: list, selected_cols: list):
+    """
+    rows are keyed on tuples of their selected values, and returned in order of
+    first occurrence. keys compare by value, so an int and a float holding the
+    same number (e.g. 1 and 1.0, which are written to csv alike, and which the
+    columnar engine's distinct doesn't tell apart either) are the same key
+    """
 
-    d = set()
-    ret = []
-
-    for row in rel:
-        dist_keys = ",".join([str(row[i]) for i in selected_cols])
-        if dist_keys not in d:
-            d.add(dist_keys)
-            ret.append([row[i] for i in selected_cols])
-    return ret
-
+    keys = dict.fromkeys(map(tuple_key(selected_cols), rel))
+    return [list(k) for k in keys]
 
-def _filter_against_col_lt(rel: list, filter_col: int, against_col: int):
 
-    ret = []
-    for row in rel:
-        if row[filter_col] < row[against_col]:
-            ret.append(row)
-    return ret
+_COL_COMPARISONS = {
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "==": lambda a, b: a == b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b
+}
 
 
-def _filter_against_col_lteq(rel: list, filter_col: int, against_col: int):
+_SCALAR_COMPARISONS = {
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "==": lambda a, b: a == b
+}
 
-    ret = []
-    for row in rel:
-        if row[filter_col] <= row[against_col]:
-            ret.append(row)
-    return ret
 
+def _comparison(comparisons: dict, operator: str):
 
-def _filter_against_col_gt(rel: list, filter_col: int, against_col: int):
+    if operator not in comparisons:
+        raise Exception(f"Unknown operator: {operator}")
+    return comparisons[operator]
 
-    ret = []
-    for row in rel:
-        if row[filter_col] > row[against_col]:
-            ret.append(row)
-    return ret
 
+def filter_against_col_row(row: list, filter_col: int, against_col: int, operator: str):
+    return _comparison(_COL_COMPARISONS, operator)(row[filter_col], row[against_col])
 
-def _filter_against_col_gteq(rel: list, filter_col: int, against_col: int):
 
-    ret = []
-    for row in rel:
-        if row[filter_col] >= row[against_col]:
-            ret.append(row)
-    return ret
+def filter_against_scalar_row(row: list, filter_col: int, scalar: [int, float], operator: str):
+    return _comparison(_SCALAR_COMPARISONS, operator)(row[filter_col], scalar)
 
 
-def _filter_against_col_eq(rel: list, filter_col: int, against_col: int):
+def filter_against_col(rel: list, filter_col: int, against_col: int, operator: str):
 
-    ret = []
-    for row in rel:
-        if row[filter_col] == row[against_col]:
-            ret.append(row)
-    return ret
+    _comparison(_COL_COMPARISONS, operator)
+    return [row for row in rel if filter_against_col_row(row, filter_col, against_col, operator)]
 
 
-def filter_against_col(rel: list, filter_col: int, against_col: int, operator: str):
+def filter_against_scalar(rel: list, filter_col: int, scalar: [int, float], operator: str):
 
-    if operator == "<":
-        return _filter_against_col_lt(rel, filter_col, against_col)
-    elif operator == ">":
-        return _filter_against_col_gt(rel, filter_col, against_col)
-    elif operator == "==":
-        return _filter_against_col_eq(rel, filter_col, against_col)
-    elif operator == "<=":
-        return _filter_against_col_lteq(rel, filter_col, against_col)
-    elif operator == ">=":
-        return _filter_against_col_gteq(rel, filter_col, against_col)
-    else:
-        raise Exception(f"Unknown operator: {operator}")
+    _comparison(_SCALAR_COMPARISONS, operator)
+    return [row for row in rel if filter_against_scalar_row(row, filter_col, scalar, operator)]
 
 
-def _filter_against_scalar_lt(rel: list, filter_col: int, scalar: [int, float]):
+# map stages whose last argument is the index of the column they write to
+_TARGET_COL_STAGES = {add_row, subtract_row, multiply_row, divide_row}
 
-    ret = []
-    for row in rel:
-        if row[filter_col] < scalar:
-            ret.append(row)
-    return ret
 
+def _check_stages(rel: list, stages: list):
+    """
+    check the target column of each map stage against the width of the rows it gets,
+    which is tracked through the stages before it without running any of them
+    """
 
-def _filter_against_scalar_gt(rel: list, filter_col: int, scalar: [int, float]):
+    if not rel:
+        return
 
-    ret = []
-    for row in rel:
-        if row[filter_col] > scalar:
-            ret.append(row)
-    return ret
+    num_cols = len(rel[0])
+    for kind, fn, args in stages:
+        if kind != "map":
+            continue
+        if fn is project_row:
+            num_cols = len(args[0])
+        elif fn in _TARGET_COL_STAGES:
+            _check_target_width(num_cols, args[-1])
+            if args[-1] == num_cols:
+                num_cols += 1
 
 
-def _filter_against_scalar_eq(rel: list, filter_col: int, scalar: [int, float]):
+def fused(rel: list, stages: list):
+    """
+    apply a chain of row-local operators in a single pass over rel, without
+    materializing the relations in between. each stage is a (kind, fn, args)
+    tuple: "map" stages replace the row with fn(row, *args), and "filter"
+    stages drop the row unless fn(row, *args) is true
+    """
 
+    _check_stages(rel, stages)
     ret = []
     for row in rel:
-        if row[filter_col] == scalar:
+        for kind, fn, args in stages:
+            if kind == "map":
+                row = fn(row, *args)
+            elif not fn(row, *args):
+                break
+        else:
             ret.append(row)
-    return ret
-
-
-def filter_against_scalar(rel: list, filter_col: int, scalar: [int, float], operator: str):
 
-    if operator == "<":
-        return _filter_against_scalar_lt(rel, filter_col, scalar)
-    elif operator == ">":
-        return _filter_against_scalar_gt(rel, filter_col, scalar)
-    elif operator == "==":
-        return _filter_against_scalar_eq(rel, filter_col, scalar)
-    else:
-        raise Exception(f"Unknown operator: {operator}")
+    return ret
 
 
 def sort_by(rel: list, sort_by_col: int, increasing: bool = True):
 
-    ret = deepcopy(rel)
-    if increasing:
-        ret.sort(key=lambda r: r[sort_by_col])
-    else:
-        ret.sort(key=lambda r: r[sort_by_col], reverse=True)
-    return ret
+    return sorted(rel, key=lambda r: r[sort_by_col], reverse=not increasing)
 
 
 def num_rows(rel: list):
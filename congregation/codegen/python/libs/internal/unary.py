@@ -1,8 +1,9 @@
 from congregation.codegen.python.libs.utils import *
-import socket
+from congregation.net.transfer import run_transfer, send_columns, receive_columns, exchange_columns
+import array
 import random
 import math
-import copy
+import sys
 
 
 def store(rel: list, header: list, output_path: str):
@@ -17,11 +18,102 @@ def persist(rel: list, header: list, output_path: str):
     write_rel(output_path, rel, header)
 
 
-def send(rel: list, sock: socket):
+def store_npy(rel: list, header: list, output_path: str):
+    write_rel_npy(output_path, rel, header)
+
+
+def read_npy(path_to_rel: str, use_floats: [bool, None] = False):
+    return read_rel_npy(path_to_rel, use_floats=use_floats)
+
+
+def persist_npy(rel: list, header: list, output_path: str):
+    write_rel_npy(output_path, rel, header)
+
+
+def _send_buffer(col: list):
+    """
+    columns are sent as little-endian 64 bit floats if they hold any floats, and ints otherwise
+    """
+
+    buf = array.array("d" if any(isinstance(v, float) for v in col) else "q", col)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return buf.typecode, buf
+
+
+def _send_cols(rel: list, header: list):
+    return [_send_buffer(list(col)) for col in zip(*rel)] if rel else [("q", b"") for _ in header]
+
+
+def _received_rows(received: list):
     """
-    TODO
+    rows received from each party are concatenated in order of their pids
     """
-    return
+
+    ret = []
+    for r in received:
+        cols = []
+        for typ, col in zip(r.types, r.columns):
+            buf = array.array(typ, col)
+            if sys.byteorder == "big":
+                buf.byteswap()
+            cols.append(buf.tolist())
+        ret.extend([list(row) for row in zip(*cols)])
+
+    return ret
+
+
+def send(
+        rel: list,
+        header: list,
+        host: str,
+        port: int,
+        name: str,
+        pid: int,
+        compress_level: [int, None] = None,
+        chunk_size: [int, None] = None,
+        retry_initial: [float, None] = None,
+        retry_max: [float, None] = None,
+        connect_deadline: [float, None] = None
+):
+
+    run_transfer(send_columns(
+        host, port, name, pid, header, _send_cols(rel, header), len(rel),
+        compress_level, chunk_size, retry_initial, retry_max, connect_deadline
+    ))
+
+
+def receive(pid: int, port: int, name: str, num_senders: int):
+    return _received_rows(run_transfer(receive_columns(pid, port, name, num_senders)))
+
+
+def send_receive(
+        rel: list,
+        header: list,
+        targets: list,
+        name: str,
+        pid: int,
+        port: int,
+        num_senders: int,
+        compress_level: [int, None] = None,
+        chunk_size: [int, None] = None,
+        retry_initial: [float, None] = None,
+        retry_max: [float, None] = None,
+        connect_deadline: [float, None] = None
+):
+    """
+    send rel to each (host, port) in targets while receiving from num_senders parties
+    """
+
+    cols = _send_cols(rel, header)
+    sending = [
+        send_columns(
+            host, target_port, name, pid, header, cols, len(rel),
+            compress_level, chunk_size, retry_initial, retry_max, connect_deadline
+        )
+        for host, target_port in targets
+    ]
+    return _received_rows(run_transfer(exchange_columns(receive_columns(pid, port, name, num_senders), sending)))
 
 
 def index(rel: list):
@@ -33,7 +125,7 @@ def index(rel: list):
 
 def shuffle(rel: list):
 
-    ret = copy.deepcopy(rel)
+    ret = list(rel)
     # TODO: temporarily using python random lib, fix later
     random.shuffle(ret)
     return ret
@@ -41,20 +133,11 @@ def shuffle(rel: list):
 
 def aggregate_sum_count_col(rel: list, group_cols: list, agg_col: int):
 
-    acc = {}
-    for row in rel:
-        k = tuple(row[idx] for idx in group_cols)
-        if k in acc:
-            acc[k]["__SUM__"] += row[agg_col]
-            acc[k]["__COUNT__"] += 1
-        else:
-            acc[k] = {}
-            acc[k]["__SUM__"] = row[agg_col]
-            acc[k]["__COUNT__"] = 1
+    acc = construct_acc_dict(rel, group_cols, agg_col)
 
     ret = []
     for k in acc.keys():
-        ret.append(list(k) + [acc[k]["__SUM__"], acc[k]["__COUNT__"]])
+        ret.append(list(k) + [acc[k].sum, acc[k].count])
 
     return ret
 
@@ -90,9 +173,8 @@ def _std_dev_local_sqrt(mean_col: [int, float], mean_squares_col: [int, float]):
 
 def aggregate_std_dev_local_sqrt(rel: list):
 
-    copied_rel = copy.deepcopy(rel)
     ret = []
-    for row in copied_rel:
+    for row in rel:
 
         mean_col = row[-2]
         mean_squares_col = row[-1]
@@ -112,9 +194,8 @@ def _variance_local_diff(mean_col: [int, float], mean_squares_col: [int, float])
 
 def aggregate_variance_local_diff(rel: list):
 
-    copied_rel = copy.deepcopy(rel)
     ret = []
-    for row in copied_rel:
+    for row in rel:
 
         mean_col = row[-2]
         mean_squares_col = row[-1]
@@ -127,9 +208,8 @@ def aggregate_variance_local_diff(rel: list):
 
 def all_stats_local_sqrt(rel: list):
 
-    copied_rel = copy.deepcopy(rel)
     ret = []
-    for row in copied_rel:
+    for row in rel:
 
         variance_mean_col = row[-17]
         variance_mean_squares_col = row[-16]
@@ -139,15 +219,14 @@ def all_stats_local_sqrt(rel: list):
         std_dev_mean_squares_col = row[-14]
         sd = _std_dev_local_sqrt(std_dev_mean_col, std_dev_mean_squares_col)
 
-        row[-17] = var
-        row[-16] = sd
-        del row[-15]
-        del row[-14]
-
-        ret.append(row)
+        ret.append(row[:-17] + [var, sd] + row[-13:])
 
     return ret
 
 
 def col_sum(rel: list):
-    return [[sum(r) for r in zip(*rel)]]
+    """
+    the sums of an empty relation are an empty relation, as with the columnar engine
+    """
+
+    return [[sum(r) for r in zip(*rel)]] if rel else []
@@ -0,0 +1,160 @@
+from congregation.codegen.python.libs.utils import *
+import itertools
+import tempfile
+import pickle
+import heapq
+import os
+
+
+"""
+Streamed relations are iterables of row batches, where each batch is an
+ordinary (list of lists) relation. Row-wise operators are applied to them
+batch by batch via map_batches(), so only one batch per operator is held
+in memory at a time. Streams are lazy and can only be consumed once.
+"""
+
+
+MERGE_FAN_IN = 64
+
+
+def create_batches(path_to_rel: str, use_floats: [bool, None] = False, batch_size: int = BATCH_SIZE):
+    return read_rel_batches(path_to_rel, use_floats=use_floats, batch_size=batch_size)
+
+
+def read_batches(path_to_rel: str, use_floats: [bool, None] = False, batch_size: int = BATCH_SIZE):
+    return read_rel_batches(path_to_rel, use_floats=use_floats, batch_size=batch_size)
+
+
+def map_batches(batches, fn, *args):
+    """
+    apply a row-wise operator to each batch. empty batches are dropped,
+    since operators like add() inspect the first row of their input
+    """
+
+    for batch in batches:
+        if batch:
+            ret = fn(batch, *args)
+            if ret:
+                yield ret
+
+
+def limit_batches(batches, n: int):
+    """
+    stops pulling batches from upstream once n rows have been produced
+    """
+
+    remaining = n
+    if remaining <= 0:
+        return
+    for batch in batches:
+        ret = batch[:remaining]
+        remaining -= len(ret)
+        yield ret
+        if remaining <= 0:
+            return
+
+
+def concat_batches(batch_iters: list):
+    return itertools.chain.from_iterable(batch_iters)
+
+
+def materialize(batches):
+
+    ret = []
+    for batch in batches:
+        ret.extend(batch)
+    return ret
+
+
+def store_batches(batches, header: list, output_path: str):
+    write_rel_batches(output_path, batches, header)
+
+
+def persist_batches(batches, header: list, output_path: str):
+    write_rel_batches(output_path, batches, header)
+
+
+def collect_batches(batches, header: list, output_path: str):
+    write_rel_batches(output_path, batches, header)
+
+
+def _write_run(path: str, keys, chunk_size: int):
+
+    keys = iter(keys)
+    with open(path, "wb") as f:
+        while True:
+            chunk = list(itertools.islice(keys, chunk_size))
+            if not chunk:
+                return
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str):
+
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _merge_runs(paths: list):
+    """
+    merge sorted runs, dropping keys that occur in more than one of them
+    """
+
+    prev = None
+    for k in heapq.merge(*[_read_run(p) for p in paths]):
+        if k != prev:
+            prev = k
+            yield k
+
+
+def distinct_batches(
+        batches,
+        selected_cols: list,
+        tmp_dir: [str, None] = None,
+        batch_size: int = BATCH_SIZE,
+        fan_in: int = MERGE_FAN_IN
+):
+    """
+    sort-based distinct for streamed relations. the distinct keys of each batch are
+    sorted into a run and spilled to disk, and the runs are then merged, at most
+    fan_in at a time (in several passes if there are more runs than that), so only
+    one batch and one chunk per open run are held in memory at a time. unlike
+    distinct(), the output is sorted on the selected columns rather than in order
+    of first occurrence
+    """
+
+    key = tuple_key(selected_cols)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as d:
+
+        num_runs = 0
+        runs = []
+        for batch in batches:
+            run = sorted(set(map(key, batch)))
+            if run:
+                runs.append(f"{d}/{num_runs}.run")
+                num_runs += 1
+                _write_run(runs[-1], run, batch_size)
+
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                merged.append(f"{d}/{num_runs}.run")
+                num_runs += 1
+                _write_run(merged[-1], _merge_runs(runs[i:i + fan_in]), batch_size)
+                for r in runs[i:i + fan_in]:
+                    os.remove(r)
+            runs = merged
+
+        ret = []
+        for k in _merge_runs(runs):
+            ret.append(list(k))
+            if len(ret) == batch_size:
+                yield ret
+                ret = []
+        if ret:
+            yield ret
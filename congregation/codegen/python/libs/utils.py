@@ -1,79 +1,413 @@
+from congregation.codegen.python.libs.cache import *
+import os
+import math
+import random
+from operator import itemgetter
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def write_rel(output_path: str, rel: list, header: list, use_floats: [bool, None] = False):
+
+"""
+Relations in the list engine are lists of rows, where each row is a list of
+values. Relations and their rows are treated as immutable once created:
+library functions never modify their inputs in place, and build new lists
+for any row they change. Outputs may therefore share unchanged rows with
+their inputs (e.g. sort_by() and shuffle() only reorder row references),
+and relations can be passed between operators without defensive copies.
+"""
+
+
+BATCH_SIZE = 10000
+
+
+def _format_rows(rows: list, use_floats: [bool, None] = False):
+
+    if not use_floats:
+        return [",".join(str(int(v)) for v in row) for row in rows]
+    else:
+        return [",".join(str(float(v)) for v in row) for row in rows]
+
+
+def write_rel_batches(output_path: str, batches, header: list, use_floats: [bool, None] = False):
+    """
+    write an iterable of row batches to a single csv file, formatting
+    and writing one batch at a time
+    """
 
     print(f"Writing python job output to {output_path}")
     with open(output_path, "w") as f:
 
         f.write(f"{','.join(header)}\n")
-        if not use_floats:
-            rows_formatted = [",".join(str(int(v)) for v in row) for row in rel]
-        else:
-            rows_formatted = [",".join(str(float(v)) for v in row) for row in rel]
-        f.write("\n".join(r for r in rows_formatted))
+        first = True
+        for batch in batches:
+            if not batch:
+                continue
+            if not first:
+                f.write("\n")
+            f.write("\n".join(_format_rows(batch, use_floats)))
+            first = False
 
 
-def read_rel(input_path: str, use_floats: [bool, None] = False):
+def write_rel(output_path: str, rel: list, header: list, use_floats: [bool, None] = False):
 
-    rows = []
+    batches = (rel[i:i + BATCH_SIZE] for i in range(0, len(rel), BATCH_SIZE))
+    write_rel_batches(output_path, batches, header, use_floats)
+    cache_put(output_path, rel, use_floats)
+
+
+def read_rel_batches(input_path: str, use_floats: [bool, None] = False, batch_size: int = BATCH_SIZE):
+    """
+    generator over the rows of a csv file in batches of (at most)
+    batch_size rows, reading the file line by line
+    """
+
+    batch = []
     print(f"Python reading input from {input_path}")
     with open(input_path, "r") as f:
-        itr = iter(f.readlines())
-        header = next(itr)
+        header = f.readline()
         print(f"Skipping header: {header}")
-        for row in itr:
+        for row in f:
             try:
                 if not use_floats:
-                    rows.append([int(float(v)) for v in row.split(",")])
+                    batch.append([int(float(v)) for v in row.split(",")])
                 else:
-                    rows.append([float(v) for v in row.split(",")])
+                    batch.append([float(v) for v in row.split(",")])
             except ValueError:
                 # skip header row
                 typ_str = "float" if use_floats else "int"
                 print(f"Encountered an invalid value for {typ_str} conversion in the following row: {row}")
                 pass
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def _cast_cached_rel(rel: list, written_floats: [bool, None], use_floats: [bool, None]):
+    """
+    convert values the same way writing them to csv and reading them back would.
+    a relation that was written and is read with the same type, and whose values
+    all have that type already, is returned as is rather than copied
+    """
+
+    write_fn = float if written_floats else int
+    read_fn = float if use_floats else int
+    if write_fn is read_fn and all(type(v) is read_fn for row in rel for v in row):
+        return rel
+    return [[read_fn(write_fn(v)) for v in row] for row in rel]
+
+
+def read_rel(input_path: str, use_floats: [bool, None] = False):
+
+    cached = cache_get(input_path)
+    if cached is not None:
+        print(f"Python reading input from {input_path} (cached)")
+        return _cast_cached_rel(cached[1], cached[0], use_floats)
+
+    rows = []
+    for batch in read_rel_batches(input_path, use_floats=use_floats):
+        rows.extend(batch)
     return rows
 
 
+def tuple_key(cols: list):
+    """
+    return a function mapping a row to the tuple of its values at cols
+    """
+
+    if len(cols) > 1:
+        return itemgetter(*cols)
+    return lambda row: tuple(row[i] for i in cols)
+
+
+def _npy_dtype(use_floats: [bool, None] = False):
+    return np.float64 if use_floats else np.int64
+
+
+def write_rel_npy(output_path: str, rel: list, header: list, use_floats: [bool, None] = None):
+    """
+    write a relation as a directory holding one .npy file per column
+    (0.npy, 1.npy, ...), along with its header in a file named header.
+    if use_floats is None, each column keeps the type of its values
+    """
+
+    if np is None:
+        raise Exception("The npy intermediate format requires numpy.")
+
+    print(f"Writing python job output to {output_path}")
+    os.makedirs(output_path, exist_ok=True)
+    with open(f"{output_path}/header", "w") as f:
+        f.write(",".join(header))
+
+    for i in range(len(header)):
+        dtype = _npy_dtype(use_floats) if use_floats is not None else None
+        col = np.array([row[i] for row in rel], dtype=dtype)
+        if col.dtype.kind not in "if":
+            col = col.astype(np.int64)
+        np.save(f"{output_path}/{i}.npy", col)
+
+
+def read_npy_cols(input_path: str, use_floats: [bool, None] = False):
+    """
+    memory-map each column of a relation written by write_rel_npy. columns
+    are only copied if their stored dtype doesn't match use_floats
+    """
+
+    if np is None:
+        raise Exception("The npy intermediate format requires numpy.")
+
+    print(f"Python reading input from {input_path}")
+    with open(f"{input_path}/header", "r") as f:
+        num_cols = len(f.read().split(","))
+
+    return [
+        np.load(f"{input_path}/{i}.npy", mmap_mode="r").astype(_npy_dtype(use_floats), copy=False)
+        for i in range(num_cols)
+    ]
+
+
+def read_rel_npy(input_path: str, use_floats: [bool, None] = False):
+    return [list(row) for row in zip(*[col.tolist() for col in read_npy_cols(input_path, use_floats)])]
 
 
+def _np_select_positions(values: list, positions: list):
+
+    arr = np.array(values)
+    if arr.dtype.kind not in "if":
+        # e.g. ints too large for int64
+        return None
+    return np.partition(arr, positions)[positions].tolist()
+
+
+def select_positions(values: list, positions: list):
+    """
+    return the values that would sit at each of the given positions if
+    values were sorted, without sorting them. uses numpy.partition for
+    large inputs when numpy is installed and a multi-target quickselect
+    otherwise, both of which run in expected linear time and leave the
+    input list unmodified
+    """
+
+    if np is not None and len(values) >= 1024:
+        ret = _np_select_positions(values, positions)
+        if ret is not None:
+            return ret
+
+    found = {}
+    stack = [(values, sorted(set(positions)), 0)]
+    while stack:
+
+        vals, pos, offset = stack.pop()
+        if len(vals) <= 32:
+            s = sorted(vals)
+            for p in pos:
+                found[p] = s[p - offset]
+            continue
+
+        pivot = random.choice(vals)
+        lt = [v for v in vals if v < pivot]
+        gt = [v for v in vals if v > pivot]
+        num_lt = len(lt)
+        num_lt_eq = len(vals) - len(gt)
+
+        lt_pos, gt_pos = [], []
+        for p in pos:
+            if p - offset < num_lt:
+                lt_pos.append(p)
+            elif p - offset < num_lt_eq:
+                found[p] = pivot
+            else:
+                gt_pos.append(p)
+
+        if lt_pos:
+            stack.append((lt, lt_pos, offset))
+        if gt_pos:
+            stack.append((gt, gt_pos, offset + num_lt_eq))
+
+    return [found[p] for p in positions]
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty, 2016). keeps O(1 / error)
+    values regardless of how many are inserted, and answers rank queries
+    within roughly error * count of the true rank. min and max are exact
+    """
+
+    __slots__ = ("k", "compactors", "size", "max_size", "count", "min", "max", "_rng")
+
+    def __init__(self, error: float, seed: [int, None] = None):
+
+        if not 0 < error < 1:
+            raise Exception(f"Quantile error must be between 0 and 1, got {error}")
+
+        # the rank error of a KLL sketch with top compactor size k is about 1.7 / k
+        self.k = max(8, int(math.ceil(2 / error)))
+        self.compactors = []
+        self.size = 0
+        self.max_size = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._rng = random.Random(seed)
+        self._grow()
+
+    def _capacity(self, height: int):
+
+        depth = len(self.compactors) - height - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _grow(self):
+
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+
+        for h in range(len(self.compactors)):
+            if len(self.compactors[h]) >= self._capacity(h):
+
+                if h + 1 >= len(self.compactors):
+                    self._grow()
+
+                c = self.compactors[h]
+                c.sort()
+                # an odd item out stays at this level so no weight is lost
+                leftover = [c.pop()] if len(c) % 2 == 1 else []
+                self.compactors[h + 1].extend(c[self._rng.randint(0, 1)::2])
+                self.compactors[h] = leftover
+
+                self.size = sum(len(c) for c in self.compactors)
+                break
+
+    def update(self, v: [int, float]):
+
+        self.compactors[0].append(v)
+        self.size += 1
+        self.count += 1
+        self.min = v if self.min is None or v < self.min else self.min
+        self.max = v if self.max is None or v > self.max else self.max
+        if self.size >= self.max_size:
+            self._compress()
+
+    def select_positions(self, positions: list):
+        """
+        approximate counterpart to select_positions() for the values
+        inserted into this sketch
+        """
+
+        weighted = sorted((v, 2 ** h) for h, c in enumerate(self.compactors) for v in c)
+        total_weight = sum(w for _, w in weighted)
+
+        ret = []
+        for p in positions:
+            target = p * total_weight / self.count
+            cumulative = 0
+            val = weighted[-1][0]
+            for v, w in weighted:
+                cumulative += w
+                if cumulative > target:
+                    val = v
+                    break
+            ret.append(val)
+
+        return ret
+
+
+class Accumulator:
+    """
+    per-group state for the aggregations. count and sum are always tracked. when
+    moments are requested, the sum of squares is tracked too (exactly, for integer
+    values), and mean and m2 (sum of squared deviations from the mean) are updated
+    with Welford's method for float values. the raw values are only kept around
+    when an order statistic needs them. if a quantile error is given, values are
+    summarized in a KLLSketch instead of being kept
+    """
+
+    __slots__ = ("count", "sum", "sum_squares", "mean", "m2", "values", "sketch")
+
+    def __init__(
+            self,
+            include_moments: bool = False,
+            include_values: bool = False,
+            quantile_error: [float, None] = None
+    ):
+        self.count = 0
+        self.sum = 0
+        self.sum_squares = 0 if include_moments else None
+        self.mean = 0.0 if include_moments else None
+        self.m2 = 0.0 if include_moments else None
+        self.values = [] if include_values and quantile_error is None else None
+        self.sketch = KLLSketch(quantile_error) if include_values and quantile_error is not None else None
+
+    def update(self, v: [int, float]):
+
+        self.count += 1
+        self.sum += v
+        if self.mean is not None:
+            self.sum_squares += v * v
+            delta = v - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (v - self.mean)
+        if self.values is not None:
+            self.values.append(v)
+        if self.sketch is not None:
+            self.sketch.update(v)
+
+    def variance(self):
+        """
+        the variance of integer values is derived from their exact sums, with a single
+        rounding, which the columnar engine does too. Welford's m2 is used for floats
+        """
+
+        if isinstance(self.sum_squares, int):
+            return (self.count * self.sum_squares - self.sum * self.sum) / (self.count * self.count)
+        return self.m2 / self.count
+
+    def min_max(self):
+
+        if self.sketch is not None:
+            return [self.sketch.min, self.sketch.max]
+        return [min(self.values), max(self.values)]
+
+    def select_positions(self, positions: list):
+
+        if self.sketch is not None:
+            return self.sketch.select_positions(positions)
+        return select_positions(self.values, positions)
+
 
 def construct_acc_dict(
         rel: list,
         group_cols: list,
         agg_col: [int, None],
-        include_sum: bool = False,
-        include_count: bool = False,
-        include_values: bool = False
+        include_moments: bool = False,
+        include_values: bool = False,
+        quantile_error: [float, None] = None
 ):
     """
     construct a dictionary whose keys are the group columns expressed
-    as a tuple, and whose values are a list of the values from the
-    aggregated column for each group
+    as a tuple, and whose values are Accumulator objects built over
+    the aggregated column for each group in a single pass
     """
 
     acc = {}
     for row in rel:
 
         k = tuple(row[idx] for idx in group_cols)
-        if k in acc:
-
-            if include_sum:
-                acc[k]["__SUM__"] += row[agg_col]
-            if include_count:
-                acc[k]["__COUNT__"] += 1
-            if include_values:
-                acc[k]["__VALUES__"].append(row[agg_col])
-        else:
-
-            entry = {}
-            if include_sum:
-                entry["__SUM__"] = row[agg_col]
-            if include_count:
-                entry["__COUNT__"] = 1
-            if include_values:
-                entry["__VALUES__"] = [row[agg_col]]
-
+        entry = acc.get(k)
+        if entry is None:
+            entry = Accumulator(include_moments, include_values, quantile_error)
             acc[k] = entry
 
+        if agg_col is None:
+            entry.count += 1
+        else:
+            entry.update(row[agg_col])
+
     return acc
@@ -8,11 +8,19 @@ import os
 import pystache
 
 
+STREAMABLE = {Project, Add, Subtract, Multiply, Divide, FilterAgainstCol, FilterAgainstScalar, Limit, Concat}
+STREAM_CONSUMERS = STREAMABLE | {Store, Persist, Collect, Distinct}
+FUSIBLE = {Project, Add, Subtract, Multiply, Divide, FilterAgainstCol, FilterAgainstScalar}
+
+
 class PythonCodeGen(CodeGen):
     def __init__(self, config: Config, dag: Dag, job_name: [str, None] = None):
         super(PythonCodeGen, self).__init__(config, dag, job_name)
         self.templates_dir = f"{os.path.dirname(os.path.realpath(__file__))}/templates/"
         self.space = "    "
+        self.streamed = set()
+        self.fused = {}
+        self.held = None
 
     def generate(self):
 
@@ -21,11 +29,182 @@ class PythonCodeGen(CodeGen):
 
     def _generate_code(self):
 
+        self.streamed = self._streamed_nodes()
+        self.fused = self._fused_chains()
+        self.held = self._held_nodes()
         op_code = super()._generate_code()
         template = open(f"{self.templates_dir}/top_level.tmpl").read()
-        data = {"OP_CODE": op_code}
+        data = {
+            "LIBS_MODULE": self._libs_module(),
+            "OP_CODE": op_code
+        }
         return pystache.render(template, data)
 
+    def _libs_module(self):
+
+        if self.codegen_config.engine == "columnar":
+            return "congregation.codegen.python.libs.columnar"
+        return "congregation.codegen.python.libs"
+
+    def _streamed_nodes(self):
+        """
+        when a batch size is configured (and the list engine is used), nodes whose output
+        is only consumed by a single row-wise operator or sink are generated as streams
+        of row batches. streams start at Create / Read nodes and end at the first node
+        that doesn't satisfy this, whose output is materialized as an ordinary relation
+        """
+
+        if self.codegen_config.batch_size is None or self.codegen_config.engine != "list":
+            return set()
+
+        consumers = STREAM_CONSUMERS
+        sources = {Create, Read}
+        if self.codegen_config.intermediate_format != "csv":
+            # only csv intermediates are read and written in batches
+            consumers = consumers - {Store, Persist}
+            sources = {Create}
+
+        ret = set()
+        for node in self.dag.top_sort():
+
+            if len(node.children) != 1 or type(next(iter(node.children))) not in consumers:
+                continue
+            if type(node) in sources:
+                ret.add(node)
+            elif type(node) in STREAMABLE and any(p in ret for p in node.parents):
+                ret.add(node)
+
+        return ret
+
+    def _fused_chains(self):
+        """
+        find chains of row-local operators where each operator's output is only
+        consumed by the next one. such chains are generated as a single fused pass
+        over their input, so the relations in between are never materialized.
+        returns a dict mapping the last node of each chain to the whole chain
+        """
+
+        if self.codegen_config.engine != "list":
+            return {}
+
+        ret = {}
+        visited = set()
+        for node in self.dag.top_sort():
+
+            if type(node) not in FUSIBLE or node in visited:
+                continue
+
+            chain = [node]
+            while len(chain[-1].children) == 1:
+                child = next(iter(chain[-1].children))
+                if type(child) not in FUSIBLE or len(child.parents) != 1:
+                    break
+                chain.append(child)
+
+            visited.update(chain)
+            if len(chain) > 1:
+                ret[chain[-1]] = chain
+
+        return ret
+
+    def _held_nodes(self):
+        """
+        a job that sends relations between parties is run by the senders and the receivers
+        alike, and each of them only generates the operators over relations it holds. returns
+        None (every operator is generated) for jobs without a Send
+        """
+
+        nodes = self.dag.top_sort()
+        if not any(isinstance(n, Send) for n in nodes):
+            return None
+
+        pid = self.codegen_config.pid
+        return {n for n in nodes if isinstance(n, Send) or pid in set().union(*n.out_rel.stored_with)}
+
+    def _lookup(self, node: OpNode):
+
+        if self.held is not None and node not in self.held:
+            return lambda n: ""
+        if node in self.fused:
+            return self._generate_fused
+        if any(node in chain for chain in self.fused.values()):
+            # generated as part of the fused chain it belongs to
+            return lambda n: ""
+        return super()._lookup(node)
+
+    def _stream_out(self, node: OpNode, expr: str):
+        return expr if node in self.streamed else f"materialize({expr})"
+
+    def _op_call(self, node: OpNode, fn: str, args: str, in_node: [OpNode, None] = None):
+        """
+        call a row-wise operator on the input relation of in_node (node itself by default),
+        batch by batch if that input is streamed, and assign the result to node's output relation
+        """
+
+        in_node = node if in_node is None else in_node
+        in_rel = in_node.get_in_rel().name
+        if next(iter(in_node.parents)) not in self.streamed:
+            return f"\n{self.space}{node.out_rel.name} = {fn}({in_rel}, {args})"
+
+        expr = f"map_batches({in_rel}, {fn}, {args})"
+        return f"\n{self.space}{node.out_rel.name} = {self._stream_out(node, expr)}"
+
+    def _sink_fn(self, node: OpNode, fn: str):
+        return f"{fn}_batches" if next(iter(node.parents)) in self.streamed else fn
+
+    def _intermediate_fn(self, fn: str):
+        return fn if self.codegen_config.intermediate_format == "csv" else f"{fn}_{self.codegen_config.intermediate_format}"
+
+    def _intermediate_path(self, node: OpNode):
+        """
+        csv intermediates are single files, npy intermediates are directories with one file per column
+        """
+
+        if self.codegen_config.intermediate_format == "csv":
+            return f"{self.codegen_config.input_path}/{node.out_rel.name}.csv"
+        return f"{self.codegen_config.input_path}/{node.out_rel.name}_{self.codegen_config.intermediate_format}"
+
+    def _quantile_error_arg(self):
+        """
+        order statistics are computed exactly unless an error bound is configured,
+        in which case they are approximated with a bounded-memory sketch
+        """
+
+        if self.codegen_config.quantile_error is None:
+            return ""
+        return f", {self.codegen_config.quantile_error}"
+
+    @staticmethod
+    def _operands_arg(node: OpNode):
+        return [
+            {"__TYPE__": "col", "v": o.idx}
+            if isinstance(o, Column)
+            else {"__TYPE__": "scal", "v": o}
+            for o in node.operands
+        ]
+
+    def _row_op(self, node: OpNode):
+        """
+        return the library function name and arguments for a row-local operator. the
+        relation-level function is named fn, and its single-row counterpart fn_row
+        """
+
+        if isinstance(node, Project):
+            return "project", f"{[c.idx for c in node.selected_cols]}"
+        if isinstance(node, (Add, Multiply)):
+            col_operands = [c.idx for c in node.operands if isinstance(c, Column)]
+            scalar_operands = [n for n in node.operands if not isinstance(n, Column)]
+            fn = "add" if isinstance(node, Add) else "multiply"
+            return fn, f"{col_operands}, {scalar_operands}, {node.target_col.idx}"
+        if isinstance(node, (Subtract, Divide)):
+            fn = "subtract" if isinstance(node, Subtract) else "divide"
+            return fn, f"{self._operands_arg(node)}, {node.target_col.idx}"
+        if isinstance(node, FilterAgainstCol):
+            return "filter_against_col", f"{node.filter_col.idx}, {node.against_col.idx}, \"{node.operator}\""
+        if isinstance(node, FilterAgainstScalar):
+            return "filter_against_scalar", f"{node.filter_col.idx}, {node.scalar}, \"{node.operator}\""
+        raise Exception(f"Node {node.name} is not a row-local operator.")
+
     def generate_job(self):
         return PythonJob(self.job_name, self.codegen_config.code_path)
 
@@ -36,6 +215,11 @@ class PythonCodeGen(CodeGen):
             if node.input_path is not None \
             else f"\"{self.codegen_config.input_path}/{node.out_rel.name}.csv\""
 
+        if node in self.streamed:
+            return \
+                f"\n{self.space}{node.out_rel.name} = " \
+                f"create_batches({file_path}, {self.codegen_config.use_floats}, {self.codegen_config.batch_size})"
+
         return \
             f"\n{self.space}{node.out_rel.name} = " \
             f"create({file_path}, {self.codegen_config.use_floats})"
@@ -74,83 +258,73 @@ class PythonCodeGen(CodeGen):
 
         group_cols_idx = [c.idx for c in node.group_cols]
         return f"\n{self.space}{node.out_rel.name} = " \
-               f"min_max_median({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx})"
+               f"min_max_median({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx}" \
+               f"{self._quantile_error_arg()})"
 
     def _generate_deciles(self, node: Deciles):
 
         group_cols_idx = [c.idx for c in node.group_cols]
         return f"\n{self.space}{node.out_rel.name} = " \
-               f"deciles({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx})"
+               f"deciles({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx}" \
+               f"{self._quantile_error_arg()})"
 
     def _generate_all_stats(self, node: AllStats):
 
         group_cols_idx = [c.idx for c in node.group_cols]
         return f"\n{self.space}{node.out_rel.name} = " \
-               f"all_stats({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx})"
+               f"all_stats({node.get_in_rel().name}, {group_cols_idx}, {node.agg_col.idx}" \
+               f"{self._quantile_error_arg()})"
 
     def _generate_project(self, node: Project):
-
-        proj_cols_idx = [c.idx for c in node.selected_cols]
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"project({node.get_in_rel().name}, {proj_cols_idx})"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_add(self, node: Add):
-
-        col_operands = [c.idx for c in node.operands if isinstance(c, Column)]
-        scalar_operands = [n for n in node.operands if not isinstance(n, Column)]
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"add({node.get_in_rel().name}, {col_operands}, {scalar_operands}, {node.target_col.idx})"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_subtract(self, node: Subtract):
-
-        operands = [
-            {"__TYPE__": "col", "v": o.idx}
-            if isinstance(o, Column)
-            else {"__TYPE__": "scal", "v": o}
-            for o in node.operands
-        ]
-
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"subtract({node.get_in_rel().name}, {operands}, {node.target_col.idx})"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_multiply(self, node: Multiply):
-
-        col_operands = [c.idx for c in node.operands if isinstance(c, Column)]
-        scalar_operands = [n for n in node.operands if not isinstance(n, Column)]
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"multiply({node.get_in_rel().name}, {col_operands}, {scalar_operands}, {node.target_col.idx})"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_divide(self, node: Divide):
-
-        operands = [
-            {"__TYPE__": "col", "v": o.idx}
-            if isinstance(o, Column)
-            else {"__TYPE__": "scal", "v": o}
-            for o in node.operands
-        ]
-
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"divide({node.get_in_rel().name}, {operands}, {node.target_col.idx})"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_limit(self, node: Limit):
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"limit({node.get_in_rel().name}, {node.num})"
+        if next(iter(node.parents)) not in self.streamed:
+            return f"\n{self.space}{node.out_rel.name} = " \
+                   f"limit({node.get_in_rel().name}, {node.num})"
+
+        expr = f"limit_batches({node.get_in_rel().name}, {node.num})"
+        return f"\n{self.space}{node.out_rel.name} = {self._stream_out(node, expr)}"
 
     def _generate_distinct(self, node: Distinct):
 
         select_cols_idx = [c.idx for c in node.selected_cols]
+        if next(iter(node.parents)) in self.streamed:
+            # streamed inputs may not fit in memory, so sorted runs are spilled to disk. the
+            # output is sorted on the selected columns, rather than in order of first occurrence
+            return f"\n{self.space}{node.out_rel.name} = " \
+                   f"materialize(distinct_batches({node.get_in_rel().name}, {select_cols_idx}))"
+
         return f"\n{self.space}{node.out_rel.name} = " \
                f"distinct({node.get_in_rel().name}, {select_cols_idx})"
 
     def _generate_filter_against_col(self, node: FilterAgainstCol):
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"filter_against_col({node.get_in_rel().name}, {node.filter_col.idx}, " \
-               f"{node.against_col.idx}, \"{node.operator}\")"
+        return self._op_call(node, *self._row_op(node))
 
     def _generate_filter_against_scalar(self, node: FilterAgainstScalar):
-        return f"\n{self.space}{node.out_rel.name} = " \
-               f"filter_against_scalar({node.get_in_rel().name}, {node.filter_col.idx}, " \
-               f"{node.scalar}, \"{node.operator}\")"
+        return self._op_call(node, *self._row_op(node))
+
+    def _generate_fused(self, node: OpNode):
+
+        stages = []
+        for n in self.fused[node]:
+            fn, args = self._row_op(n)
+            kind = "filter" if isinstance(n, (FilterAgainstCol, FilterAgainstScalar)) else "map"
+            stages.append(f"(\"{kind}\", {fn}_row, ({args},))")
+
+        return self._op_call(node, "fused", f"[{', '.join(stages)}]", self.fused[node][0])
 
     def _generate_sort_by(self, node: SortBy):
         return f"\n{self.space}{node.out_rel.name} = " \
@@ -163,7 +337,7 @@ class PythonCodeGen(CodeGen):
     def _generate_collect(self, node: Collect):
 
         output_path = f"{self.codegen_config.input_path}/{node.out_rel.name}.csv"
-        return f"\n{self.space}collect({node.get_in_rel().name}, " \
+        return f"\n{self.space}{self._sink_fn(node, 'collect')}({node.get_in_rel().name}, " \
                f"{[c.name for c in node.out_rel.columns]}, \"{output_path}\")"
 
     def _generate_join(self, node: Join):
@@ -171,34 +345,90 @@ class PythonCodeGen(CodeGen):
         left_cols = [c.idx for c in node.left_join_cols]
         right_cols = [c.idx for c in node.right_join_cols]
         return f"\n{self.space}{node.out_rel.name} = " \
-               f"join({node.get_left_in_rel().name}, \"{node.get_right_in_rel().name}\", " \
+               f"join({node.get_left_in_rel().name}, {node.get_right_in_rel().name}, " \
                f"{left_cols}, {right_cols})"
 
     def _generate_concat(self, node: Concat):
-        return f"\n{self.space}{node.out_rel.name} = concat({[n.name for n in node.get_in_rels()]})"
+        if not any(p in self.streamed for p in node.ordered):
+            in_rels = ", ".join(r.name for r in node.get_in_rels())
+            return f"\n{self.space}{node.out_rel.name} = concat([{in_rels}])"
+
+        # materialized inputs are passed along as a single batch
+        in_rels = ", ".join(p.out_rel.name if p in self.streamed else f"[{p.out_rel.name}]" for p in node.ordered)
+        expr = f"concat_batches([{in_rels}])"
+        return f"\n{self.space}{node.out_rel.name} = {self._stream_out(node, expr)}"
 
     def _generate_store(self, node: Store):
 
         col_names = [f"\"{c.name}\"" for c in node.out_rel.columns]
-        output_path = f"{self.codegen_config.input_path}/{node.out_rel.name}.csv"
-        return f"\n{self.space}store({node.get_in_rel().name}, " \
+        output_path = self._intermediate_path(node)
+        return f"\n{self.space}{self._sink_fn(node, self._intermediate_fn('store'))}({node.get_in_rel().name}, " \
                f"{col_names}, \"{output_path}\")"
 
     def _generate_read(self, node: Read):
 
+        if node in self.streamed:
+            return f"\n{self.space}{node.out_rel.name} = " \
+                   f"read_batches(\"{self._intermediate_path(node)}\", " \
+                   f"{self.codegen_config.use_floats}, {self.codegen_config.batch_size})"
+
         return f"\n{self.space}{node.out_rel.name} = " \
-               f"read(\"{self.codegen_config.input_path}/{node.out_rel.name}.csv\", " \
+               f"{self._intermediate_fn('read')}(\"{self._intermediate_path(node)}\", " \
                f"{self.codegen_config.use_floats})"
 
     def _generate_persist(self, node: Persist):
 
         col_names = [f"\"{c.name}\"" for c in node.out_rel.columns]
-        output_path = f"{self.codegen_config.input_path}/{node.out_rel.name}.csv"
-        return f"\n{self.space}persist({node.get_in_rel().name}, " \
-               f"{col_names}, {output_path})"
+        output_path = self._intermediate_path(node)
+        return f"\n{self.space}{self._sink_fn(node, self._intermediate_fn('persist'))}({node.get_in_rel().name}, " \
+               f"{col_names}, \"{output_path}\")"
 
     def _generate_send(self, node: Send):
-        raise NotImplementedError("Send not yet implemented for Python codegen.")
+        """
+        the parties holding the input relation send it to the parties the output is stored
+        with, who listen for it on their data port (see congregation.net.transfer). a party
+        that both holds the input and receives the output keeps its own rows first, and
+        sends while it receives, since the parties it sends to may be sending to it too
+        """
+
+        if "NETWORK" not in self.config.system_configs:
+            raise Exception("Can't generate Send without a network config.")
+
+        net_cfg = self.config.system_configs["NETWORK"]
+        parties = net_cfg.network_dict["parties"]
+        pid = self.codegen_config.pid
+        senders = sorted(set().union(*node.get_in_rel().stored_with))
+        receivers = sorted(set().union(*node.out_rel.stored_with))
+        in_name = node.get_in_rel().name
+        out_name = node.out_rel.name
+        col_names = [c.name for c in node.out_rel.columns]
+        send_args = f"{net_cfg.transfer_compression}, {net_cfg.transfer_chunk_size}, " \
+                    f"{net_cfg.retry_initial}, {net_cfg.retry_max}, {net_cfg.connect_deadline}"
+
+        targets = [r for r in receivers if r != pid] if pid in senders else []
+        others = [s for s in senders if s != pid] if pid in receivers else []
+
+        ret = ""
+        if targets and others:
+            addrs = [(parties[r]["host"], parties[r]["data_port"]) for r in targets]
+            ret += f"\n{self.space}{out_name} = concat([{in_name}, send_receive({in_name}, {col_names}, {addrs}, " \
+                   f"\"{out_name}\", {pid}, {parties[pid]['data_port']}, {len(others)}, {send_args})])"
+            return ret
+
+        for r in targets:
+            ret += f"\n{self.space}send({in_name}, {col_names}, \"{parties[r]['host']}\", " \
+                   f"{parties[r]['data_port']}, \"{out_name}\", {pid}, {send_args})"
+
+        if pid in receivers:
+            received = f"receive({pid}, {parties[pid]['data_port']}, \"{out_name}\", {len(others)})"
+            if not others:
+                ret += f"\n{self.space}{out_name} = {in_name}"
+            elif pid in senders:
+                ret += f"\n{self.space}{out_name} = concat([{in_name}, {received}])"
+            else:
+                ret += f"\n{self.space}{out_name} = {received}"
+
+        return ret
 
     def _generate_index(self, node: Index):
         return f"\n{self.space}{node.out_rel.name} = " \
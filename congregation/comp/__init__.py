@@ -4,6 +4,7 @@ from congregation.comp.insert_open_ops import InsertOpenOps
 from congregation.comp.insert_close_ops import InsertCloseOps
 from congregation.comp.insert_read_ops import InsertReadOps
 from congregation.comp.insert_store_ops import InsertStoreOps
+from congregation.comp.insert_shuffle_ops import InsertShuffleOps
 from congregation.dag import Dag
 
 
@@ -12,6 +13,7 @@ def compile_dag(d: Dag):
     steps = [
         PushDown(),
         PushUp(),
+        InsertShuffleOps(),
         InsertCloseOps(),
         InsertOpenOps(),
         InsertReadOps(),
@@ -0,0 +1,36 @@
+import copy
+from congregation.dag.nodes import *
+from congregation.dag.nodes.internal import *
+from congregation.comp.rewriter import DagRewriter
+from congregation.comp.utils import *
+
+
+class InsertShuffleOps(DagRewriter):
+    def __init__(self):
+        super(InsertShuffleOps, self).__init__()
+
+    @staticmethod
+    def _rewrite_default(node: [SortBy, MinMaxMedian, Deciles]):
+        """
+        sorts over secret shared data run on an obliviously shuffled copy of their input, so
+        that they can reveal comparison outcomes (which are then independent of the data)
+        """
+
+        if node.requires_mpc():
+            parent = next(iter(node.parents))
+            if isinstance(parent, Shuffle):
+                return
+
+            out_rel = copy.deepcopy(parent.out_rel)
+            out_rel.rename(f"{out_rel.name}_shuffle")
+            op = Shuffle(out_rel, None)
+            insert_between(parent, node, op)
+
+    def _rewrite_min_max_median(self, node: MinMaxMedian):
+        self._rewrite_default(node)
+
+    def _rewrite_deciles(self, node: Deciles):
+        self._rewrite_default(node)
+
+    def _rewrite_sort_by(self, node: SortBy):
+        self._rewrite_default(node)
@@ -11,7 +11,12 @@ class CodeGenConfig:
             input_path: [str, None] = None,
             output_path: [str, None] = None,
             delimiter: [str, None] = ",",
-            use_floats: [bool, None] = None
+            use_floats: [bool, None] = None,
+            engine: [str, None] = None,
+            quantile_error: [float, None] = None,
+            batch_size: [int, None] = None,
+            intermediate_format: [str, None] = None,
+            in_process: [bool, None] = None
     ):
         self.cfg_key = "CODEGEN"
         self.workflow_name = workflow_name if workflow_name is not None else "workflow"
@@ -22,6 +27,37 @@ class CodeGenConfig:
         self.output_path = output_path if output_path is not None else f"/tmp/{self.workflow_name}/"
         self.delimiter = delimiter if delimiter is not None else ","
         self.use_floats = bool(int(use_floats)) if use_floats is not None else True
+        self.engine = self._resolve_engine(engine)
+        self.quantile_error = float(quantile_error) if quantile_error is not None else None
+        self.batch_size = int(batch_size) if batch_size is not None else None
+        self.intermediate_format = self._resolve_intermediate_format(intermediate_format)
+        self.in_process = bool(int(in_process)) if in_process is not None else False
+
+    @staticmethod
+    def _resolve_engine(engine: [str, None]):
+        """
+        execution engine used by generated python jobs. "list" operates on row-major
+        lists of lists, "columnar" operates on lists of numpy arrays (one per column).
+        """
+
+        if engine is None:
+            return "list"
+        if engine not in {"list", "columnar"}:
+            raise Exception(f"Unrecognized python engine: {engine}")
+        return engine
+
+    @staticmethod
+    def _resolve_intermediate_format(intermediate_format: [str, None]):
+        """
+        format of the relations handed off between jobs by Store / Read / Persist. "csv"
+        writes text files, "npy" writes a directory with one .npy file per column
+        """
+
+        if intermediate_format is None:
+            return "csv"
+        if intermediate_format not in {"csv", "npy"}:
+            raise Exception(f"Unrecognized intermediate format: {intermediate_format}")
+        return intermediate_format
 
     @staticmethod
     def get_values_from_env():
@@ -34,7 +70,12 @@ class CodeGenConfig:
             os.getenv("DATA_PATH"),
             os.getenv("DATA_PATH"),
             os.getenv("DELIMITER"),
-            os.getenv("USE_FLOATS")
+            os.getenv("USE_FLOATS"),
+            os.getenv("PYTHON_ENGINE"),
+            os.getenv("QUANTILE_ERROR"),
+            os.getenv("BATCH_SIZE"),
+            os.getenv("INTERMEDIATE_FORMAT"),
+            os.getenv("IN_PROCESS")
         ]
 
     @staticmethod
@@ -13,12 +13,21 @@ class JiffConfig(CodeGenConfig):
             output_path: [str, None] = None,
             delimiter: [str, None] = ",",
             use_floats: [bool, None] = True,
+            engine: [str, None] = None,
+            quantile_error: [float, None] = None,
+            batch_size: [int, None] = None,
+            intermediate_format: [str, None] = None,
+            in_process: [bool, None] = None,
             jiff_lib_path: [str, None] = None,
             server_ip: [str, None] = None,
             server_port: [str, int, None] = None,
             server_pid: [int, None] = None,
             zp: [int, None] = None,
-            extensions: [dict, None] = None
+            extensions: [dict, None] = None,
+            open_batch_size: [int, None] = None,
+            scan_aggregation: [bool, None] = None,
+            sorting_network: [str, None] = None,
+            preprocessing: [bool, None] = None
     ):
         super(JiffConfig, self)\
             .__init__(
@@ -29,7 +38,12 @@ class JiffConfig(CodeGenConfig):
             input_path,
             output_path,
             delimiter,
-            use_floats
+            use_floats,
+            engine,
+            quantile_error,
+            batch_size,
+            intermediate_format,
+            in_process
         )
         self.cfg_key = "JIFF_CODEGEN"
         self.jiff_lib_path = jiff_lib_path
@@ -38,6 +52,16 @@ class JiffConfig(CodeGenConfig):
         self.server_pid = None if server_pid is None else int(server_pid)
         self.zp = 16777729 if zp is None else int(zp)
         self.extensions = extensions if extensions is not None else self._get_default_extension_data()
+        # number of values revealed per round when filtering relations, 0 reveals them all at once
+        self.open_batch_size = 0 if open_batch_size is None else int(open_batch_size)
+        # aggregate sorted relations with a log-depth segmented scan rather than a pairwise sweep
+        self.scan_aggregation = bool(int(scan_aggregation)) if scan_aggregation is not None else False
+        # comparator network used by oblivious sorts, either "odd_even" or "bitonic"
+        self.sorting_network = "odd_even" if sorting_network is None else sorting_network
+        if self.sorting_network not in {"odd_even", "bitonic"}:
+            raise Exception(f"Sorting network {self.sorting_network} not recognized.")
+        # generate the triples and random bits needed by a job in an offline phase before it runs
+        self.preprocessing = bool(int(preprocessing)) if preprocessing is not None else False
 
     @staticmethod
     def _get_default_extension_data():
@@ -81,7 +105,12 @@ class JiffConfig(CodeGenConfig):
             os.getenv("SERVER_IP"),
             os.getenv("SERVER_PORT"),
             os.getenv("SERVER_PID"),
-            os.getenv("ZP")
+            os.getenv("ZP"),
+            None,
+            os.getenv("OPEN_BATCH_SIZE"),
+            os.getenv("SCAN_AGGREGATION"),
+            os.getenv("SORTING_NETWORK"),
+            os.getenv("PREPROCESSING")
         ]
 
         return base_vals + jiff_vals
@@ -107,10 +136,19 @@ class JiffConfig(CodeGenConfig):
             c.output_path,
             c.delimiter,
             c.use_floats,
+            c.engine,
+            c.quantile_error,
+            c.batch_size,
+            c.intermediate_format,
+            c.in_process,
             args.get("jiff_lib_path"),
             args.get("server_ip"),
             args.get("server_port"),
             args.get("server_pid"),
             args.get("zp"),
-            args.get("extensions")
+            args.get("extensions"),
+            args.get("open_batch_size"),
+            args.get("scan_aggregation"),
+            args.get("sorting_network"),
+            args.get("preprocessing")
         )
@@ -1,14 +1,48 @@
 import os
 
 
+DATA_PORT_OFFSET = 1000
+
+
 class NetworkConfig:
-    def __init__(self, pid: int, parties: [list, None] = None):
+    def __init__(
+            self,
+            pid: int,
+            parties: [list, None] = None,
+            codec: [str, None] = None,
+            transfer_compression: [int, None] = None,
+            transfer_chunk_size: [int, None] = None,
+            retry_initial: [float, None] = None,
+            retry_max: [float, None] = None,
+            connect_deadline: [float, None] = None,
+            happy_eyeballs_delay: [float, None] = None
+    ):
         self.cfg_key = "NETWORK"
         self.pid = pid
         self.parties = parties if parties is not None else []
+        # name of the codec (see congregation.net.messages.codec) used to encode messages to other parties
+        self.codec = "struct" if codec is None else codec
+        # zlib level relations sent between python jobs are compressed with (None to send them uncompressed)
+        self.transfer_compression = int(transfer_compression) if transfer_compression is not None else None
+        self.transfer_chunk_size = int(transfer_chunk_size) if transfer_chunk_size is not None else None
+        # failed connection attempts to other parties are retried with exponential backoff (see
+        # congregation.net.backoff), starting at retry_initial seconds and capped at retry_max
+        self.retry_initial = float(retry_initial) if retry_initial is not None else 0.1
+        self.retry_max = float(retry_max) if retry_max is not None else 5.0
+        # seconds to wait for each party to connect before giving up (None to wait forever)
+        self.connect_deadline = float(connect_deadline) if connect_deadline is not None else None
+        # delay before racing a connection attempt to a party's next address, when its host resolves to several
+        self.happy_eyeballs_delay = float(happy_eyeballs_delay) if happy_eyeballs_delay is not None else 0.25
         self.network_dict = self.set_network_config()
 
     def set_network_config(self):
+        """
+        parties are given as pid:host:port, optionally followed by :data_port, the port
+        the party receives relations sent by python jobs on (see congregation.net.transfer).
+        the data port defaults to the party's port + DATA_PORT_OFFSET, away from the run of
+        consecutive ports parties (and the jiff server) usually listen on. clashes between
+        any two ports on the same host are raised here rather than when binding them
+        """
 
         ret = dict()
         ret["pid"] = self.pid
@@ -18,16 +52,47 @@ class NetworkConfig:
             party_data = p.split(":")
             pid = int(party_data[0])
             if pid in ret["parties"]:
-                raise Exception(f"PID {p['pid']} already used.")
+                raise Exception(f"PID {pid} already used.")
             ret["parties"][pid] = {}
             ret["parties"][pid]["host"] = party_data[1]
             ret["parties"][pid]["port"] = party_data[2]
+            ret["parties"][pid]["data_port"] = \
+                int(party_data[3]) if len(party_data) > 3 else int(party_data[2]) + DATA_PORT_OFFSET
+
+        self._check_ports(ret["parties"])
 
         return ret
 
+    @staticmethod
+    def _check_ports(parties: dict):
+        """
+        every port (control or data) must be used by only one party on each host
+        """
+
+        used = {}
+        for pid in sorted(parties.keys()):
+            for kind in ["port", "data_port"]:
+                k = (parties[pid]["host"], int(parties[pid][kind]))
+                if k in used:
+                    raise Exception(
+                        f"Port {k[1]} on {k[0]} is used as the {kind} of party {pid} "
+                        f"and the {used[k][1]} of party {used[k][0]}."
+                    )
+                used[k] = (pid, kind)
+
     @staticmethod
     def from_env():
 
         pid = int(os.getenv("PID"))
         parties = [p for p in os.getenv("PARTIES").split(",")]
-        return NetworkConfig(pid, parties)
+        return NetworkConfig(
+            pid,
+            parties,
+            os.getenv("CODEC"),
+            os.getenv("TRANSFER_COMPRESSION"),
+            os.getenv("TRANSFER_CHUNK_SIZE"),
+            os.getenv("RETRY_INITIAL"),
+            os.getenv("RETRY_MAX"),
+            os.getenv("CONNECT_DEADLINE"),
+            os.getenv("HAPPY_EYEBALLS_DELAY")
+        )
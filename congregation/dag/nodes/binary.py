@@ -56,11 +56,14 @@ class Join(BinaryOpNode):
             left_parent: OpNode,
             right_parent: OpNode,
             left_join_cols: list,
-            right_join_cols: list
+            right_join_cols: list,
+            unique_keys: [str, None] = None
     ):
         super(Join, self).__init__("join", out_rel, left_parent, right_parent)
         self.left_join_cols = left_join_cols
         self.right_join_cols = right_join_cols
+        # which input ("left" or "right"), if any, has unique join keys
+        self.unique_keys = unique_keys
 
     def verify_join_cols(self):
 
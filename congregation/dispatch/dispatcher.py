@@ -9,13 +9,17 @@ class Dispatcher:
         self.peer = peer
         self.config = config
         self.pid = config.system_configs["CODEGEN"].pid
+        # set to the name of the job being dispatched, and the id of this run of
+        # it (see Peer.job_id), which messages between parties are routed by
+        self.job_name = None
+        self.job_id = None
         self.parties_ready = {
-            p: asyncio.Future()
+            p: peer.loop.create_future()
             for p in config.system_configs["CODEGEN"].all_pids
             if p != self.pid
         }
         self.parties_config = {
-            p: {"CFG": asyncio.Future(), "ACK": asyncio.Future()}
+            p: {"CFG": peer.loop.create_future(), "ACK": peer.loop.create_future()}
             for p in config.system_configs["CODEGEN"].all_pids
             if p != self.pid
         }
@@ -27,8 +31,17 @@ class Dispatcher:
 
     def setup_dispatch(self, job: Job):
 
+        self.job_name = job.name
+        self.job_id = self.peer.job_id(job.name)
         self.peer.register_dispatcher(self)
-        self.synchronize(job)
+        try:
+            self.synchronize(job)
+        except Exception:
+            self.teardown_dispatch()
+            raise
+
+    def teardown_dispatch(self):
+        self.peer.unregister_dispatcher(self)
 
     def synchronize(self, job: Job):
         """ overridden in subclasses """
@@ -13,9 +13,12 @@ class JiffDispatcher(Dispatcher):
     def dispatch(self, job: JiffJob):
 
         self.setup_dispatch(job)
-        cmd = f"{job.code_dir}/{job.name}/run_client.sh"
-        print(f"Running jiff job at {job.code_dir}/{job.name}/party.js")
-        subprocess.call(["bash", cmd])
+        try:
+            cmd = f"{job.code_dir}/{job.name}/run_client.sh"
+            print(f"Running jiff job at {job.code_dir}/{job.name}/party.js")
+            subprocess.call(["bash", cmd])
+        finally:
+            self.teardown_dispatch()
 
     def setup_config(self):
 
@@ -93,7 +96,7 @@ class JiffDispatcher(Dispatcher):
     def _send_config(self, other_pid):
 
         print(f"Sending ConfigMsg to {other_pid}")
-        self.peer.send_cfg(other_pid, self.config_to_exchange, "JIFF")
+        self.peer.send_cfg(other_pid, self.config_to_exchange, "JIFF", self.job_id)
 
     def send_config(self, pids):
 
@@ -103,7 +106,7 @@ class JiffDispatcher(Dispatcher):
     def send_config_request(self, other_pid):
 
         print(f"Sending request for Jiff config to {other_pid}")
-        self.peer.send_request(other_pid, "CONFIG", "JIFF")
+        self.peer.send_request(other_pid, "CONFIG", "JIFF", self.job_id)
 
     def send_config_requests(self, pids):
 
@@ -177,7 +180,7 @@ class JiffDispatcher(Dispatcher):
                 self._dispatch_server(job)
                 for pid in self.parties_ready.keys():
                     print(f"Sending ReadyMsg to {pid}")
-                    self.peer.send_ready(pid, "JIFF")
+                    self.peer.send_ready(pid, "JIFF", self.job_id)
             else:
                 # wait for ReadyMsg from server party
                 self.peer.loop.run_until_complete(
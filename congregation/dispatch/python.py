@@ -1,8 +1,15 @@
 import subprocess
+import importlib.util
+import sys
 from congregation.dispatch.dispatcher import Dispatcher
 from congregation.config import Config
 from congregation.job import PythonJob
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 class PythonDispatcher(Dispatcher):
     def __init__(self, peer, config: Config):
@@ -12,9 +19,49 @@ class PythonDispatcher(Dispatcher):
     def dispatch(self, job: PythonJob):
 
         self.setup_dispatch(job)
-        cmd = f"{job.code_dir}/{job.name}/workflow.py"
-        print(f"Running python job at {job.code_dir}/{job.name}/workflow.py")
-        subprocess.call(["python", cmd])
+        try:
+            cmd = f"{job.code_dir}/{job.name}/workflow.py"
+            if self.config.system_configs["CODEGEN"].in_process:
+                self._run_in_process(job)
+            else:
+                print(f"Running python job at {job.code_dir}/{job.name}/workflow.py")
+                subprocess.call(["python", cmd])
+            self._log_max_rss(job)
+        finally:
+            self.teardown_dispatch()
+
+    def _log_max_rss(self, job: PythonJob):
+        """
+        report the memory high-water mark of the process that ran the job. for
+        subprocesses this is the largest peak across all children run so far
+        """
+
+        if resource is None:
+            return
+
+        who = resource.RUSAGE_SELF if self.config.system_configs["CODEGEN"].in_process else resource.RUSAGE_CHILDREN
+        max_rss = resource.getrusage(who).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        max_rss_mb = max_rss / 2 ** 20 if sys.platform == "darwin" else max_rss / 2 ** 10
+        print(f"Python job {job.name} finished, max RSS {max_rss_mb:.1f} MB")
+
+    @staticmethod
+    def _run_in_process(job: PythonJob):
+        """
+        load the generated workflow as a module and call its run() function in this
+        interpreter. while the relation cache is enabled (see Assemble.dispatch_jobs),
+        relations written by earlier in-process jobs are read back from it rather
+        than from disk
+        """
+
+        path = f"{job.code_dir}/{job.name}/workflow.py"
+        print(f"Running python job at {path} in process")
+
+        spec = importlib.util.spec_from_file_location(f"workflow_{job.name}", path)
+        workflow = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(workflow)
+
+        workflow.run()
 
     def synchronize(self, job: PythonJob):
         # TODO: if it's a networked job then synchronize else pass
@@ -7,7 +7,14 @@ from congregation.utils.rel import *
 
 
 def join(left_input_node: OpNode, right_input_node: OpNode, name: str,
-         left_col_names: list, right_col_names: list):
+         left_col_names: list, right_col_names: list, unique_keys: [str, None] = None):
+    """
+    unique_keys can be set to "left" or "right" to declare that the join keys of that
+    input are unique, which lets MPC backends use a join whose output is linear in size
+    """
+
+    if unique_keys not in {None, "left", "right"}:
+        raise Exception(f"Value passed to unique_keys must be \"left\", \"right\", or None, got {unique_keys}.")
 
     if len(left_col_names) != len(right_col_names):
         raise Exception(
@@ -57,7 +64,7 @@ def join(left_input_node: OpNode, right_input_node: OpNode, name: str,
     out_rel = Relation(name, out_rel_cols, out_stored_with)
     out_rel.update_columns()
 
-    op = Join(out_rel, left_input_node, right_input_node, left_join_cols, right_join_cols)
+    op = Join(out_rel, left_input_node, right_input_node, left_join_cols, right_join_cols, unique_keys)
     left_input_node.children.add(op)
     right_input_node.children.add(op)
 
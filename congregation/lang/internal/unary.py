@@ -26,11 +26,22 @@ def persist(input_op_node: OpNode, name: str):
     return op
 
 
-def send(input_op_node: OpNode, name: str):
-    # TODO: figure out SW / TW / PT sets here
-
-    out_rel = copy.deepcopy(input_op_node.out_rel)
-    out_rel.rename(name)
+def send(input_op_node: OpNode, name: str, target_parties: [set, None] = None):
+    """
+    the output of a send is stored with (and trusted to) target_parties,
+    or with the same parties as its input if target_parties isn't given
+    """
+
+    if target_parties is None:
+        out_rel = copy.deepcopy(input_op_node.out_rel)
+        out_rel.rename(name)
+    else:
+        out_rel_cols = copy.deepcopy(input_op_node.out_rel.columns)
+        for c in out_rel_cols:
+            c.trust_with = c.trust_with.union(target_parties)
+            c.plaintext = c.plaintext.union(target_parties)
+        out_rel = Relation(name, out_rel_cols, [{p} for p in target_parties])
+        out_rel.update_columns()
 
     op = Send(out_rel, input_op_node)
     input_op_node.children.add(op)
@@ -1 +1,2 @@
 from congregation.net.peer import Peer
+from congregation.net.session import get_peer, close_peer, close_sessions
@@ -0,0 +1,11 @@
+import random
+
+
+def backoff_delay(attempt: int, initial: float, maximum: float):
+    """
+    exponential backoff with full jitter: a delay drawn uniformly between zero and
+    initial * 2 ** (attempt - 1), capped at maximum, so that parties which start
+    (or fail) at the same time don't keep retrying in lockstep
+    """
+
+    return random.uniform(0, min(maximum, initial * 2 ** min(attempt - 1, 32)))
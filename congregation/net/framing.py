@@ -0,0 +1,101 @@
+import struct
+
+
+"""
+Messages between peers are sent as length prefixed frames: a fixed size header
+holding the frame format version, the id of the codec that encoded the payload
+(see congregation.net.messages.codec), the message type, the length of the job id
+and the length of the payload, followed by the job id (utf-8) and the payload.
+"""
+
+
+VERSION = 1
+HEADER = struct.Struct("!BBBHI")
+MSG_TYPES = {
+    "IAM": 1,
+    "READY": 2,
+    "CONFIG": 3,
+    "ACK": 4,
+    "REQUEST": 5,
+    "REL_HEADER": 6,
+    "REL_CHUNK": 7
+}
+MSG_TYPE_NAMES = {v: k for k, v in MSG_TYPES.items()}
+
+
+class Frame:
+    def __init__(self, msg_type: str, codec_id: int, job_id: str, payload: [bytes, memoryview]):
+        self.msg_type = msg_type
+        self.codec_id = codec_id
+        self.job_id = job_id
+        self.payload = payload
+
+    def __str__(self):
+        return f"Frame({self.msg_type}): {self.job_id}, {len(self.payload)} bytes"
+
+
+def frame_prefix(msg_type: str, codec_id: int, job_id: [str, None], payload_len: int):
+    """
+    the header and job id of a frame, for callers that write its payload separately
+    """
+
+    if msg_type not in MSG_TYPES:
+        raise Exception(f"Can't frame message of unrecognized type {msg_type}.")
+
+    job_id_bytes = b"" if job_id is None else job_id.encode("utf-8")
+    return HEADER.pack(VERSION, codec_id, MSG_TYPES[msg_type], len(job_id_bytes), payload_len) + job_id_bytes
+
+
+def encode_frame(msg_type: str, codec_id: int, job_id: [str, None], payload: [bytes, bytearray, memoryview]):
+    return b"".join([frame_prefix(msg_type, codec_id, job_id, len(payload)), payload])
+
+
+class FrameBuffer:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def __len__(self):
+        return len(self.buffer) - self.offset
+
+    def feed(self, data: [bytes, bytearray, memoryview]):
+        """
+        consumed bytes are only dropped from the front of the buffer once they make up
+        at least half of it, so that a message arriving in many chunks is buffered
+        in amortized linear time
+        """
+
+        if self.offset > 0 and self.offset * 2 >= len(self.buffer):
+            del self.buffer[:self.offset]
+            self.offset = 0
+        self.buffer += data
+
+    def frames(self):
+        """
+        yield every complete frame in the buffer. payloads are views into the buffer
+        rather than copies, and are only valid until the next call to feed()
+        """
+
+        view = memoryview(self.buffer)
+        try:
+            while len(view) - self.offset >= HEADER.size:
+                version, codec_id, type_code, job_id_len, payload_len = HEADER.unpack_from(view, self.offset)
+                if version != VERSION:
+                    raise Exception(f"Unsupported frame version {version}.")
+                if type_code not in MSG_TYPE_NAMES:
+                    raise Exception(f"Frame received with unrecognized message type {type_code}.")
+
+                start = self.offset + HEADER.size
+                end = start + job_id_len + payload_len
+                if len(view) < end:
+                    break
+
+                job_id = str(view[start:start + job_id_len], "utf-8")
+                payload = view[start + job_id_len:end]
+                self.offset = end
+                try:
+                    yield Frame(MSG_TYPE_NAMES[type_code], codec_id, job_id, payload)
+                finally:
+                    payload.release()
+        finally:
+            view.release()
@@ -1,5 +1,5 @@
 import asyncio
-import pickle
+from congregation.net.framing import Frame
 from congregation.net.messages import *
 
 
@@ -9,20 +9,22 @@ class Handler:
         self.server = server
         self.msg_handlers = self._define_msg_map()
 
-    def handle_msg(self, data):
+    def handle_frame(self, frame: Frame):
         """
-        determine message type and handle accordingly
+        decode a message with the codec it was sent with and handle it
         """
 
-        if isinstance(data, Msg):
-            m = data
-        else:
-            m = pickle.loads(data)
+        self.handle_msg(get_codec(frame.codec_id).decode(frame.msg_type, frame.payload), frame.job_id)
+
+    def handle_msg(self, m: Msg, job_id: str):
+        """
+        determine message type and handle accordingly
+        """
 
         if m.pid not in self.peer.peer_connections:
             raise Exception(f"Msg of type {m.msg_type} received from unrecognized peer: {m.pid}")
 
-        self.msg_handlers[m.msg_type](m)
+        self.msg_handlers[m.msg_type](m, job_id)
 
     def _define_msg_map(self):
         return {
@@ -33,21 +35,33 @@ class Handler:
             "REQUEST": self.handle_request_msg
         }
 
-    def _check_dispatcher(self, m: [ReadyMsg, ConfigMsg, AckMsg, RequestMsg]):
-
-        if self.peer.dispatcher is not None:
-            if self.peer.dispatcher.dispatch_type == m.job_type:
-                return True
-        self.peer.msg_buffer.append(m)
-        return False
+    def _get_dispatcher(self, m: [ReadyMsg, ConfigMsg, AckMsg, RequestMsg], job_id: str):
+        """
+        return the dispatcher for the job this message was sent for, or buffer the message
+        until that dispatcher is registered. messages for torn down jobs are dropped
+        """
 
-    def handle_iam_msg(self, m: IAMMsg):
+        dispatcher = self.peer.dispatchers.get(job_id)
+        if dispatcher is not None:
+            if dispatcher.dispatch_type != m.job_type:
+                # dropped rather than raised, which would close a connection other jobs are using
+                print(f"Dropping {m.job_type} Msg from party {m.pid} for {dispatcher.dispatch_type} job {job_id}.")
+                return None
+            return dispatcher
+        if job_id in self.peer.torn_down:
+            print(f"Dropping {m.msg_type} Msg from party {m.pid} for finished job {job_id}.")
+            return None
+        self.peer.buffer_msg(job_id, m)
+        return None
+
+    def handle_iam_msg(self, m: IAMMsg, job_id: str):
         """
         we need to be able to resolve which party a given connection
         is for, which is why a done callback is added to the connection
         future which sends an IAMMsg with the pid of the connecting party.
         this function sets that connection value in peer.peer_connections
-        accordingly when an IAMMsg is received.
+        accordingly when an IAMMsg is received. a party that connects
+        again (e.g. after restarting) replaces its previous connection.
         """
 
         print(f"IAMMsg received from {m.pid}")
@@ -55,45 +69,52 @@ class Handler:
         if isinstance(conn, asyncio.Future):
             if not conn.done():
                 conn.set_result((self.server.transport, self))
+        elif conn is not self.server.transport:
+            self.peer.peer_connections[m.pid] = self.server.transport
 
-    def handle_ready_msg(self, m: ReadyMsg):
+    def handle_ready_msg(self, m: ReadyMsg, job_id: str):
 
-        if self._check_dispatcher(m):
-            print(f"ReadyMsg received from party {m.pid} for {m.job_type} job.")
-            rdy = self.peer.dispatcher.parties_ready[m.pid]
+        dispatcher = self._get_dispatcher(m, job_id)
+        if dispatcher is not None:
+            print(f"ReadyMsg received from party {m.pid} for {m.job_type} job {job_id}.")
+            rdy = dispatcher.parties_ready[m.pid]
             if isinstance(rdy, asyncio.Future):
                 if not rdy.done():
                     rdy.set_result(True)
 
-    def handle_config_msg(self, m: ConfigMsg):
+    def handle_config_msg(self, m: ConfigMsg, job_id: str):
 
-        if self._check_dispatcher(m):
-            print(f"ConfigMsg received from party {m.pid} for {m.job_type} job.")
-            cfg = self.peer.dispatcher.parties_config[m.pid]["CFG"]
+        dispatcher = self._get_dispatcher(m, job_id)
+        if dispatcher is not None:
+            print(f"ConfigMsg received from party {m.pid} for {m.job_type} job {job_id}.")
+            cfg = dispatcher.parties_config[m.pid]["CFG"]
             if isinstance(cfg, asyncio.Future):
                 if not cfg.done():
                     cfg.set_result(m.config)
 
-            print(f"Sending AckMsg to party {m.pid} for receipt of ConfigMsg for {m.job_type} job.")
+            print(f"Sending AckMsg to party {m.pid} for receipt of ConfigMsg for {m.job_type} job {job_id}.")
             self.peer.send_ack(
                 m.pid,
                 "CONFIG",
-                m.job_type
+                m.job_type,
+                job_id
             )
 
-    def handle_ack_msg(self, m: AckMsg):
+    def handle_ack_msg(self, m: AckMsg, job_id: str):
 
-        if self._check_dispatcher(m):
-            print(f"AckMsg of type {m.ack_type} received from party {m.pid} for {m.job_type} job.")
+        dispatcher = self._get_dispatcher(m, job_id)
+        if dispatcher is not None:
+            print(f"AckMsg of type {m.ack_type} received from party {m.pid} for {m.job_type} job {job_id}.")
             if m.ack_type == "CONFIG":
-                a = self.peer.dispatcher.parties_config[m.pid]["ACK"]
+                a = dispatcher.parties_config[m.pid]["ACK"]
                 if isinstance(a, asyncio.Future):
                     if not a.done():
                         a.set_result(True)
 
-    def handle_request_msg(self, m: RequestMsg):
+    def handle_request_msg(self, m: RequestMsg, job_id: str):
 
-        if self._check_dispatcher(m):
-            print(f"Request message for {m.request_type} received from party {m.pid} for {m.job_type} job.")
+        dispatcher = self._get_dispatcher(m, job_id)
+        if dispatcher is not None:
+            print(f"Request message for {m.request_type} received from party {m.pid} for {m.job_type} job {job_id}.")
             if m.request_type == "CONFIG":
-                self.peer.send_cfg(m.pid, self.peer.dispatcher.config_to_exchange, m.job_type)
+                self.peer.send_cfg(m.pid, dispatcher.config_to_exchange, m.job_type, job_id)
@@ -4,3 +4,4 @@ from congregation.net.messages.ready import ReadyMsg
 from congregation.net.messages.config import ConfigMsg
 from congregation.net.messages.ack import AckMsg
 from congregation.net.messages.request import RequestMsg
+from congregation.net.messages.codec import Codec, StructCodec, MsgpackCodec, register_codec, get_codec
@@ -0,0 +1,166 @@
+import json
+import struct
+from congregation.net.messages.iam import IAMMsg
+from congregation.net.messages.ready import ReadyMsg
+from congregation.net.messages.config import ConfigMsg
+from congregation.net.messages.ack import AckMsg
+from congregation.net.messages.request import RequestMsg
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+"""
+Codecs turn messages into payload bytes and back, using a fixed schema per message
+type rather than pickle, so that decoding data from a peer can only ever build one
+of the message classes below. Every codec has a name (used in configs) and an id
+(sent in the header of each frame, see congregation.net.framing), and is looked
+up in the registry by either.
+"""
+
+
+SCHEMAS = {
+    "IAM": (IAMMsg, [("pid", "int")]),
+    "READY": (ReadyMsg, [("pid", "int"), ("job_type", "str")]),
+    "CONFIG": (ConfigMsg, [("pid", "int"), ("config", "map"), ("job_type", "str")]),
+    "ACK": (AckMsg, [("pid", "int"), ("ack_type", "str"), ("job_type", "str")]),
+    "REQUEST": (RequestMsg, [("pid", "int"), ("request_type", "str"), ("job_type", "str")])
+}
+
+
+class Codec:
+    def __init__(self, name: str, codec_id: int):
+        self.name = name
+        self.codec_id = codec_id
+
+    @staticmethod
+    def _schema(msg_type: str):
+
+        if msg_type not in SCHEMAS:
+            raise Exception(f"No schema for message of type {msg_type}.")
+        return SCHEMAS[msg_type]
+
+    def encode(self, m):
+        """ Overridden in subclasses """
+        pass
+
+    def decode(self, msg_type: str, data: [bytes, memoryview]):
+        """ Overridden in subclasses """
+        pass
+
+
+class StructCodec(Codec):
+    """
+    ints are packed as signed 64 bit integers, strings as a 16 bit length followed by
+    their utf-8 bytes, and maps (configs) as a 32 bit length followed by their json
+    """
+
+    INT = struct.Struct("!q")
+    STR_LEN = struct.Struct("!H")
+    MAP_LEN = struct.Struct("!I")
+
+    def __init__(self):
+        super(StructCodec, self).__init__("struct", 1)
+
+    def encode(self, m):
+
+        ret = []
+        for attr, kind in self._schema(m.msg_type)[1]:
+            v = getattr(m, attr)
+            if kind == "int":
+                ret.append(self.INT.pack(v))
+            elif kind == "str":
+                b = v.encode("utf-8")
+                ret.extend([self.STR_LEN.pack(len(b)), b])
+            else:
+                b = json.dumps(v, separators=(",", ":")).encode("utf-8")
+                ret.extend([self.MAP_LEN.pack(len(b)), b])
+
+        return b"".join(ret)
+
+    def decode(self, msg_type: str, data: [bytes, memoryview]):
+
+        cls, fields = self._schema(msg_type)
+        vals = []
+        offset = 0
+        try:
+            for attr, kind in fields:
+                if kind == "int":
+                    vals.append(self.INT.unpack_from(data, offset)[0])
+                    offset += self.INT.size
+                    continue
+
+                length_fmt = self.STR_LEN if kind == "str" else self.MAP_LEN
+                length = length_fmt.unpack_from(data, offset)[0]
+                offset += length_fmt.size
+                if offset + length > len(data):
+                    raise ValueError(f"{attr} overruns the payload")
+                v = str(data[offset:offset + length], "utf-8")
+                if kind == "map":
+                    v = json.loads(v)
+                    if not isinstance(v, dict):
+                        raise ValueError(f"{attr} is not a map")
+                vals.append(v)
+                offset += length
+        except (struct.error, UnicodeDecodeError, ValueError) as e:
+            raise Exception(f"Malformed payload for message of type {msg_type}: {e}")
+
+        if offset != len(data):
+            raise Exception(f"Malformed payload for message of type {msg_type}: {len(data) - offset} trailing bytes")
+
+        return cls(*vals)
+
+
+class MsgpackCodec(Codec):
+    """
+    messages are packed as a msgpack array of their schema's fields, in order
+    """
+
+    def __init__(self):
+        super(MsgpackCodec, self).__init__("msgpack", 2)
+
+    def encode(self, m):
+        return msgpack.packb([getattr(m, attr) for attr, _ in self._schema(m.msg_type)[1]])
+
+    def decode(self, msg_type: str, data: [bytes, memoryview]):
+
+        cls, fields = self._schema(msg_type)
+        try:
+            vals = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+            raise Exception(f"Malformed payload for message of type {msg_type}: {e}")
+
+        if not isinstance(vals, list) or len(vals) != len(fields):
+            raise Exception(f"Malformed payload for message of type {msg_type}: expected {len(fields)} fields")
+        for v, (attr, kind) in zip(vals, fields):
+            expected = {"int": int, "str": str, "map": dict}[kind]
+            if not isinstance(v, expected) or isinstance(v, bool):
+                raise Exception(f"Malformed payload for message of type {msg_type}: bad value for {attr}")
+
+        return cls(*vals)
+
+
+CODECS = {}
+
+
+def register_codec(codec: Codec):
+
+    for k in [codec.name, codec.codec_id]:
+        if k in CODECS:
+            raise Exception(f"Codec {k} already registered.")
+    CODECS[codec.name] = codec
+    CODECS[codec.codec_id] = codec
+
+
+def get_codec(key: [str, int]):
+
+    if key not in CODECS:
+        raise Exception(f"Unrecognized codec {key}.")
+    return CODECS[key]
+
+
+register_codec(StructCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
@@ -1,13 +1,19 @@
 import asyncio
-import pickle
+from collections import deque
 from functools import partial
 from congregation.config import Config
 from congregation.net.messages import *
+from congregation.net.framing import encode_frame
 from congregation.net.protocol import CongregationProtocol
 from congregation.net.handler import Handler
+from congregation.net.backoff import backoff_delay
 from congregation.dispatch.dispatcher import Dispatcher
 
 
+MAX_BUFFERED_MSGS = 1024
+MAX_TORN_DOWN = 1024
+
+
 class Peer:
     def __init__(self, loop, cfg: Config):
         self.loop = loop
@@ -15,74 +21,208 @@ class Peer:
         self.parties = cfg.system_configs["NETWORK"].network_dict["parties"]
         self.host = self.parties[self.pid]["host"]
         self.port = self.parties[self.pid]["port"]
+        self.net_cfg = cfg.system_configs["NETWORK"]
+        self.codec = get_codec(self.net_cfg.codec)
         self.peer_connections = {}
+        self.connection_metrics = {}
+        # messages for jobs whose dispatcher isn't registered yet, as (job id, message) pairs
         self.msg_buffer = []
-        self.server = self.loop.create_server(
-            lambda: CongregationProtocol(self),
-            host=self.host,
-            port=self.port
+        # number of completed runs of each job name, and the ids of recently torn down jobs
+        self.job_runs = {}
+        self.torn_down = deque(maxlen=MAX_TORN_DOWN)
+        self.server = self.loop.run_until_complete(
+            self.loop.create_server(
+                lambda: CongregationProtocol(self),
+                host=self.host,
+                port=self.port
+            )
         )
-        self.loop.run_until_complete(self.server)
         self.handler = Handler(self)
-        self.dispatcher = None
+        self.dispatchers = {}
+
+    def job_id(self, job_name: str):
+        """
+        jobs with the same name run again whenever their workflow is run again over this
+        session, so job ids are numbered by how many runs of that job have completed. every
+        party runs the same jobs in the same order, so they agree on the id of each run, and
+        messages for a run that arrive after it was torn down can't reach the next one
+        """
+
+        return f"{job_name}.{self.job_runs.get(job_name, 0)}"
+
+    def reset_job_runs(self):
+        """
+        called when reconnecting to a party, which may have restarted and
+        started numbering runs from zero again (as every party then does)
+        """
+
+        self.job_runs = {}
+        self.torn_down.clear()
+
+    def buffer_msg(self, job_id: str, m: Msg):
+
+        if len(self.msg_buffer) >= MAX_BUFFERED_MSGS:
+            dropped_id, dropped = self.msg_buffer.pop(0)
+            print(f"Message buffer full, dropping {dropped.msg_type} Msg from party {dropped.pid} for job {dropped_id}.")
+        self.msg_buffer.append((job_id, m))
 
     def register_dispatcher(self, dispatcher: Dispatcher):
+        """
+        several jobs (from any number of workflows) can be dispatched over the same connections.
+        messages are routed to the dispatcher registered under the job id they were sent with
+        """
 
-        self.dispatcher = dispatcher
+        if dispatcher.job_id in self.dispatchers:
+            raise Exception(f"Dispatcher already registered for job {dispatcher.job_id}.")
+
+        self.dispatchers[dispatcher.job_id] = dispatcher
         ret = []
-        # TODO: might want to match instead on a job_id or something
-        for m in self.msg_buffer:
-            if m.job_type == dispatcher.dispatch_type:
-                self.handler.handle_msg(m)
+        for job_id, m in self.msg_buffer:
+            if job_id == dispatcher.job_id:
+                self.handler.handle_msg(m, job_id)
             else:
-                ret.append(m)
+                ret.append((job_id, m))
         self.msg_buffer = ret
 
-    async def _create_connection(self, f, other_host, other_port):
+    def unregister_dispatcher(self, dispatcher: Dispatcher):
+        """
+        messages that arrive for a job after it was torn down (e.g. resent configs) are dropped
+        """
+
+        if self.dispatchers.pop(dispatcher.job_id, None) is None:
+            return
+        self.job_runs[dispatcher.job_name] = self.job_runs.get(dispatcher.job_name, 0) + 1
+        self.torn_down.append(dispatcher.job_id)
+        self.msg_buffer = [(job_id, m) for job_id, m in self.msg_buffer if job_id != dispatcher.job_id]
+
+    def disconnected(self):
+        """
+        parties that we aren't connected to, or whose connection has closed
+        """
+
+        return [
+            pid for pid, conn in self.peer_connections.items()
+            if isinstance(conn, asyncio.Future) or conn.is_closing()
+        ]
+
+    def close(self):
 
+        for conn in self.peer_connections.values():
+            if isinstance(conn, asyncio.Future):
+                conn.cancel()
+            else:
+                conn.close()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+
+    async def _create_connection(self, f, other_pid: int, start: float):
+        """
+        retry with exponential backoff until connected, or until the connection
+        deadline (measured from start) has passed. when the other party's host
+        resolves to several addresses, they're tried in parallel (happy eyeballs)
+        """
+
+        other_host = self.parties[other_pid]["host"]
+        other_port = self.parties[other_pid]["port"]
+        deadline = self.net_cfg.connect_deadline
+        attempts = 0
         while True:
+            attempts += 1
+            timeout = None if deadline is None else max(start + deadline - self.loop.time(), 0)
             try:
-                conn = await self.loop.create_connection(f, other_host, other_port)
+                conn = await asyncio.wait_for(
+                    self.loop.create_connection(
+                        f,
+                        other_host,
+                        other_port,
+                        happy_eyeballs_delay=self.net_cfg.happy_eyeballs_delay
+                    ),
+                    timeout
+                )
+                self.connection_metrics[other_pid]["attempts"] = attempts
                 return conn
-            except OSError:
-                print(f"Retrying connection to {other_host}:{other_port}")
-                await asyncio.sleep(1)
+            except (OSError, asyncio.TimeoutError) as e:
+                delay = backoff_delay(attempts, self.net_cfg.retry_initial, self.net_cfg.retry_max)
+                if deadline is not None and self.loop.time() + delay > start + deadline:
+                    raise Exception(
+                        f"Couldn't connect to party {other_pid} at {other_host}:{other_port} "
+                        f"within {deadline}s ({attempts} attempts): {e}"
+                    )
+                print(f"Retrying connection to {other_host}:{other_port} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _record_connection(self, other_pid: int, start: float, f: asyncio.Future):
+        """
+        as each party connects, report which parties are still being waited on
+        """
+
+        if f.cancelled() or f.exception() is not None:
+            return
+
+        self.connection_metrics[other_pid]["seconds"] = self.loop.time() - start
+        waiting = sorted(pid for pid, m in self.connection_metrics.items() if "seconds" not in m)
+        if waiting:
+            print(f"Party {other_pid} connected after {self.loop.time() - start:.2f}s, still waiting on {waiting}")
 
-    def connect_to_others(self):
+    def _report_connections(self, failed: dict):
         """
-        establish connections to parties
-        from network configuration dict
+        print how long each party took to connect, slowest first, along with
+        the parties that didn't connect in time
         """
 
-        to_wait_on = []
-        for other_pid in self.parties.keys():
+        connected = [pid for pid in self.connection_metrics if "seconds" in self.connection_metrics[pid]]
+        for pid in sorted(connected, key=lambda p: -self.connection_metrics[p]["seconds"]):
+            m = self.connection_metrics[pid]
+            attempts = f", {m['attempts']} attempts" if "attempts" in m else ""
+            print(f"Party {pid} connected after {m['seconds']:.2f}s ({m['direction']}{attempts})")
+        for pid, f in failed.items():
+            reason = f": {f.exception()}" if f.done() else ""
+            print(f"Party {pid} did not connect ({self.connection_metrics[pid]['direction']}){reason}")
+
+    def connect_to_others(self, pids: [list, None] = None):
+        """
+        establish connections to parties from network configuration dict (or only to pids,
+        when reconnecting). we connect to parties with lower pids, and wait for parties
+        with higher pids to connect to us, all concurrently, for at most the connection
+        deadline (if any)
+        """
+
+        start = self.loop.time()
+        to_wait_on = {}
+        for other_pid in (pids if pids is not None else self.parties.keys()):
             if other_pid < self.pid:
                 print(f"Will connect to {other_pid}")
-                conn = asyncio.ensure_future(
-                    self._create_connection(
-                        lambda: CongregationProtocol(self),
-                        self.parties[other_pid]["host"],
-                        self.parties[other_pid]["port"]
-                    )
+                self.connection_metrics[other_pid] = {"direction": "outgoing"}
+                conn = self.loop.create_task(
+                    self._create_connection(lambda: CongregationProtocol(self), other_pid, start)
                 )
                 self.peer_connections[other_pid] = conn
                 conn.add_done_callback(partial(self.send_iam))
-                to_wait_on.append(conn)
             elif other_pid > self.pid:
                 print(f"Will wait for {other_pid} to connect.")
-                connection_made = asyncio.Future()
-                self.peer_connections[other_pid] = connection_made
-                to_wait_on.append(connection_made)
+                self.connection_metrics[other_pid] = {"direction": "incoming"}
+                conn = self.loop.create_future()
+                self.peer_connections[other_pid] = conn
             else:
                 # self
                 continue
+            conn.add_done_callback(partial(self._record_connection, other_pid, start))
+            to_wait_on[other_pid] = conn
 
-        self.loop.run_until_complete(asyncio.gather(*to_wait_on))
-        for pid in self.peer_connections.keys():
-            completed_future = self.peer_connections[pid]
+        if to_wait_on:
+            self.loop.run_until_complete(asyncio.wait(to_wait_on.values(), timeout=self.net_cfg.connect_deadline))
+
+        failed = {pid: f for pid, f in to_wait_on.items() if not f.done() or f.exception() is not None}
+        self._report_connections(failed)
+        if failed:
+            for f in failed.values():
+                f.cancel()
+            raise Exception(f"Parties {sorted(failed)} did not connect within {self.net_cfg.connect_deadline}s.")
+
+        for pid, completed_future in to_wait_on.items():
             self.peer_connections[pid] = completed_future.result()[0]
 
-    def _send_msg(self, to_pid, m):
+    def _send_msg(self, to_pid, m, job_id: str):
 
         if to_pid not in self.peer_connections:
             raise Exception(
@@ -90,36 +230,43 @@ class Peer:
                 f"{to_pid} not in peer connections."
             )
 
-        formatted = pickle.dumps(m) + b"\n\n\n"
-        self.peer_connections[to_pid].write(formatted)
+        self.peer_connections[to_pid].write(self._format_msg(m, job_id))
+
+    def _format_msg(self, m: Msg, job_id: [str, None] = None):
+        """
+        messages that belong to a job are framed with its job id
+        """
+
+        return encode_frame(m.msg_type, self.codec.codec_id, job_id, self.codec.encode(m))
 
     def send_iam(self, conn):
 
         if isinstance(conn, asyncio.Future):
+            if conn.cancelled() or conn.exception() is not None:
+                return
             transport, protocol = conn.result()
         else:
             transport = conn
 
         m = IAMMsg(self.pid)
-        formatted = pickle.dumps(m) + b"\n\n\n"
-        transport.write(formatted)
+        transport.write(self._format_msg(m))
 
-    def send_ready(self, to_pid, job_type):
+    def send_ready(self, to_pid, job_type, job_id):
 
         m = ReadyMsg(self.pid, job_type)
-        self._send_msg(to_pid, m)
+        self._send_msg(to_pid, m, job_id)
 
-    def send_cfg(self, to_pid, cfg, job_type):
+    def send_cfg(self, to_pid, cfg, job_type, job_id):
 
         m = ConfigMsg(self.pid, cfg, job_type)
-        self._send_msg(to_pid, m)
+        self._send_msg(to_pid, m, job_id)
 
-    def send_ack(self, to_pid, ack_type, job_type):
+    def send_ack(self, to_pid, ack_type, job_type, job_id):
 
         m = AckMsg(self.pid, ack_type, job_type)
-        self._send_msg(to_pid, m)
+        self._send_msg(to_pid, m, job_id)
 
-    def send_request(self, to_pid, request_type, job_type):
+    def send_request(self, to_pid, request_type, job_type, job_id):
 
         m = RequestMsg(self.pid, request_type, job_type)
-        self._send_msg(to_pid, m)
+        self._send_msg(to_pid, m, job_id)
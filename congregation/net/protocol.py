@@ -1,11 +1,12 @@
 import asyncio
+from congregation.net.framing import FrameBuffer
 from congregation.net.handler import Handler
 
 
 class CongregationProtocol(asyncio.Protocol):
     def __init__(self, peer):
         self.peer = peer
-        self.buffer = b""
+        self.buffer = FrameBuffer()
         self.transport = None
         self.handler = Handler(peer, self)
 
@@ -19,10 +20,9 @@ class CongregationProtocol(asyncio.Protocol):
         print('The server closed the connection')
 
     def data_received(self, data: bytes):
-        self.buffer += data
-        self.handle_lines()
+        self.buffer.feed(data)
+        self.handle_frames()
 
-    def handle_lines(self):
-        while b"\n\n\n" in self.buffer:
-            data, self.buffer = self.buffer.split(b"\n\n\n", 1)
-            self.handler.handle_msg(data)
+    def handle_frames(self):
+        for frame in self.buffer.frames():
+            self.handler.handle_frame(frame)
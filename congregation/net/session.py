@@ -0,0 +1,64 @@
+import asyncio
+from congregation.config import Config
+from congregation.net.peer import Peer
+
+
+"""
+Peers are pooled per network configuration, so that a long-lived process which runs
+many workflows between the same parties starts its server and connects to the other
+parties once, rather than once per workflow. The jobs of every workflow then share
+those connections, since messages are routed to dispatchers by job id (see
+Peer.register_dispatcher). Job ids are derived from workflow names and numbered per
+run (see Peer.job_id), so workflows that run concurrently over the same session need
+distinct workflow names, and every party must run workflows in the same order.
+"""
+
+
+SESSIONS = {}
+
+
+def _session_key(cfg: Config):
+
+    net_cfg = cfg.system_configs["NETWORK"]
+    parties = net_cfg.network_dict["parties"]
+    return net_cfg.pid, tuple(sorted((pid, p["host"], str(p["port"])) for pid, p in parties.items()))
+
+
+def get_peer(loop: asyncio.AbstractEventLoop, cfg: Config):
+    """
+    return the pooled peer for this network configuration, reconnecting to any parties
+    whose connections have closed since it was last used, or create and connect a
+    new one if there isn't one (or if it was created on a different event loop)
+    """
+
+    key = _session_key(cfg)
+    peer = SESSIONS.get(key)
+    if peer is not None and peer.loop is loop and not loop.is_closed():
+        disconnected = peer.disconnected()
+        if disconnected:
+            print(f"Reconnecting to parties {disconnected}")
+            peer.reset_job_runs()
+            peer.connect_to_others(disconnected)
+        return peer
+
+    if peer is not None:
+        close_peer(peer)
+    peer = Peer(loop, cfg)
+    SESSIONS[key] = peer
+    peer.connect_to_others()
+
+    return peer
+
+
+def close_peer(peer: Peer):
+
+    for k in [k for k, v in SESSIONS.items() if v is peer]:
+        del SESSIONS[k]
+    if not peer.loop.is_closed():
+        peer.close()
+
+
+def close_sessions():
+
+    for peer in list(SESSIONS.values()):
+        close_peer(peer)
@@ -0,0 +1,371 @@
+import asyncio
+import json
+import struct
+import zlib
+from congregation.net.framing import FrameBuffer, Frame, encode_frame, frame_prefix
+from congregation.net.backoff import backoff_delay
+from congregation.net.messages.ack import AckMsg
+from congregation.net.messages.codec import get_codec
+
+
+"""
+Relations are sent between parties column by column over a dedicated connection to the
+receiving party's data port. The sender first sends a REL_HEADER frame holding its pid,
+the column names, the type of each column and the number of rows, then every column as
+REL_CHUNK frames of at most chunk_size bytes, each tagged with its column index and byte
+offset into the column, and optionally compressed with zlib. Columns are sent as
+little-endian 64 bit ints ("q") or floats ("d"). The job id of every frame is the name
+of the relation. Once a relation has arrived in full, the receiver replies with an
+AckMsg and closes the connection.
+
+Uncompressed chunks are written to the transport as memoryviews into the sender's
+column buffers, so (on transports that support it) they are sent without copying them
+first. The sender waits whenever the transport's write buffer is full. The receiver
+copies uncompressed chunks straight into the columns it allocated when the header
+arrived, and decompresses compressed chunks in a thread pool, pausing reading from
+the connection while too many compressed bytes are waiting to be decompressed.
+"""
+
+
+CHUNK = struct.Struct("!HQB")
+CHUNK_SIZE = 2 ** 20
+MAX_PENDING = 2 ** 24
+RETRY_INITIAL = 0.1
+RETRY_MAX = 5.0
+TYPE_SIZES = {"q": 8, "d": 8}
+RAW_CODEC_ID = 0
+
+
+def run_transfer(coro):
+    """
+    run a transfer to completion on a new event loop, without replacing the
+    event loop of this thread (which the peer may be using)
+    """
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+class _SendProtocol(asyncio.Protocol):
+    def __init__(self, name: str):
+        self.name = name
+        self.transport = None
+        self.buffer = FrameBuffer()
+        self.can_write = asyncio.Event()
+        self.can_write.set()
+        self.acked = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport: asyncio.transports.BaseTransport):
+        self.transport = transport
+
+    def pause_writing(self):
+        self.can_write.clear()
+
+    def resume_writing(self):
+        self.can_write.set()
+
+    def data_received(self, data: bytes):
+
+        self.buffer.feed(data)
+        for frame in self.buffer.frames():
+            m = get_codec(frame.codec_id).decode(frame.msg_type, frame.payload)
+            if isinstance(m, AckMsg) and m.ack_type == "REL" and m.job_type == self.name and not self.acked.done():
+                self.acked.set_result(True)
+
+    def connection_lost(self, exc):
+
+        self.can_write.set()
+        if not self.acked.done():
+            self.acked.set_exception(Exception(f"Connection lost before relation {self.name} was acknowledged."))
+
+
+async def _connect(loop, f, host: str, port: int, retry_initial: float, retry_max: float, deadline: [float, None]):
+    """
+    retry with exponential backoff (with the same settings the peer connects with,
+    see Peer._create_connection) until connected, or until the deadline has passed
+    """
+
+    start = loop.time()
+    attempts = 0
+    while True:
+        attempts += 1
+        timeout = None if deadline is None else max(start + deadline - loop.time(), 0)
+        try:
+            return await asyncio.wait_for(loop.create_connection(f, host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            delay = backoff_delay(attempts, retry_initial, retry_max)
+            if deadline is not None:
+                remaining = start + deadline - loop.time()
+                if remaining <= 0:
+                    raise Exception(f"Couldn't connect to {host}:{port} within {deadline}s.") from e
+                delay = min(delay, remaining)
+            print(f"Retrying connection to {host}:{port} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+async def send_columns(
+        host: str,
+        port: int,
+        name: str,
+        pid: int,
+        header: list,
+        columns: list,
+        num_rows: int,
+        compress_level: [int, None] = None,
+        chunk_size: [int, None] = None,
+        retry_initial: [float, None] = None,
+        retry_max: [float, None] = None,
+        connect_deadline: [float, None] = None
+):
+    """
+    send a relation, given as a list of (type, buffer) pairs (one per column) where each
+    buffer is a bytes-like object holding the column in the wire format above, to the
+    party listening at host:port. returns once the receiver has acknowledged it
+    """
+
+    chunk_size = chunk_size if chunk_size is not None else CHUNK_SIZE
+    retry_initial = retry_initial if retry_initial is not None else RETRY_INITIAL
+    retry_max = retry_max if retry_max is not None else RETRY_MAX
+    loop = asyncio.get_running_loop()
+    transport, protocol = await _connect(
+        loop, lambda: _SendProtocol(name), host, port, retry_initial, retry_max, connect_deadline
+    )
+    print(f"Sending relation {name} ({num_rows} rows) to {host}:{port}")
+
+    try:
+        meta = {"pid": pid, "header": header, "types": [typ for typ, _ in columns], "rows": num_rows}
+        transport.write(encode_frame("REL_HEADER", RAW_CODEC_ID, name, json.dumps(meta).encode("utf-8")))
+
+        for i, (_, col) in enumerate(columns):
+            view = memoryview(col).cast("B")
+            for offset in range(0, len(view), chunk_size):
+                await protocol.can_write.wait()
+                if transport.is_closing():
+                    # surfaces the reason the connection was lost
+                    await protocol.acked
+                part = view[offset:offset + chunk_size]
+                if compress_level is not None:
+                    part = zlib.compress(part, compress_level)
+                chunk = CHUNK.pack(i, offset, int(compress_level is not None))
+                transport.writelines([frame_prefix("REL_CHUNK", RAW_CODEC_ID, name, CHUNK.size + len(part)), chunk, part])
+
+        await protocol.acked
+    finally:
+        transport.close()
+
+
+class _IncomingRelation:
+    def __init__(self, meta: dict):
+        self.pid = meta["pid"]
+        self.header = meta["header"]
+        self.types = meta["types"]
+        self.num_rows = meta["rows"]
+        self.columns = [bytearray(TYPE_SIZES[typ] * self.num_rows) for typ in self.types]
+        self.remaining = sum(len(col) for col in self.columns)
+
+
+class RelationReceiver:
+    def __init__(self, pid: int, name: str, num_senders: int, max_pending: [int, None] = None):
+        self.pid = pid
+        self.name = name
+        self.num_senders = num_senders
+        self.max_pending = max_pending if max_pending is not None else MAX_PENDING
+        self.loop = asyncio.get_running_loop()
+        self.incoming = {}
+        self.received = {}
+        self.pending = {}
+        self.paused = set()
+        self.lost = set()
+        self.done = self.loop.create_future()
+
+    @staticmethod
+    def _check_meta(meta: dict):
+
+        if not isinstance(meta, dict) or set(meta.keys()) != {"pid", "header", "types", "rows"}:
+            raise Exception("Malformed relation header.")
+        if not isinstance(meta["pid"], int) or not isinstance(meta["rows"], int) or meta["rows"] < 0:
+            raise Exception("Malformed relation header.")
+        if not isinstance(meta["header"], list) or not all(isinstance(c, str) for c in meta["header"]):
+            raise Exception("Malformed relation header.")
+        if not isinstance(meta["types"], list) or len(meta["types"]) != len(meta["header"]):
+            raise Exception("Malformed relation header.")
+        if not all(typ in TYPE_SIZES for typ in meta["types"]):
+            raise Exception(f"Relation header with unsupported column types {meta['types']}.")
+
+    def handle_frame(self, protocol: asyncio.Protocol, frame: Frame):
+
+        if frame.job_id != self.name:
+            raise Exception(f"Received frame for relation {frame.job_id} while waiting for {self.name}.")
+
+        if frame.msg_type == "REL_HEADER":
+            if protocol in self.incoming:
+                raise Exception(f"Received a second header for relation {self.name}.")
+            meta = json.loads(str(frame.payload, "utf-8"))
+            self._check_meta(meta)
+            if meta["pid"] in self.received or meta["pid"] in [r.pid for r in self.incoming.values()]:
+                raise Exception(f"Received relation {self.name} twice from party {meta['pid']}.")
+            self.incoming[protocol] = _IncomingRelation(meta)
+            self.pending[protocol] = 0
+            self._check_complete(protocol)
+        elif frame.msg_type == "REL_CHUNK":
+            if protocol not in self.incoming:
+                raise Exception(f"Received a chunk of relation {self.name} before its header.")
+            col_idx, offset, compressed = CHUNK.unpack_from(frame.payload)
+            if col_idx >= len(self.incoming[protocol].columns):
+                raise Exception(f"Chunk of relation {self.name} for nonexistent column {col_idx}.")
+            data = frame.payload[CHUNK.size:]
+            if compressed:
+                self._decompress(protocol, col_idx, offset, bytes(data))
+            else:
+                self._write(protocol, col_idx, offset, data)
+        else:
+            raise Exception(f"Unexpected {frame.msg_type} frame while receiving relation {self.name}.")
+
+    def _write(self, protocol: asyncio.Protocol, col_idx: int, offset: int, data: [bytes, memoryview]):
+
+        rel = self.incoming[protocol]
+        col = rel.columns[col_idx]
+        if offset + len(data) > len(col):
+            raise Exception(f"Chunk of relation {self.name} overruns column {col_idx}.")
+        col[offset:offset + len(data)] = data
+        rel.remaining -= len(data)
+        self._check_complete(protocol)
+
+    def _decompress(self, protocol: asyncio.Protocol, col_idx: int, offset: int, data: bytes):
+        """
+        compressed chunks are decompressed off the event loop. reading from the connection is
+        paused while more than max_pending compressed bytes are waiting, and resumed once
+        less than half of that is left
+        """
+
+        max_len = max(len(self.incoming[protocol].columns[col_idx]) - offset, 1)
+
+        def _decompress_chunk():
+            d = zlib.decompressobj()
+            ret = d.decompress(data, max_len)
+            if d.unconsumed_tail or not d.eof:
+                raise Exception(f"Chunk of relation {self.name} overruns column {col_idx}.")
+            return ret
+
+        def _done(f: asyncio.Future):
+            self.pending[protocol] -= len(data)
+            if protocol in self.paused and self.pending[protocol] <= self.max_pending // 2:
+                self.paused.remove(protocol)
+                protocol.transport.resume_reading()
+            if protocol not in self.incoming:
+                # the transfer already failed
+                return
+            try:
+                self._write(protocol, col_idx, offset, f.result())
+            except Exception as e:
+                self.fail(protocol, e)
+                return
+            if protocol in self.lost and self.pending[protocol] == 0:
+                self.connection_lost(protocol)
+
+        self.pending[protocol] += len(data)
+        if self.pending[protocol] > self.max_pending and protocol not in self.paused:
+            self.paused.add(protocol)
+            protocol.transport.pause_reading()
+        self.loop.run_in_executor(None, _decompress_chunk).add_done_callback(_done)
+
+    def _check_complete(self, protocol: asyncio.Protocol):
+
+        rel = self.incoming[protocol]
+        if rel.remaining > 0:
+            return
+
+        del self.incoming[protocol]
+        self.received[rel.pid] = rel
+        codec = get_codec("struct")
+        ack = AckMsg(self.pid, "REL", self.name)
+        protocol.transport.write(encode_frame(ack.msg_type, codec.codec_id, self.name, codec.encode(ack)))
+        protocol.transport.close()
+        print(f"Received relation {self.name} ({rel.num_rows} rows) from party {rel.pid}")
+
+        if len(self.received) == self.num_senders and not self.done.done():
+            self.done.set_result([self.received[pid] for pid in sorted(self.received.keys())])
+
+    def fail(self, protocol: asyncio.Protocol, e: Exception):
+
+        protocol.transport.close()
+        if not self.done.done():
+            self.done.set_exception(e)
+
+    def connection_lost(self, protocol: asyncio.Protocol):
+        """
+        chunks that arrived before the connection was lost are still being
+        decompressed while pending, so the check is repeated once they're done
+        """
+
+        self.lost.add(protocol)
+        if protocol in self.incoming and self.pending[protocol] == 0:
+            self.fail(protocol, Exception(f"Connection lost before relation {self.name} was received in full."))
+
+
+class _ReceiveProtocol(asyncio.Protocol):
+    def __init__(self, receiver: RelationReceiver):
+        self.receiver = receiver
+        self.buffer = FrameBuffer()
+        self.transport = None
+
+    def connection_made(self, transport: asyncio.transports.BaseTransport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+
+        self.buffer.feed(data)
+        try:
+            for frame in self.buffer.frames():
+                self.receiver.handle_frame(self, frame)
+        except Exception as e:
+            self.receiver.fail(self, e)
+
+    def connection_lost(self, exc):
+        self.receiver.connection_lost(self)
+
+
+async def receive_columns(
+        pid: int,
+        port: int,
+        name: str,
+        num_senders: int,
+        host: [str, None] = None,
+        max_pending: [int, None] = None
+):
+    """
+    listen on port until relation name has been received from num_senders parties, and
+    return it as a list of objects with pid, header, types and columns attributes, ordered
+    by pid. columns are bytearrays holding each column in the wire format above
+    """
+
+    loop = asyncio.get_running_loop()
+    receiver = RelationReceiver(pid, name, num_senders, max_pending)
+    server = await loop.create_server(lambda: _ReceiveProtocol(receiver), host=host, port=port, reuse_address=True)
+    print(f"Waiting for relation {name} from {num_senders} parties on port {port}")
+
+    try:
+        return await receiver.done
+    finally:
+        server.close()
+
+
+async def exchange_columns(receiving, sending: list):
+    """
+    run a receive_columns() coroutine and send_columns() coroutines concurrently, so that
+    parties which send relations to each other don't each wait for the other's
+    acknowledgement before listening. returns the relations that were received
+    """
+
+    tasks = [asyncio.ensure_future(c) for c in [receiving] + sending]
+    try:
+        await asyncio.gather(*tasks[1:])
+        return await tasks[0]
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -33,3 +33,45 @@ def test_join(path_to_rel_one: str, path_to_rel_two: str, use_floats: bool, expe
     j = join(r_one, r_two, [0], [2])
     assert j == expected
 
+
+def _nested_loop_join(left_rel: list, right_rel: list, left_join_cols: list, right_join_cols: list):
+
+    ret = []
+    for lrow in left_rel:
+        lvals = [lrow[i] for i in left_join_cols]
+        non_key_lvals = [lrow[i] for i in range(len(lrow)) if i not in left_join_cols]
+        for rrow in right_rel:
+            if lvals == [rrow[i] for i in right_join_cols]:
+                ret.append(lvals + non_key_lvals + [rrow[i] for i in range(len(rrow)) if i not in right_join_cols])
+    return ret
+
+
+@pytest.mark.parametrize("join_fn", [join, hash_join])
+@pytest.mark.parametrize("path_to_rel_one, path_to_rel_two, left_cols, right_cols", [
+    (f"{inputs_path}/rel_three.csv", f"{inputs_path}/rel_seven.csv", [0], [2]),
+    (f"{inputs_path}/rel_seven.csv", f"{inputs_path}/rel_three.csv", [2], [0]),
+    (f"{inputs_path}/rel_three.csv", f"{inputs_path}/rel_seven.csv", [0, 1], [0, 1]),
+    (f"{inputs_path}/rel_seven.csv", f"{inputs_path}/rel_seven.csv", [1], [1]),
+    (f"{inputs_path}/rel_one.csv", f"{inputs_path}/rel_three.csv", [], [])
+])
+def test_join_matches_nested_loop(join_fn, path_to_rel_one: str, path_to_rel_two: str, left_cols: list, right_cols: list):
+
+    r_one = create(path_to_rel_one)
+    r_two = create(path_to_rel_two)
+
+    assert join_fn(r_one, r_two, left_cols, right_cols) == _nested_loop_join(r_one, r_two, left_cols, right_cols)
+
+
+@pytest.mark.parametrize("left_cols, right_cols", [
+    ([0], [0]),
+    ([0, 1], [0, 1]),
+    ([1], [0])
+])
+def test_merge_join(left_cols: list, right_cols: list):
+
+    r_one = sorted(create(f"{inputs_path}/rel_three.csv"), key=lambda r: [r[i] for i in left_cols])
+    r_two = sorted(create(f"{inputs_path}/rel_seven.csv"), key=lambda r: [r[i] for i in right_cols])
+    expected = _nested_loop_join(r_one, r_two, left_cols, right_cols)
+
+    assert merge_join(r_one, r_two, left_cols, right_cols) == expected
+    assert join(r_one, r_two, left_cols, right_cols) == expected
@@ -0,0 +1,117 @@
+from congregation.codegen.python.libs import *
+from congregation.dispatch.python import PythonDispatcher
+from congregation.job import PythonJob
+from congregation.assemble import Assemble
+from congregation.config import CodeGenConfig, NetworkConfig
+from congregation.net import Peer
+import asyncio
+import socket
+import pytest
+import os
+
+
+"""
+Tests for the in-process relation cache used when python jobs run in the dispatching process
+"""
+
+
+inputs_path = f"{os.path.dirname(os.path.realpath(__file__))}/inputs"
+
+
+@pytest.fixture
+def rel_cache():
+
+    enable_rel_cache()
+    yield
+    disable_rel_cache()
+
+
+@pytest.mark.parametrize("path_to_rel, written_floats, use_floats", [
+    (f"{inputs_path}/rel_one.csv", False, False),
+    (f"{inputs_path}/rel_four.csv", True, True),
+    (f"{inputs_path}/rel_four.csv", False, True),
+    (f"{inputs_path}/rel_four.csv", True, False)
+])
+def test_cached_read_matches_disk(tmp_path, rel_cache, path_to_rel: str, written_floats: bool, use_floats: bool):
+
+    r = create(path_to_rel, use_floats=True)
+    write_rel(f"{tmp_path}/rel.csv", r, ["a", "b", "c"], written_floats)
+    cached = read_rel(f"{tmp_path}/rel.csv", use_floats)
+
+    disable_rel_cache()
+    assert cached == read_rel(f"{tmp_path}/rel.csv", use_floats)
+
+
+def test_cache_invalidated_on_rewrite(tmp_path, rel_cache):
+
+    store([[1, 2], [3, 4]], ["a", "b"], f"{tmp_path}/rel.csv")
+    with open(f"{tmp_path}/rel.csv", "w") as f:
+        f.write("a,b\n5,6\n7,8\n9,10")
+
+    assert read(f"{tmp_path}/rel.csv") == [[5, 6], [7, 8], [9, 10]]
+
+
+@pytest.mark.parametrize("rel, written_floats, use_floats, shared", [
+    ([[1, 2], [3, 4]], False, False, True),
+    ([[1.5, 2.0]], True, True, True),
+    ([[1, 2], [3, 4]], False, True, False),
+    ([[1, 2.5]], False, False, False)
+])
+def test_cache_shared(tmp_path, rel_cache, rel: list, written_floats: bool, use_floats: bool, shared: bool):
+
+    write_rel(f"{tmp_path}/rel.csv", rel, ["a", "b"], written_floats)
+    cached = read_rel(f"{tmp_path}/rel.csv", use_floats)
+
+    assert (cached is rel) == shared
+    disable_rel_cache()
+    assert cached == read_rel(f"{tmp_path}/rel.csv", use_floats)
+
+
+def test_cache_disabled(tmp_path):
+
+    store([[1, 2]], ["a", "b"], f"{tmp_path}/rel.csv")
+    assert cache_get(f"{tmp_path}/rel.csv") is None
+
+
+def _write_job(tmp_path):
+
+    os.makedirs(f"{tmp_path}/job")
+    with open(f"{tmp_path}/job/workflow.py", "w") as f:
+        f.write(
+            "from congregation.codegen.python.libs import *\n\n\n"
+            "def run():\n"
+            f"    in1 = create(\"{inputs_path}/rel_one.csv\", False)\n"
+            f"    store(project(in1, [1]), [\"b\"], \"{tmp_path}/out.csv\")\n"
+        )
+    return PythonJob("job", str(tmp_path))
+
+
+def test_run_in_process(tmp_path, rel_cache):
+
+    PythonDispatcher._run_in_process(_write_job(tmp_path))
+    assert cache_get(f"{tmp_path}/out.csv") is not None
+    assert read(f"{tmp_path}/out.csv") == project(create(f"{inputs_path}/rel_one.csv"), [1])
+
+
+def test_cache_scoped_to_dispatch(tmp_path):
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    a = Assemble()
+    a.config.add_config(CodeGenConfig("test", 1, [1], in_process=1))
+    a.config.add_config(NetworkConfig(1, [f"1:127.0.0.1:{port}"]))
+    loop = asyncio.new_event_loop()
+    peer = Peer(loop, a.config)
+    try:
+        a.dispatch_jobs([_write_job(tmp_path)], peer)
+    finally:
+        peer.close()
+        loop.close()
+
+    assert read(f"{tmp_path}/out.csv") == project(create(f"{inputs_path}/rel_one.csv"), [1])
+    assert cache_get(f"{tmp_path}/out.csv") is None
+    enable_rel_cache()
+    assert cache_get(f"{tmp_path}/out.csv") is None
+    disable_rel_cache()
@@ -0,0 +1,204 @@
+import congregation.codegen.python.libs as row_libs
+import pytest
+import os
+
+np = pytest.importorskip("numpy")
+import congregation.codegen.python.libs.columnar as col_libs
+
+
+"""
+Tests that the columnar python engine computes the same relations as the list engine
+"""
+
+
+inputs_path = f"{os.path.dirname(os.path.realpath(__file__))}/inputs"
+
+
+def _both(fn_name: str, path_to_rel: str, use_floats: bool, *args):
+
+    row_res = getattr(row_libs, fn_name)(row_libs.create(path_to_rel, use_floats), *args)
+    col_res = getattr(col_libs, fn_name)(col_libs.create(path_to_rel, use_floats), *args)
+
+    return row_res, col_libs.to_rows(col_res)
+
+
+@pytest.mark.parametrize("path_to_rel, use_floats", [
+    (f"{inputs_path}/rel_one.csv", False),
+    (f"{inputs_path}/rel_two.csv", True),
+    (f"{inputs_path}/rel_invalid.csv", False),
+    (f"{inputs_path}/rel_invalid.csv", True)
+])
+def test_create(path_to_rel: str, use_floats: bool):
+
+    row_rel = row_libs.create(path_to_rel, use_floats=use_floats)
+    col_rel = col_libs.create(path_to_rel, use_floats=use_floats)
+
+    assert col_libs.to_rows(col_rel) == row_rel
+
+
+@pytest.mark.parametrize("fn_name, args", [
+    ("aggregate_count", ([0, 1],)),
+    ("aggregate_sum", ([0, 1], 2)),
+    ("aggregate_sum", ([], 2)),
+    ("aggregate_mean", ([0, 1], 2)),
+    ("aggregate_variance", ([0], 2)),
+    ("aggregate_variance", ([], 2)),
+    ("aggregate_std_dev", ([0, 1], 2)),
+    ("min_max_median", ([0, 1], 2)),
+    ("min_max_median", ([], 2)),
+    ("deciles", ([0, 1], 2)),
+    ("deciles", ([], 2)),
+    ("all_stats", ([1], 2)),
+    ("all_stats", ([], 2)),
+    ("project", ([2, 1],)),
+    ("add", ([0, 1], [-1, 5], 2)),
+    ("add", ([0, 1], [-1, 5], 3)),
+    ("subtract", ([{"__TYPE__": "col", "v": 2}, {"__TYPE__": "scal", "v": 2}], 0)),
+    ("subtract", ([{"__TYPE__": "col", "v": 2}, {"__TYPE__": "scal", "v": 2}], 3)),
+    ("multiply", ([1, 2], [2], 0)),
+    ("multiply", ([0, 1], [3], 3)),
+    ("divide", ([{"__TYPE__": "col", "v": 2}, {"__TYPE__": "scal", "v": 2}], 0)),
+    ("divide", ([{"__TYPE__": "col", "v": 0}, {"__TYPE__": "col", "v": 2}], 3)),
+    ("limit", (4,)),
+    ("distinct", ([0],)),
+    ("distinct", ([0, 1],)),
+    ("filter_against_col", (2, 0, ">")),
+    ("filter_against_col", (1, 0, "<=")),
+    ("filter_against_scalar", (2, 5, "<")),
+    ("filter_against_scalar", (0, 4, "==")),
+    ("sort_by", (1, True)),
+    ("sort_by", (0, False)),
+    ("num_rows", ()),
+    ("index", ()),
+    ("aggregate_sum_count_col", ([0], 2)),
+    ("aggregate_sum_squares_and_count", ([0], 2)),
+    ("col_sum", ())
+])
+@pytest.mark.parametrize("path_to_rel", [
+    f"{inputs_path}/rel_three.csv",
+    f"{inputs_path}/rel_seven.csv"
+])
+def test_unary_integer_workloads(fn_name: str, args: tuple, path_to_rel: str):
+
+    row_res, col_res = _both(fn_name, path_to_rel, False, *args)
+    assert col_res == row_res
+
+
+@pytest.mark.parametrize("fn_name, args", [
+    ("aggregate_sum", ([0, 1], 2)),
+    ("aggregate_mean", ([0, 1], 2)),
+    ("project", ([2, 1],)),
+    ("add", ([0, 1], [-1, 5], 3)),
+    ("multiply", ([1, 2], [2], 0)),
+    ("sort_by", (1, False)),
+    ("col_sum", ())
+])
+def test_unary_float_workloads(fn_name: str, args: tuple):
+
+    row_res, col_res = _both(fn_name, f"{inputs_path}/rel_four.csv", True, *args)
+    assert col_res == row_res
+
+
+@pytest.mark.parametrize("num_cols", [1, 3])
+def test_col_sum_empty(num_cols: int):
+
+    row_res = row_libs.col_sum([])
+    col_res = col_libs.col_sum(col_libs.from_rows([], num_cols))
+
+    assert len(col_res) == num_cols
+    assert col_libs.to_rows(col_res) == row_res == []
+
+
+@pytest.mark.parametrize("path_to_rel, fn_name", [
+    (f"{inputs_path}/rel_five.csv", "aggregate_std_dev_local_sqrt"),
+    (f"{inputs_path}/rel_six.csv", "aggregate_std_dev_local_sqrt"),
+    (f"{inputs_path}/rel_five.csv", "aggregate_variance_local_diff"),
+    (f"{inputs_path}/rel_six.csv", "aggregate_variance_local_diff")
+])
+def test_local_post_processing(path_to_rel: str, fn_name: str):
+
+    row_res, col_res = _both(fn_name, path_to_rel, False)
+    assert col_res == row_res
+
+
+@pytest.mark.parametrize("left_cols, right_cols", [
+    ([0], [2]),
+    ([0, 1], [0, 1]),
+    ([2], [2])
+])
+def test_join(left_cols: list, right_cols: list):
+
+    row_left = row_libs.create(f"{inputs_path}/rel_three.csv")
+    row_right = row_libs.create(f"{inputs_path}/rel_seven.csv")
+    col_left = col_libs.create(f"{inputs_path}/rel_three.csv")
+    col_right = col_libs.create(f"{inputs_path}/rel_seven.csv")
+
+    row_res = row_libs.join(row_left, row_right, left_cols, right_cols)
+    col_res = col_libs.join(col_left, col_right, left_cols, right_cols)
+
+    assert col_libs.to_rows(col_res) == row_res
+
+
+def test_concat():
+
+    paths = [f"{inputs_path}/rel_one.csv", f"{inputs_path}/rel_three.csv"]
+    row_res = row_libs.concat([row_libs.create(p) for p in paths])
+    col_res = col_libs.concat([col_libs.create(p) for p in paths])
+
+    assert col_libs.to_rows(col_res) == row_res
+
+
+def test_write_rel(tmp_path):
+
+    row_rel = row_libs.create(f"{inputs_path}/rel_two.csv", True)
+    col_rel = col_libs.create(f"{inputs_path}/rel_two.csv", True)
+
+    row_libs.write_rel(f"{tmp_path}/row.csv", row_rel, ["d", "e", "f"])
+    col_libs.write_rel(f"{tmp_path}/col.csv", col_rel, ["d", "e", "f"])
+
+    assert open(f"{tmp_path}/row.csv").read() == open(f"{tmp_path}/col.csv").read()
+
+
+@pytest.mark.parametrize("fn_name", ["min_max_median", "deciles", "all_stats"])
+@pytest.mark.parametrize("num_groups", [1, 3, 2000])
+def test_order_statistics(fn_name: str, num_groups: int):
+    """
+    few large groups take the np.partition path, many small groups the lexsort path
+    """
+
+    rng = np.random.default_rng(num_groups)
+    rows = rng.integers(0, 1000, size=(5000, 2)) % [num_groups, 1000]
+    row_rel = rows.tolist()
+
+    row_res = getattr(row_libs, fn_name)(row_rel, [0], 1)
+    col_res = col_libs.to_rows(getattr(col_libs, fn_name)(col_libs.from_rows(row_rel), [0], 1))
+
+    assert col_res == row_res
+
+
+@pytest.mark.parametrize("fn_name", ["aggregate_variance", "aggregate_std_dev", "all_stats"])
+def test_moments_large_integers(fn_name: str):
+    """
+    sums of squares that overflow int64 are accumulated exactly
+    """
+
+    row_rel = [[0, 2 ** 40], [0, 3 - 2 ** 40], [1, 7], [0, 5]]
+
+    row_res = getattr(row_libs, fn_name)(row_rel, [0], 1)
+    col_res = col_libs.to_rows(getattr(col_libs, fn_name)(col_libs.from_rows(row_rel), [0], 1))
+
+    assert col_res == row_res
+
+
+@pytest.mark.parametrize("use_floats", [False, True])
+def test_npy_interchange(tmp_path, use_floats: bool):
+
+    row_rel = row_libs.create(f"{inputs_path}/rel_four.csv", use_floats)
+    row_libs.store_npy(row_rel, ["a", "b", "c"], f"{tmp_path}/row_npy")
+    col_rel = col_libs.read_npy(f"{tmp_path}/row_npy", use_floats)
+
+    assert all(isinstance(c, np.memmap) for c in col_rel)
+    assert col_libs.to_rows(col_rel) == row_rel
+
+    col_libs.store_npy(col_rel, ["a", "b", "c"], f"{tmp_path}/col_npy")
+    assert row_libs.read_npy(f"{tmp_path}/col_npy", use_floats) == row_rel
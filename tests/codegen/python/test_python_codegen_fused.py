@@ -0,0 +1,46 @@
+from congregation.lang import *
+from congregation.dag import Dag
+from congregation.config import Config, CodeGenConfig, NetworkConfig
+from congregation.codegen import PythonCodeGen
+from congregation.codegen.python.libs import read
+from tests.utils import create_cols
+
+
+"""
+Tests that chains of row-local operators generated as a single fused pass compute
+the same relations as the unfused operators
+"""
+
+
+party_data = {
+    "col_names": ["a", "b"],
+    "stored_with": {1},
+    "plaintext_sets": [{1}, {1}],
+    "trust_with_sets": [{1}, {1}]
+}
+
+
+def test_filter_before_failing_map(tmp_path):
+    """
+    rows dropped by a filter never reach the map stages after it, so dividing
+    by a column that the filter checked is nonzero doesn't fail
+    """
+
+    with open(f"{tmp_path}/in1.csv", "w") as f:
+        f.write("a,b\n1,0\n4,2")
+
+    rel = create("in1", create_cols(party_data), party_data["stored_with"])
+    nonzero = filter_by(rel, "nonzero", "b", ">", 0)
+    collect(divide(nonzero, "quotient", "c", ["a", "b"]), {1})
+
+    cfg = Config()
+    cfg.add_config(CodeGenConfig("fused", 1, [1], input_path=str(tmp_path), use_floats=False))
+    cfg.add_config(NetworkConfig(1, ["1:localhost:9001"]))
+    code = PythonCodeGen(cfg, Dag({rel}), "job")._generate_code()
+    assert "fused(" in code
+
+    workflow = {}
+    exec(code, workflow)
+    workflow["run"]()
+
+    assert read(f"{tmp_path}/quotient_collect.csv", True) == [[4.0, 2.0, 2.0]]
@@ -0,0 +1,108 @@
+from congregation.lang import *
+from congregation.lang.internal import send, store
+from congregation.dag import Dag
+from congregation.config import Config, CodeGenConfig, NetworkConfig
+from congregation.codegen import PythonCodeGen
+from tests.utils import create_cols
+import pytest
+
+
+"""
+Tests the code generated for Send nodes, and that the data ports relations
+are sent to can't clash with the ports parties listen on
+"""
+
+
+demo_parties = ["1:localhost:9001", "2:localhost:9002", "3:localhost:9003"]
+party_data = {
+    "col_names": ["a", "b"],
+    "stored_with": {1},
+    "plaintext_sets": [{1}, {1}],
+    "trust_with_sets": [{1}, {1}]
+}
+
+
+def _generate(pid: int):
+
+    rel = create("in1", create_cols(party_data), party_data["stored_with"])
+    store(send(rel, "sent", {2, 3}), "stored")
+
+    cfg = Config()
+    cfg.add_config(CodeGenConfig("demo", pid, [1, 2, 3]))
+    cfg.add_config(NetworkConfig(pid, demo_parties))
+    return PythonCodeGen(cfg, Dag({rel}), "job")._generate_code()
+
+
+@pytest.mark.parametrize("pid, expected, unexpected", [
+    (
+        1,
+        [
+            'send(in1, [\'a\', \'b\'], "localhost", 10002, "sent", 1, None, None, 0.1, 5.0, None)',
+            'send(in1, [\'a\', \'b\'], "localhost", 10003, "sent", 1, None, None, 0.1, 5.0, None)'
+        ],
+        ["receive(", "store("]
+    ),
+    (2, ['sent = receive(2, 10002, "sent", 1)', "store(sent"], ["send(", "create("]),
+    (3, ['sent = receive(3, 10003, "sent", 1)', "store(sent"], ["send(", "create("])
+])
+def test_generate_send(pid, expected, unexpected):
+
+    code = _generate(pid)
+    for e in expected:
+        assert e in code
+    for u in unexpected:
+        assert u not in code
+
+
+def _party_data(pid: int):
+    return dict(party_data, stored_with={pid}, plaintext_sets=[{pid}, {pid}], trust_with_sets=[{pid}, {pid}])
+
+
+@pytest.mark.parametrize("pid, expected", [
+    (1, 'sent = concat([both, send_receive(both, [\'a\', \'b\'], [(\'localhost\', 10002)], "sent", 1, 10001, 1, '),
+    (2, 'sent = concat([both, send_receive(both, [\'a\', \'b\'], [(\'localhost\', 10001)], "sent", 2, 10002, 1, ')
+])
+def test_generate_send_both_ways(pid, expected):
+    """
+    parties that send to each other send while they receive, rather than waiting
+    for each other to acknowledge what they sent before listening
+    """
+
+    rels = [create(f"in{p}", create_cols(_party_data(p)), {p}) for p in [1, 2]]
+    store(send(concat(rels, "both"), "sent", {1, 2}), "stored")
+
+    cfg = Config()
+    cfg.add_config(CodeGenConfig("demo", pid, [1, 2]))
+    cfg.add_config(NetworkConfig(pid, demo_parties[:2]))
+    code = PythonCodeGen(cfg, Dag(set(rels)), "job")._generate_code()
+
+    assert expected in code
+    assert "send(both" not in code
+    assert "receive(" not in code.replace("send_receive(", "")
+
+
+def test_data_ports_dont_clash():
+
+    ports = NetworkConfig(1, demo_parties).network_dict["parties"]
+    control_ports = {int(p["port"]) for p in ports.values()}
+    data_ports = {p["data_port"] for p in ports.values()}
+
+    assert len(data_ports) == 3
+    assert not control_ports & data_ports
+
+
+@pytest.mark.parametrize("parties", [
+    ["1:localhost:9001:9002", "2:localhost:9002"],
+    ["1:localhost:9001", "2:localhost:10001"],
+    ["1:localhost:9001:9500", "2:localhost:9002:9500"]
+])
+def test_data_port_clash(parties):
+
+    with pytest.raises(Exception, match="Port .* on localhost is used as the"):
+        NetworkConfig(1, parties)
+
+
+def test_data_port_on_other_host():
+
+    ports = NetworkConfig(1, ["1:host_one:9001:9002", "2:host_two:9002"]).network_dict["parties"]
+    assert ports[1]["data_port"] == 9002
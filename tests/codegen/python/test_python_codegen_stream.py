@@ -0,0 +1,142 @@
+from congregation.codegen.python.libs import *
+import congregation.codegen.python.libs.stream as stream
+import pytest
+import os
+
+
+"""
+Tests that streamed (batched) relations produce the same results as materialized ones
+"""
+
+
+inputs_path = f"{os.path.dirname(os.path.realpath(__file__))}/inputs"
+
+
+@pytest.mark.parametrize("path_to_rel, use_floats, batch_size", [
+    (f"{inputs_path}/rel_seven.csv", False, 1),
+    (f"{inputs_path}/rel_seven.csv", False, 3),
+    (f"{inputs_path}/rel_seven.csv", False, 100),
+    (f"{inputs_path}/rel_four.csv", True, 2),
+    (f"{inputs_path}/rel_invalid.csv", False, 2)
+])
+def test_create_batches(path_to_rel: str, use_floats: bool, batch_size: int):
+
+    batches = list(create_batches(path_to_rel, use_floats, batch_size))
+
+    assert all(0 < len(b) <= batch_size for b in batches)
+    assert materialize(batches) == create(path_to_rel, use_floats)
+
+
+@pytest.mark.parametrize("fn, args", [
+    (project, ([2, 0],)),
+    (add, ([0, 1], [3], 3)),
+    (subtract, ([{"__TYPE__": "col", "v": 2}, {"__TYPE__": "scal", "v": 2}], 1)),
+    (multiply, ([1], [2], 0)),
+    (divide, ([{"__TYPE__": "col", "v": 0}], 3)),
+    (filter_against_col, (2, 0, ">")),
+    (filter_against_scalar, (2, 5, "<")),
+    (filter_against_scalar, (2, 100, ">"))
+])
+@pytest.mark.parametrize("batch_size", [1, 4, 100])
+def test_map_batches(fn, args: tuple, batch_size: int):
+
+    path_to_rel = f"{inputs_path}/rel_seven.csv"
+    streamed = materialize(map_batches(create_batches(path_to_rel, False, batch_size), fn, *args))
+
+    assert streamed == fn(create(path_to_rel), *args)
+
+
+@pytest.mark.parametrize("n, batch_size", [
+    (0, 3),
+    (5, 3),
+    (6, 3),
+    (100, 3)
+])
+def test_limit_batches(n: int, batch_size: int):
+
+    path_to_rel = f"{inputs_path}/rel_seven.csv"
+    streamed = materialize(limit_batches(create_batches(path_to_rel, False, batch_size), n))
+
+    assert streamed == limit(create(path_to_rel), n)
+
+
+@pytest.mark.parametrize("n, pulled", [(0, 0), (2, 1), (3, 1), (4, 2)])
+def test_limit_batches_pulls(n: int, pulled: int):
+
+    batches = [[[1], [2], [3]], [[4], [5], [6]], [[7]]]
+    it = iter(batches)
+    materialize(limit_batches(it, n))
+
+    assert len(list(it)) == len(batches) - pulled
+
+
+def test_concat_batches():
+
+    rel_one = create(f"{inputs_path}/rel_one.csv")
+    streamed = concat_batches([
+        create_batches(f"{inputs_path}/rel_three.csv", False, 2),
+        [rel_one],
+        create_batches(f"{inputs_path}/rel_seven.csv", False, 2)
+    ])
+
+    assert materialize(streamed) == concat([
+        create(f"{inputs_path}/rel_three.csv"),
+        rel_one,
+        create(f"{inputs_path}/rel_seven.csv")
+    ])
+
+
+def test_store_batches(tmp_path):
+
+    path_to_rel = f"{inputs_path}/rel_seven.csv"
+    store(create(path_to_rel), ["a", "b", "c"], f"{tmp_path}/rel.csv")
+    store_batches(
+        map_batches(create_batches(path_to_rel, False, 4), filter_against_scalar, 2, 0, ">"),
+        ["a", "b", "c"],
+        f"{tmp_path}/batches.csv"
+    )
+
+    assert open(f"{tmp_path}/rel.csv").read() == open(f"{tmp_path}/batches.csv").read()
+
+
+@pytest.mark.parametrize("path_to_rel, use_floats, selected_cols, batch_size, fan_in", [
+    (f"{inputs_path}/rel_seven.csv", False, [0], 1, 2),
+    (f"{inputs_path}/rel_seven.csv", False, [0, 2], 3, 64),
+    (f"{inputs_path}/rel_seven.csv", False, [0, 2], 1, 3),
+    (f"{inputs_path}/rel_seven.csv", False, [2, 1], 100, 2),
+    (f"{inputs_path}/rel_four.csv", True, [1, 0], 2, 2)
+])
+def test_distinct_batches(
+        tmp_path,
+        path_to_rel: str,
+        use_floats: bool,
+        selected_cols: list,
+        batch_size: int,
+        fan_in: int
+):
+
+    batches = create_batches(path_to_rel, use_floats, batch_size)
+    streamed = materialize(distinct_batches(batches, selected_cols, str(tmp_path), batch_size, fan_in))
+
+    assert streamed == sorted(distinct(create(path_to_rel, use_floats), selected_cols))
+    assert os.listdir(tmp_path) == []
+
+
+def test_distinct_batches_fan_in(tmp_path, monkeypatch):
+
+    read_run = stream._read_run
+    open_runs = set()
+    max_open = []
+
+    def _read_counted(path: str):
+        open_runs.add(path)
+        max_open.append(len(open_runs))
+        yield from read_run(path)
+        open_runs.remove(path)
+
+    monkeypatch.setattr(stream, "_read_run", _read_counted)
+    rel = [[i % 7, i] for i in range(100)]
+    streamed = materialize(distinct_batches([rel[i:i + 2] for i in range(0, 100, 2)], [0], str(tmp_path), 2, 4))
+
+    assert streamed == [[i] for i in range(7)]
+    assert max(max_open) == 4
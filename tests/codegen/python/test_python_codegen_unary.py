@@ -1,5 +1,7 @@
 from congregation.codegen.python.libs import *
 import pytest
+import random
+import bisect
 import os
 
 
@@ -154,14 +156,14 @@ def test_aggregate_mean(path_to_rel: str, use_floats: bool, expected: list):
     (
         f"{inputs_path}/rel_four.csv",
         False,
-        [[1, 2, 0.47140452079103085], [4, 5, 0.5], [2, 4, 0.0], [2, 8, 0.0]]
+        [[1, 2, 0.4714045207910317], [4, 5, 0.5], [2, 4, 0.0], [2, 8, 0.0]]
     ),
     (
         f"{inputs_path}/rel_four.csv",
         True,
         [
-            [1.1, 2.3, 0.20000000000000231],
-            [4.5, 5.4, 0.8999999999999974],
+            [1.1, 2.3, 0.20000000000000007],
+            [4.5, 5.4, 0.8999999999999997],
             [1.1, 2.6, 0.0],
             [2.1, 4.3, 0.0],
             [2.1, 8.8, 0.0]
@@ -194,10 +196,11 @@ def test_aggregate_std_dev(path_to_rel: str, use_floats: bool, expected: list):
             [[3, 9, 6]]
     )
 ])
-def test_aggregate_min_max_median(path_to_rel: str, group_cols: list, expected: list):
+@pytest.mark.parametrize("quantile_error", [None, 0.01])
+def test_aggregate_min_max_median(path_to_rel: str, group_cols: list, expected: list, quantile_error: [float, None]):
 
     r = create(path_to_rel)
-    mmm = min_max_median(r, group_cols, 2)
+    mmm = min_max_median(r, group_cols, 2, quantile_error)
 
     assert mmm == expected
 
@@ -226,10 +229,11 @@ def test_aggregate_min_max_median(path_to_rel: str, group_cols: list, expected:
         ]
     )
 ])
-def test_deciles(path_to_rel: str, group_cols: list, expected: list):
+@pytest.mark.parametrize("quantile_error", [None, 0.01])
+def test_deciles(path_to_rel: str, group_cols: list, expected: list, quantile_error: [float, None]):
 
     r = create(path_to_rel)
-    dec = deciles(r, group_cols, 2)
+    dec = deciles(r, group_cols, 2, quantile_error)
 
     assert dec == expected
 
@@ -239,7 +243,7 @@ def test_deciles(path_to_rel: str, group_cols: list, expected: list):
             f"{inputs_path}/rel_seven.csv",
             [],
             [
-                [99, 4.95, 10.147499999999997, 3.185514087239295, 1, 10, 6, 1, 1, 2, 3, 6, 7, 7, 9, 9, 20]
+                [99, 4.95, 10.1475, 3.1855140872392953, 1, 10, 6, 1, 1, 2, 3, 6, 7, 7, 9, 9, 20]
             ]
     ),
     (
@@ -247,15 +251,16 @@ def test_deciles(path_to_rel: str, group_cols: list, expected: list):
             [1],
             [
                 [34, 3.7777777777777777, 9.061728395061728, 3.010270485365348, 1, 10, 3, 1, 1, 1, 2, 3, 3, 6, 7, 10, 9],
-                [65, 5.909090909090909, 8.991735537190081, 2.9986222731764802, 1, 9, 7, 1, 2, 6, 6, 7, 7, 8, 9, 9, 11]
+                [65, 5.909090909090909, 8.991735537190083, 2.9986222731764802, 1, 9, 7, 1, 2, 6, 6, 7, 7, 8, 9, 9, 11]
             ]
     )
 
 ])
-def test_all_stats(path_to_rel: str, group_cols: list, expected: list):
+@pytest.mark.parametrize("quantile_error", [None, 0.01])
+def test_all_stats(path_to_rel: str, group_cols: list, expected: list, quantile_error: [float, None]):
 
     r = create(path_to_rel)
-    allstats = all_stats(r, group_cols, 2)
+    allstats = all_stats(r, group_cols, 2, quantile_error)
 
     assert allstats == expected
 
@@ -668,6 +673,19 @@ def test_distinct(path_to_rel: str, use_floats: bool, expected: list):
     assert dis == expected
 
 
+def test_distinct_mixed_types(tmp_path):
+    """
+    ints and floats holding the same number are written alike, so they're one distinct row
+    """
+
+    rel = [[1, 2], [1.0, 2], [1, 2.5], [1.0, 2.0]]
+    d = distinct(rel, [0, 1])
+    write_rel(f"{tmp_path}/rel.csv", d, ["a", "b"], True)
+
+    assert d == [[1, 2], [1, 2.5]]
+    assert read_rel(f"{tmp_path}/rel.csv", True) == distinct(read_rel(f"{tmp_path}/rel.csv", True), [0, 1])
+
+
 @pytest.mark.parametrize("path_to_rel, use_floats, expected, operator", [
     (
         f"{inputs_path}/rel_one.csv",
@@ -914,3 +932,147 @@ def test_col_sum(path_to_rel: str, use_floats: bool, expected: list):
     cs = col_sum(r)
 
     assert cs == expected
+
+
+@pytest.mark.parametrize("n, positions", [
+    (1, [0, 0]),
+    (10, [0, 9, 5, 1]),
+    (500, [0, 499, 250, 50, 450]),
+    (5000, [0, 4999, 2500, 500, 1000, 4500])
+])
+def test_select_positions(n: int, positions: list):
+
+    rng = random.Random(n)
+    values = [rng.randrange(n // 2 + 1) for _ in range(n)]
+    original = list(values)
+    expected = [sorted(values)[p] for p in positions]
+
+    assert select_positions(values, positions) == expected
+    assert values == original
+
+
+@pytest.mark.parametrize("error", [0.1, 0.01])
+def test_kll_sketch_rank_error(error: float):
+
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(100000)]
+    sorted_values = sorted(values)
+
+    sketch = KLLSketch(error, seed=0)
+    for v in values:
+        sketch.update(v)
+
+    positions = [int(len(values) * d) for d in [.1, .2, .3, .4, .5, .6, .7, .8, .9]]
+    for p, v in zip(positions, sketch.select_positions(positions)):
+        assert abs(bisect.bisect_left(sorted_values, v) - p) <= error * len(values)
+
+    assert sketch.size < 100 / error
+    assert [sketch.min, sketch.max] == [sorted_values[0], sorted_values[-1]]
+
+
+@pytest.mark.parametrize("path_to_rel, use_floats", [
+    (f"{inputs_path}/rel_one.csv", False),
+    (f"{inputs_path}/rel_four.csv", True),
+    (f"{inputs_path}/rel_invalid.csv", False)
+])
+def test_store_read_npy(tmp_path, path_to_rel: str, use_floats: bool):
+
+    r = create(path_to_rel, use_floats=use_floats)
+    store_npy(r, ["a", "b", "c"], f"{tmp_path}/rel_npy")
+
+    assert read_npy(f"{tmp_path}/rel_npy", use_floats) == r
+
+
+@pytest.mark.parametrize("fn, row_fn, args", [
+    (project, project_row, ([2, 0],)),
+    (add, add_row, ([0, 1], [3], 3)),
+    (add, add_row, ([0], [1, 2], 1)),
+    (subtract, subtract_row, ([{"__TYPE__": "col", "v": 2}, {"__TYPE__": "scal", "v": 2}], 3)),
+    (subtract, subtract_row, ([{"__TYPE__": "col", "v": 2}], 0)),
+    (multiply, multiply_row, ([1], [2], 0)),
+    (multiply, multiply_row, ([0, 2], [], 3)),
+    (divide, divide_row, ([{"__TYPE__": "col", "v": 0}], 3)),
+    (divide, divide_row, ([{"__TYPE__": "scal", "v": 2}], 2))
+])
+def test_row_ops(fn, row_fn, args: tuple):
+
+    r = create(f"{inputs_path}/rel_seven.csv")
+    assert [row_fn(row, *args) for row in r] == fn(r, *args)
+
+
+@pytest.mark.parametrize("fn, row_fn, args", [
+    (filter_against_col, filter_against_col_row, (2, 0, ">")),
+    (filter_against_col, filter_against_col_row, (0, 2, "<=")),
+    (filter_against_scalar, filter_against_scalar_row, (2, 5, "<")),
+    (filter_against_scalar, filter_against_scalar_row, (0, 2, "=="))
+])
+def test_row_filters(fn, row_fn, args: tuple):
+
+    r = create(f"{inputs_path}/rel_seven.csv")
+    assert [row for row in r if row_fn(row, *args)] == fn(r, *args)
+
+
+@pytest.mark.parametrize("stages", [
+    [("map", project, ([2, 0],))],
+    [("map", multiply, ([1], [2], 1)), ("filter", filter_against_scalar, (2, 2, ">")), ("map", add, ([0, 2], [1], 3))],
+    [("filter", filter_against_col, (2, 0, "<")), ("map", divide, ([{"__TYPE__": "scal", "v": 2}], 2))],
+    [("filter", filter_against_scalar, (2, 100, ">")), ("map", project, ([1],))]
+])
+def test_fused(stages: list):
+
+    r = create(f"{inputs_path}/rel_seven.csv")
+    expected = r
+    for _, fn, args in stages:
+        expected = fn(expected, *args) if expected else []
+
+    row_fns = {
+        project: project_row,
+        add: add_row,
+        multiply: multiply_row,
+        divide: divide_row,
+        filter_against_col: filter_against_col_row,
+        filter_against_scalar: filter_against_scalar_row
+    }
+    assert fused(r, [(kind, row_fns[fn], args) for kind, fn, args in stages]) == expected
+
+
+@pytest.mark.parametrize("stages", [
+    [("map", add_row, ([0], [1], 4))],
+    [("map", project_row, ([2, 0],)), ("filter", filter_against_scalar_row, (0, 100, ">")), ("map", add_row, ([0], [], 3))]
+])
+def test_fused_target_col(stages: list):
+
+    with pytest.raises(Exception, match="Can't add column"):
+        fused(create(f"{inputs_path}/rel_seven.csv"), stages)
+
+
+@pytest.mark.parametrize("fn", [filter_against_col, filter_against_scalar])
+def test_filter_unknown_operator(fn):
+
+    with pytest.raises(Exception, match="Unknown operator"):
+        fn([], 0, 1, "!=")
+
+
+def test_all_stats_local_sqrt():
+
+    r = [[1, 5, 30, 2, 13, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22]]
+    assert all_stats_local_sqrt(r) == [[1, 5, 3.0, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22]]
+
+
+@pytest.mark.parametrize("fn, args", [
+    (sort_by, (2, True)),
+    (sort_by, (0, False)),
+    (shuffle, ()),
+    (project, ([2, 0],)),
+    (add, ([0, 1], [3], 1)),
+    (subtract, ([{"__TYPE__": "col", "v": 2}], 0)),
+    (aggregate_variance_local_diff, ()),
+    (index, ())
+])
+def test_inputs_not_mutated(fn, args: tuple):
+
+    r = create(f"{inputs_path}/rel_seven.csv")
+    before = [list(row) for row in r]
+    fn(r, *args)
+
+    assert r == before
@@ -0,0 +1,66 @@
+from congregation.lang import *
+from congregation.dag import Dag
+from congregation.dag.nodes import Create, Concat, SortBy, MinMaxMedian, Deciles, Collect
+from congregation.dag.nodes.internal import Shuffle
+from congregation.comp import InsertShuffleOps
+from tests.utils import create_cols
+import pytest
+
+
+"""
+Tests that the InsertShuffleOps() phase of the compiler shuffles the
+inputs of sorts over secret shared data, and leaves other sorts alone
+"""
+
+
+party_data = [
+    {
+        "col_names": ["a", "b"],
+        "stored_with": {1},
+        "plaintext_sets": [{1}, {1}],
+        "trust_with_sets": [{1}, {1}]
+    },
+    {
+        "col_names": ["c", "d"],
+        "stored_with": {2},
+        "plaintext_sets": [{2}, {2}],
+        "trust_with_sets": [{2}, {2}]
+    }
+]
+
+
+@pytest.mark.parametrize("build, node_type", [
+    (lambda rel: sort_by(rel, "sorted", "b"), SortBy),
+    (lambda rel: min_max_median(rel, "mmm", [], "b"), MinMaxMedian),
+    (lambda rel: deciles(rel, "dec", [], "b"), Deciles)
+])
+def test_insert_shuffle(build, node_type):
+
+    rel_one = create("in1", create_cols(party_data[0]), party_data[0]["stored_with"])
+    rel_two = create("in2", create_cols(party_data[1]), party_data[1]["stored_with"])
+    cc = concat([rel_one, rel_two], "concat", party_data[0]["col_names"])
+    collect(build(cc), {1, 2})
+
+    d = Dag({rel_one, rel_two})
+    InsertShuffleOps().rewrite(d)
+    InsertShuffleOps().rewrite(d)
+
+    node_order = [Create, Create, Concat, Shuffle, node_type, Collect]
+    assert [type(n) for n in d.top_sort()] == node_order
+
+    shuffle = d.top_sort()[3]
+    assert shuffle.out_rel.name == "concat_shuffle"
+    assert shuffle.requires_mpc()
+    assert [c.name for c in shuffle.out_rel.columns] == ["a", "b"]
+    assert d.top_sort()[4].get_in_rel() is shuffle.out_rel
+
+
+def test_local_sort_not_shuffled():
+
+    rel_one = create("in1", create_cols(party_data[0]), party_data[0]["stored_with"])
+    collect(sort_by(rel_one, "sorted", "b"), {1})
+
+    d = Dag({rel_one})
+    InsertShuffleOps().rewrite(d)
+
+    assert [type(n) for n in d.top_sort()] == [Create, SortBy, Collect]
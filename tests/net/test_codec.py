@@ -0,0 +1,63 @@
+from congregation.net.messages import *
+from congregation.net.messages.codec import msgpack
+import pickle
+import pytest
+
+
+"""
+Tests that every registered codec decodes the messages it encodes, and rejects
+payloads that don't match the schema of their message type
+"""
+
+
+codec_names = ["struct"] + (["msgpack"] if msgpack is not None else [])
+
+msgs = [
+    IAMMsg(1),
+    ReadyMsg(2, "JIFF"),
+    ConfigMsg(
+        3,
+        {
+            "server_ip": "0.0.0.0",
+            "server_pid": 1,
+            "all_pids": [1, 2, 3],
+            "zp": 16777729,
+            "extensions": {"fixed_point": {"use": False}, "big_number": {"use": None}}
+        },
+        "JIFF"
+    ),
+    AckMsg(1, "CONFIG", "PYTHON"),
+    RequestMsg(2, "CONFIG", "JIFF")
+]
+
+
+@pytest.mark.parametrize("codec_name", codec_names)
+@pytest.mark.parametrize("m", msgs)
+def test_round_trip(codec_name, m):
+
+    codec = get_codec(codec_name)
+    decoded = codec.decode(m.msg_type, memoryview(codec.encode(m)))
+
+    assert type(decoded) is type(m)
+    assert vars(decoded) == vars(m)
+    assert get_codec(codec.codec_id) is codec
+
+
+@pytest.mark.parametrize("codec_name", codec_names)
+@pytest.mark.parametrize("msg_type, data", [
+    ("READY", lambda c: c.encode(ReadyMsg(1, "JIFF"))[:-1]),
+    ("READY", lambda c: c.encode(ReadyMsg(1, "JIFF")) + b"\x00"),
+    ("READY", lambda c: c.encode(IAMMsg(1))),
+    ("CONFIG", lambda c: pickle.dumps(ConfigMsg(1, {}, "JIFF")))
+])
+def test_malformed_payload(codec_name, msg_type, data):
+
+    codec = get_codec(codec_name)
+    with pytest.raises(Exception, match="Malformed payload"):
+        codec.decode(msg_type, data(codec))
+
+
+def test_unrecognized_codec():
+
+    with pytest.raises(Exception, match="Unrecognized codec"):
+        get_codec("pickle")
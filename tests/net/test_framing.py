@@ -0,0 +1,75 @@
+from congregation.net.framing import *
+from congregation.net.messages import *
+import pytest
+
+
+"""
+Tests that messages framed by encode_frame() are decoded intact by a FrameBuffer,
+however the bytes of the frames are split into chunks on their way
+"""
+
+
+def _decode(chunks: list):
+
+    fb = FrameBuffer()
+    ret = []
+    for c in chunks:
+        fb.feed(c)
+        for frame in fb.frames():
+            ret.append((frame.msg_type, frame.job_id, get_codec(frame.codec_id).decode(frame.msg_type, frame.payload)))
+    return ret, len(fb)
+
+
+def _chunk(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+msgs = [
+    IAMMsg(1),
+    ReadyMsg(2, "jiff"),
+    ConfigMsg(3, {"data": "\n\n\n" * 100, "values": list(range(1000))}, "python"),
+    AckMsg(1, "CONFIG", "jiff"),
+    RequestMsg(2, "CONFIG", "jiff")
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100000])
+def test_round_trip(chunk_size):
+
+    codec = get_codec("struct")
+    data = b"".join(
+        encode_frame(m.msg_type, codec.codec_id, getattr(m, "job_type", None), codec.encode(m)) for m in msgs
+    )
+    decoded, remaining = _decode(_chunk(data, chunk_size))
+
+    assert remaining == 0
+    assert [(t, j) for t, j, _ in decoded] == \
+        [("IAM", ""), ("READY", "jiff"), ("CONFIG", "python"), ("ACK", "jiff"), ("REQUEST", "jiff")]
+    assert [str(m) for _, _, m in decoded] == [str(m) for m in msgs]
+    assert decoded[2][2].config == msgs[2].config
+
+
+def test_partial_frame():
+
+    codec = get_codec("struct")
+    data = encode_frame("READY", codec.codec_id, "jiff", codec.encode(ReadyMsg(1, "jiff")))
+    decoded, remaining = _decode([data[:-1]])
+
+    assert decoded == []
+    assert remaining == len(data) - 1
+
+
+@pytest.mark.parametrize("data, expected", [
+    (HEADER.pack(VERSION, 1, 99, 0, 0), "unrecognized message type 99"),
+    (HEADER.pack(VERSION + 1, 1, 1, 0, 0), "Unsupported frame version")
+])
+def test_invalid_header(data, expected):
+
+    with pytest.raises(Exception, match=expected):
+        _decode([data])
+
+
+def test_unrecognized_msg_type():
+
+    with pytest.raises(Exception, match="unrecognized type"):
+        encode_frame("NOT_A_TYPE", 1, None, b"")
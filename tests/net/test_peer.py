@@ -0,0 +1,72 @@
+from congregation.config import Config, CodeGenConfig, NetworkConfig
+from congregation.net import Peer
+from congregation.net.backoff import backoff_delay
+import asyncio
+import socket
+import pytest
+
+
+"""
+Tests that connection attempts to other parties back off exponentially, and
+that a party which doesn't connect within the connection deadline is reported
+"""
+
+
+def _free_port():
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _peer(loop, pid: int, ports: dict, deadline: [float, None] = None):
+
+    cfg = Config()
+    cfg.add_config(CodeGenConfig("test", pid, list(ports.keys())))
+    cfg.add_config(NetworkConfig(
+        pid,
+        [f"{p}:127.0.0.1:{port}" for p, port in ports.items()],
+        retry_initial=0.01,
+        retry_max=0.05,
+        connect_deadline=deadline
+    ))
+    return Peer(loop, cfg)
+
+
+@pytest.mark.parametrize("attempt, initial, maximum, upper", [
+    (1, 0.1, 5, 0.1),
+    (4, 0.1, 5, 0.8),
+    (10, 0.1, 5, 5),
+    (1000, 0.1, 5, 5)
+])
+def test_backoff_delay(attempt, initial, maximum, upper):
+
+    delays = [backoff_delay(attempt, initial, maximum) for _ in range(100)]
+    assert all(0 <= d <= upper for d in delays)
+    assert max(delays) > upper / 2
+
+
+def test_connect():
+
+    loop = asyncio.new_event_loop()
+    ports = {1: _free_port(), 2: _free_port()}
+    _peer(loop, 1, ports)
+    peer = _peer(loop, 2, ports, 5)
+    peer.connect_to_others()
+
+    assert peer.connection_metrics[1]["direction"] == "outgoing"
+    assert peer.connection_metrics[1]["attempts"] == 1
+    assert peer.connection_metrics[1]["seconds"] < 5
+    loop.close()
+
+
+@pytest.mark.parametrize("pid", [1, 2])
+def test_connect_deadline(pid):
+
+    loop = asyncio.new_event_loop()
+    peer = _peer(loop, pid, {1: _free_port(), 2: _free_port()}, 0.3)
+
+    with pytest.raises(Exception, match=f"Parties \\[{3 - pid}\\] did not connect within 0.3s"):
+        peer.connect_to_others()
+    assert "seconds" not in peer.connection_metrics[3 - pid]
+    loop.close()
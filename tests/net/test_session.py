@@ -0,0 +1,185 @@
+from congregation.config import Config, CodeGenConfig, NetworkConfig
+from congregation.dispatch.dispatcher import Dispatcher
+from congregation.dispatch.python import PythonDispatcher
+from congregation.job import PythonJob
+from congregation.job.job import Job
+from congregation.net import get_peer, close_sessions
+import asyncio
+import socket
+import threading
+import pytest
+import os
+
+
+"""
+Tests that pooled peers are reused across workflows, that messages between them are
+routed to dispatchers by job id, and that dropped connections are re-established
+"""
+
+
+def _free_port():
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _config(pid: int, ports: dict, in_process: int = 0):
+
+    cfg = Config()
+    cfg.add_config(CodeGenConfig("test", pid, list(ports.keys()), in_process=in_process))
+    cfg.add_config(NetworkConfig(
+        pid,
+        [f"{p}:127.0.0.1:{port}" for p, port in ports.items()],
+        retry_initial=0.01,
+        retry_max=0.05,
+        connect_deadline=5
+    ))
+    return cfg
+
+
+def _get_peers(loops: dict, ports: dict):
+    """
+    set up each party's peer concurrently, in its own thread
+    """
+
+    peers = {}
+    threads = [
+        threading.Thread(target=lambda p=pid: peers.update({p: get_peer(loops[p], _config(p, ports))}))
+        for pid in loops.keys()
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return peers
+
+
+class _Dispatcher(Dispatcher):
+    def __init__(self, peer, config: Config, job_name: str):
+        super().__init__(peer, config)
+        self.dispatch_type = "PYTHON"
+        self.setup_dispatch(Job(job_name, "/tmp"))
+
+
+@pytest.fixture
+def sessions():
+
+    ports = {1: _free_port(), 2: _free_port()}
+    loops = {1: asyncio.new_event_loop(), 2: asyncio.new_event_loop()}
+    yield loops, ports, _get_peers(loops, ports)
+    close_sessions()
+    for loop in loops.values():
+        loop.close()
+
+
+def _run(loop, fut):
+    return loop.run_until_complete(asyncio.wait_for(fut, 5))
+
+
+def test_reuse(sessions):
+
+    loops, ports, peers = sessions
+    conns = dict(peers[1].peer_connections)
+
+    assert _get_peers(loops, ports) == peers
+    assert peers[1].peer_connections == conns
+
+
+def test_route_by_job_id(sessions):
+
+    loops, ports, peers = sessions
+    job_a = _Dispatcher(peers[1], _config(1, ports), "wf-a-job-0")
+    job_b = _Dispatcher(peers[1], _config(1, ports), "wf-b-job-0")
+
+    assert [job_a.job_id, job_b.job_id] == ["wf-a-job-0.0", "wf-b-job-0.0"]
+
+    peers[2].send_ready(1, "PYTHON", "wf-b-job-0.0")
+    peers[2].send_ready(1, "PYTHON", "wf-c-job-0.0")
+    _run(loops[1], job_b.parties_ready[2])
+    _run(loops[1], asyncio.sleep(0.1))
+
+    assert not job_a.parties_ready[2].done()
+    assert [job_id for job_id, _ in peers[1].msg_buffer] == ["wf-c-job-0.0"]
+
+    # buffered messages are handled once their job's dispatcher is registered
+    job_c = _Dispatcher(peers[1], _config(1, ports), "wf-c-job-0")
+    assert job_c.parties_ready[2].done()
+    assert peers[1].msg_buffer == []
+
+    job_c.teardown_dispatch()
+    assert "wf-c-job-0.0" not in peers[1].dispatchers
+    with pytest.raises(Exception, match="already registered"):
+        _Dispatcher(peers[1], _config(1, ports), "wf-a-job-0")
+
+
+def test_reconnect(sessions):
+
+    loops, ports, peers = sessions
+    peers[2].peer_connections[1].close()
+    _run(loops[2], asyncio.sleep(0.1))
+    _run(loops[1], asyncio.sleep(0.1))
+
+    assert peers[2].disconnected() == [1]
+    assert peers[1].disconnected() == [2]
+    assert _get_peers(loops, ports) == peers
+    assert peers[1].disconnected() == []
+    assert peers[2].disconnected() == []
+
+    job = _Dispatcher(peers[1], _config(1, ports), "wf-job-0")
+    peers[2].send_ready(1, "PYTHON", "wf-job-0.0")
+    _run(loops[1], job.parties_ready[2])
+
+
+class _FailingDispatcher(_Dispatcher):
+    def synchronize(self, job: Job):
+        raise Exception("Synchronize failed.")
+
+
+def test_teardown_on_failure(sessions, tmp_path):
+
+    loops, ports, peers = sessions
+    with pytest.raises(Exception, match="Synchronize failed"):
+        _FailingDispatcher(peers[1], _config(1, ports), "wf-job-0")
+    assert "wf-job-0.0" not in peers[1].dispatchers
+
+    os.makedirs(f"{tmp_path}/wf-job-1")
+    with open(f"{tmp_path}/wf-job-1/workflow.py", "w") as f:
+        f.write("def run():\n    raise Exception(\"Job failed.\")\n")
+    dispatcher = PythonDispatcher(peers[1], _config(1, ports, in_process=1))
+    with pytest.raises(Exception, match="Job failed"):
+        dispatcher.dispatch(PythonJob("wf-job-1", str(tmp_path)))
+    assert "wf-job-1.0" not in peers[1].dispatchers
+
+    # the same jobs can be dispatched again once they're torn down
+    job = _Dispatcher(peers[1], _config(1, ports), "wf-job-1")
+    assert peers[1].dispatchers["wf-job-1.1"] is job
+
+
+def test_stale_msgs_dropped(sessions):
+
+    loops, ports, peers = sessions
+    job = _Dispatcher(peers[1], _config(1, ports), "wf-job-0")
+    job.teardown_dispatch()
+
+    # a resend for the finished run isn't buffered, and doesn't reach the next run
+    peers[2].send_ready(1, "PYTHON", "wf-job-0.0")
+    _run(loops[1], asyncio.sleep(0.1))
+    assert peers[1].msg_buffer == []
+
+    job = _Dispatcher(peers[1], _config(1, ports), "wf-job-0")
+    assert job.job_id == "wf-job-0.1"
+    assert not job.parties_ready[2].done()
+    peers[2].send_ready(1, "PYTHON", "wf-job-0.1")
+    _run(loops[1], job.parties_ready[2])
+
+
+def test_msg_buffer_bounded(sessions, monkeypatch):
+
+    loops, ports, peers = sessions
+    monkeypatch.setattr("congregation.net.peer.MAX_BUFFERED_MSGS", 2)
+    for i in range(3):
+        peers[2].send_ready(1, "PYTHON", f"wf-job-{i}.0")
+    _run(loops[1], asyncio.sleep(0.1))
+
+    assert [job_id for job_id, _ in peers[1].msg_buffer] == ["wf-job-1.0", "wf-job-2.0"]
@@ -0,0 +1,171 @@
+from congregation.net.transfer import *
+from congregation.net.framing import encode_frame
+import congregation.codegen.python.libs as list_libs
+import congregation.codegen.python.libs.columnar as columnar_libs
+import numpy as np
+import asyncio
+import socket
+import threading
+import time
+import array
+import pytest
+
+
+"""
+Tests that relations sent with send_columns() arrive intact at receive_columns(), over
+loopback connections, and that malformed transfers are rejected by the receiver
+"""
+
+
+def _free_port():
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _columns(num_rows: int):
+    return [
+        ("q", array.array("q", range(num_rows))),
+        ("d", array.array("d", [i / 2 for i in range(num_rows)])),
+        ("q", array.array("q", [-i for i in range(num_rows)]))
+    ]
+
+
+async def _transfer(port: int, senders: dict, compress_level, chunk_size, max_pending=None):
+
+    receiving = asyncio.ensure_future(
+        receive_columns(1, port, "rel", len(senders), "127.0.0.1", max_pending)
+    )
+    await asyncio.gather(*[
+        send_columns(
+            "127.0.0.1", port, "rel", pid, ["a", "b", "c"], cols, len(cols[0][1]), compress_level, chunk_size, 0.05
+        )
+        for pid, cols in senders.items()
+    ])
+    return await receiving
+
+
+@pytest.mark.parametrize("num_rows, compress_level, chunk_size, max_pending", [
+    (0, None, None, None),
+    (1, None, None, None),
+    (1000, None, 7, None),
+    (1000, 6, 64, None),
+    (100000, None, None, None),
+    (100000, 1, 4096, 4096)
+])
+def test_round_trip(num_rows, compress_level, chunk_size, max_pending):
+
+    cols = _columns(num_rows)
+    received = run_transfer(_transfer(_free_port(), {2: cols}, compress_level, chunk_size, max_pending))
+
+    assert len(received) == 1
+    assert received[0].pid == 2
+    assert received[0].header == ["a", "b", "c"]
+    assert received[0].types == ["q", "d", "q"]
+    assert [bytes(c) for c in received[0].columns] == [bytes(c) for _, c in cols]
+
+
+def test_multiple_senders():
+
+    senders = {3: _columns(10), 2: _columns(20)}
+    received = run_transfer(_transfer(_free_port(), senders, None, 16))
+
+    assert [r.pid for r in received] == [2, 3]
+    assert [r.num_rows for r in received] == [20, 10]
+
+
+async def _send_raw(port: int, frames: list):
+
+    receiving = asyncio.ensure_future(receive_columns(1, port, "rel", 1, "127.0.0.1"))
+    await asyncio.sleep(0.1)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for f in frames:
+        writer.write(f)
+    writer.close()
+    return await receiving
+
+
+def _header(meta: dict):
+    return encode_frame("REL_HEADER", RAW_CODEC_ID, "rel", json.dumps(meta).encode("utf-8"))
+
+
+def _chunk(col_idx: int, offset: int, data: bytes, compressed: bool = False, name: str = "rel"):
+    return encode_frame("REL_CHUNK", RAW_CODEC_ID, name, CHUNK.pack(col_idx, offset, int(compressed)) + data)
+
+
+meta = {"pid": 2, "header": ["a"], "types": ["q"], "rows": 2}
+
+
+@pytest.mark.parametrize("frames, expected", [
+    ([_chunk(0, 0, bytes(16))], "before its header"),
+    ([_header(dict(meta, types=["s"]))], "unsupported column types"),
+    ([_header(dict(meta, rows=-1))], "Malformed relation header"),
+    ([_header(meta), _chunk(1, 0, bytes(8))], "nonexistent column"),
+    ([_header(meta), _chunk(0, 8, bytes(16))], "overruns column"),
+    ([_header(meta), _chunk(0, 0, zlib.compress(bytes(32)), True)], "overruns column"),
+    ([_header(meta), _chunk(0, 0, bytes(8), name="other")], "while waiting for rel"),
+    ([_header(meta), _chunk(0, 0, bytes(8))], "before relation rel was received in full")
+])
+def test_malformed_transfer(frames, expected):
+
+    with pytest.raises(Exception, match=expected):
+        run_transfer(_send_raw(_free_port(), frames))
+
+
+@pytest.mark.parametrize("libs, rel, expected", [
+    (list_libs, [[1, 2.5], [3, 4.5]], [[1, 2.5], [3, 4.5]]),
+    (list_libs, [], []),
+    (columnar_libs, [np.array([1, 3]), np.array([2.5, 4.5])], [[1, 2.5], [3, 4.5]])
+])
+@pytest.mark.parametrize("compress_level", [None, 6])
+def test_libs_send_receive(libs, rel, expected, compress_level):
+
+    port = _free_port()
+    received = []
+    receiver = threading.Thread(target=lambda: received.extend(libs.receive(1, port, "rel", 1)))
+    receiver.start()
+    # give the receiver time to start listening, so the sender doesn't have to retry
+    time.sleep(0.1)
+    libs.send(rel, ["a", "b"], "127.0.0.1", port, "rel", 2, compress_level, None)
+    receiver.join()
+
+    if libs is columnar_libs:
+        assert [c.dtype for c in received] == [np.int64, np.float64]
+        received = columnar_libs.to_rows(received)
+    assert received == expected
+
+
+@pytest.mark.parametrize("libs", [list_libs, columnar_libs])
+def test_libs_send_receive_both_ways(libs):
+
+    ports = {1: _free_port(), 2: _free_port()}
+    rels = {1: [[1, 2], [3, 4]], 2: [[5, 6]]}
+    if libs is columnar_libs:
+        rels = {pid: [np.array(c) for c in zip(*rel)] for pid, rel in rels.items()}
+    received = {}
+
+    def _exchange(pid: int, other: int):
+        received[pid] = libs.send_receive(
+            rels[pid], ["a", "b"], [("127.0.0.1", ports[other])], "rel", pid, ports[pid], 1, None, None, 0.05
+        )
+
+    threads = [threading.Thread(target=_exchange, args=(1, 2)), threading.Thread(target=_exchange, args=(2, 1))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    if libs is columnar_libs:
+        received = {pid: columnar_libs.to_rows(rel) for pid, rel in received.items()}
+    assert received == {1: [[5, 6]], 2: [[1, 2], [3, 4]]}
+
+
+def test_connect_deadline():
+
+    start = time.monotonic()
+    with pytest.raises(Exception, match="within 0.3s"):
+        run_transfer(
+            send_columns("127.0.0.1", _free_port(), "rel", 2, ["a"], _columns(1)[:1], 1, None, None, 0.05, 0.1, 0.3)
+        )
+    assert time.monotonic() - start < 2